@@ -1,13 +1,27 @@
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_agent
-from .config import get_settings
-from .registry import get_tools
+import threading
+from .config import Settings, get_settings
+
+# 进程内复用的智能体及其对应的配置指纹
+_agent = None
+_agent_key: tuple | None = None
+_agent_lock = threading.Lock()
+
+
+def _settings_key(s: Settings) -> tuple:
+    # 影响智能体构建的配置项，任一变化时重建
+    return (s.MODEL_NAME, s.OPENAI_API_KEY, s.OPENAI_BASE_URL)
+
 
 def build_agent():
     """
     构建LangChain智能体
     创建配置好工具和提示词的AI Agent实例
     """
+    # langchain/langchain_openai 及工具模块较重，延迟到首次构建时导入
+    from langchain_openai import ChatOpenAI
+    from langchain.agents import create_agent
+    from .registry import get_tools
+
     s = get_settings()
     # 初始化OpenAI聊天模型，使用配置中的API密钥和模型名称
     llm = ChatOpenAI(model=s.MODEL_NAME, api_key=s.OPENAI_API_KEY, base_url=s.OPENAI_BASE_URL, temperature=0)
@@ -15,10 +29,31 @@ def build_agent():
     # 创建智能体，设置系统提示词为数据分析助手
     return create_agent(llm, tools=tools, system_prompt="你是数据分析助手，使用工具读取数据并生成选题建议。")
 
+
+def get_agent():
+    """
+    获取预热的智能体实例
+    每个进程只构建一次，模型名称、密钥或接口地址变化后才重新构建
+    """
+    global _agent, _agent_key
+    key = _settings_key(get_settings())
+    with _agent_lock:
+        if _agent is None or _agent_key != key:
+            _agent = build_agent()
+            _agent_key = key
+        return _agent
+
+
+def reset_agent() -> None:
+    """丢弃已构建的智能体，下次 get_agent() 时重建"""
+    global _agent, _agent_key
+    with _agent_lock:
+        _agent, _agent_key = None, None
+
+
 def run(input_text: str):
     """
     运行智能体
     输入文本并返回智能体的处理结果
     """
-    agent = build_agent()
-    return agent.invoke({"input": input_text})
\ No newline at end of file
+    return get_agent().invoke({"input": input_text})
@@ -0,0 +1,258 @@
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+from .columnar import _numbers, _timestamps
+
+# 分组维度 -> 需要的列
+GROUP_KEYS = ("platform", "hour", "topic")
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _metric_column(records: List[Dict[str, Any]], nested: List[Dict[str, Any]], key: str) -> List[Any]:
+    # 与 stat_summary 的取值规则一致：优先顶层字段，缺失时读 metrics 嵌套字段
+    return [v if (v := r.get(key)) is not None else m.get(key) for r, m in zip(records, nested)]
+
+
+def records_to_columns(records: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    将记录列表（原始结构或带 metrics 嵌套结构）一次性转换为类型化数组
+    views/like_rate 为 float64（缺失为 NaN，bool 与字符串视为缺失），published_at 为 datetime64[s]（缺失为 NaT）
+    每列先取出原值，再由 numpy 整列转换（数值整列转换、时间批量解析），不逐条构造数组元素
+    """
+    records = records if isinstance(records, list) else list(records)
+    nested = [r.get("metrics") or {} for r in records]
+    views = _metric_column(records, nested, "views")
+    like_rates = _metric_column(records, nested, "like_rate")
+    published = [
+        p if p is not None else r.get("publish_time")
+        for r, p in zip(records, _metric_column(records, nested, "published_at"))
+    ]
+    platforms = [str(r.get("platform") or "") for r in records]
+    topics = [str(r.get("topic") or r.get("keyword") or r.get("title") or "") for r in records]
+    return {
+        "views": _numbers(views),
+        "like_rate": _numbers(like_rates),
+        "platform": np.array(platforms, dtype=str) if platforms else np.array([], dtype="U1"),
+        "topic": np.array(topics, dtype=str) if topics else np.array([], dtype="U1"),
+        "published_at": _timestamps(published),
+    }
+
+
+def summarize(columns: Dict[str, np.ndarray]) -> Dict:
+    """基础汇总：{"count", "views_sum", "like_rate_avg"}，NaN 视为缺失"""
+    views = np.asarray(columns["views"], dtype="float64")
+    like_rates = np.asarray(columns["like_rate"], dtype="float64")
+    count = int(len(views))
+    if count == 0:
+        return {"count": 0, "views_sum": 0, "like_rate_avg": 0.0}
+    valid_lr = like_rates[~np.isnan(like_rates)]
+    return {
+        "count": count,
+        "views_sum": int(np.nansum(views)),
+        "like_rate_avg": float(valid_lr.mean()) if len(valid_lr) else 0.0,
+    }
+
+
+class SummaryAccumulator:
+    """
+    逐批累加的统计汇总，结果与 summarize / stat_summary 相同
+    每批先转换为数组再累加，内存只与批大小相关
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.views_sum = 0.0
+        self.like_rate_sum = 0.0
+        self.like_rate_n = 0
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> "SummaryAccumulator":
+        return self.update_columns(records_to_columns(records))
+
+    def update_columns(self, columns: Dict[str, np.ndarray]) -> "SummaryAccumulator":
+        views = np.asarray(columns["views"], dtype="float64")
+        like_rates = np.asarray(columns["like_rate"], dtype="float64")
+        valid_lr = like_rates[~np.isnan(like_rates)]
+        self.count += int(len(views))
+        self.views_sum += float(np.nansum(views))
+        self.like_rate_sum += float(valid_lr.sum())
+        self.like_rate_n += int(len(valid_lr))
+        return self
+
+    def result(self) -> Dict:
+        if self.count == 0:
+            return {"count": 0, "views_sum": 0, "like_rate_avg": 0.0}
+        return {
+            "count": self.count,
+            "views_sum": int(self.views_sum),
+            "like_rate_avg": self.like_rate_sum / self.like_rate_n if self.like_rate_n else 0.0,
+        }
+
+
+def _group_ids(columns: Dict[str, np.ndarray], by: str):
+    """返回 (分组标签数组, 每行的分组下标)；无法归组的行（如发布时间缺失）下标为 -1"""
+    if by == "hour":
+        ts = np.asarray(columns["published_at"], dtype="datetime64[s]")
+        valid = ~np.isnat(ts)
+        hours = np.full(len(ts), -1, dtype=np.int64)
+        hours[valid] = ts[valid].astype("datetime64[h]").astype(np.int64) % 24
+        labels = np.arange(24)
+        return labels, hours
+    if by not in ("platform", "topic"):
+        raise ValueError(f"unsupported group key: {by}")
+    return _factorize(np.asarray(columns[by]))
+
+
+def _factorize(arr: np.ndarray):
+    """
+    字符串列分组编码：把定长 unicode 按码点向量化哈希成 uint64 再做 unique，
+    比直接对字符串排序快数倍；结果逐行校验，发生哈希碰撞时退回字符串 unique
+    """
+    if arr.dtype.kind != "U" or len(arr) == 0 or arr.dtype.itemsize == 0:
+        labels, inverse = np.unique(arr, return_inverse=True)
+        return labels, inverse.reshape(-1)
+    codes = np.ascontiguousarray(arr).view(np.uint32).reshape(len(arr), -1)
+    h = np.full(len(arr), 1469598103934665603, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(codes.shape[1]):
+            h = (h ^ codes[:, j]) * np.uint64(1099511628211)
+    _, first, inverse = np.unique(h, return_index=True, return_inverse=True)
+    labels = arr[first]
+    if not np.array_equal(labels[inverse], arr):
+        labels, inverse = np.unique(arr, return_inverse=True)
+        return labels, inverse.reshape(-1)
+    # 标签按字符串排序，保证与 np.unique 输出一致
+    rank = np.argsort(labels)
+    remap = np.empty_like(rank)
+    remap[rank] = np.arange(len(rank))
+    return labels[rank], remap[inverse.reshape(-1)]
+
+
+def _group_percentiles(values: np.ndarray, gid: np.ndarray, n_groups: int, qs: Sequence[float]) -> np.ndarray:
+    """
+    各组分位数（线性插值，与 np.percentile 默认一致）：
+    先按组做一次稳定排序（组数少于 32768 时用 int16，numpy 对其走基数排序），每组成为一段连续区间；
+    组数不多时逐段 np.percentile（内部为 O(n) 的 partition），组数很多时对整体按值排序后直接按下标取值
+    返回形状 (len(qs), n_groups)，无有效值的组为 NaN
+    """
+    mask = (gid >= 0) & ~np.isnan(values)
+    v, g = values[mask], gid[mask]
+    out = np.full((len(qs), n_groups), np.nan)
+    if len(v) == 0:
+        return out
+    small = n_groups < 32768
+    if small and n_groups <= 4096:
+        order = np.argsort(g.astype(np.int16), kind="stable")
+        v = v[order]
+        counts = np.bincount(g, minlength=n_groups)
+        ends = np.cumsum(counts)
+        for i in np.flatnonzero(counts):
+            out[:, i] = np.percentile(v[ends[i] - counts[i]:ends[i]], qs)
+        return out
+    order = np.argsort(v)
+    order = order[np.argsort(g[order].astype(np.int16 if small else np.int64), kind="stable")]
+    v, g = v[order], g[order]
+    counts = np.bincount(g, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has = counts > 0
+    for i, q in enumerate(qs):
+        pos = (counts[has] - 1) * (q / 100.0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        base = starts[has]
+        lo_v, hi_v = v[base + lo], v[base + hi]
+        out[i, has] = lo_v + (hi_v - lo_v) * (pos - lo)
+    return out
+
+
+def _py(x: Any) -> Any:
+    # numpy 标量转为 JSON 友好的 Python 值，NaN 转为 None
+    if isinstance(x, (np.floating, float)):
+        return None if np.isnan(x) else float(x)
+    if isinstance(x, np.integer):
+        return int(x)
+    if isinstance(x, np.str_):
+        return str(x)
+    return x
+
+
+def grouped_stats(
+    columns: Dict[str, np.ndarray],
+    by: str = "platform",
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    top_n: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    分组聚合（by 取 platform / hour / topic），每组输出：
+    count、views_sum、views_mean、views_p50/p90/...（播放分位数）、like_rate_avg、like_rate_median、
+    like_rate_weighted（按播放量加权的点赞率）
+    结果按 views_sum 降序，top_n 限制返回的组数；空组（count 为 0）不输出
+    """
+    labels, gid = _group_ids(columns, by)
+    n = len(labels)
+    views = np.asarray(columns["views"], dtype="float64")
+    like_rates = np.asarray(columns["like_rate"], dtype="float64")
+    in_group = gid >= 0
+    if in_group.all():
+        g, v, lr = gid, views, like_rates
+    else:
+        g, v, lr = gid[in_group], views[in_group], like_rates[in_group]
+
+    # 缺失值以 0 权重参与 bincount，避免对整列做布尔筛选拷贝
+    v_ok = ~np.isnan(v)
+    lr_ok = ~np.isnan(lr)
+    both = v_ok & lr_ok
+    v0 = np.where(v_ok, v, 0.0)
+    lr0 = np.where(lr_ok, lr, 0.0)
+    count = np.bincount(g, minlength=n)
+    views_n = np.bincount(g, weights=v_ok, minlength=n)
+    views_sum = np.bincount(g, weights=v0, minlength=n)
+    lr_n = np.bincount(g, weights=lr_ok, minlength=n)
+    lr_sum = np.bincount(g, weights=lr0, minlength=n)
+    w_den = np.bincount(g, weights=np.where(both, v0, 0.0), minlength=n)
+    w_num = np.bincount(g, weights=np.where(both, lr0 * v0, 0.0), minlength=n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        views_mean = views_sum / views_n
+        lr_avg = lr_sum / lr_n
+        lr_weighted = w_num / w_den
+    view_pcts = _group_percentiles(views, gid, n, percentiles)
+    lr_median = _group_percentiles(like_rates, gid, n, (50,))[0]
+
+    order = np.argsort(-views_sum, kind="stable")
+    order = order[count[order] > 0]
+    if top_n is not None:
+        order = order[:top_n]
+    groups: List[Dict[str, Any]] = []
+    for i in order:
+        row = {
+            "key": _py(labels[i]),
+            "count": int(count[i]),
+            "views_sum": int(views_sum[i]),
+            "views_mean": _py(views_mean[i]),
+        }
+        for j, q in enumerate(percentiles):
+            row[f"views_p{q:g}"] = _py(view_pcts[j, i])
+        row["like_rate_avg"] = _py(lr_avg[i])
+        row["like_rate_median"] = _py(lr_median[i])
+        row["like_rate_weighted"] = _py(lr_weighted[i])
+        groups.append(row)
+    return groups
+
+
+def top_records(columns: Dict[str, np.ndarray], n: int = 10, by: str = "views") -> List[Dict[str, Any]]:
+    """按 views 或 like_rate 取前 n 行（argpartition，O(N)），返回行号与主要字段"""
+    values = np.asarray(columns[by], dtype="float64")
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return []
+    k = min(n, len(valid))
+    part = valid[np.argpartition(-values[valid], k - 1)[:k]]
+    part = part[np.argsort(-values[part], kind="stable")]
+    out = []
+    for i in part:
+        row = {"row": int(i)}
+        for name in ("topic", "platform", "views", "like_rate"):
+            if name in columns:
+                row[name] = _py(columns[name][i])
+        out.append(row)
+    return out
@@ -1,11 +1,15 @@
+import json
+import time
+import asyncio
+from typing import AsyncIterator
 from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-# 导入各个工具函数和报告渲染功能
-from .tools.fetch_bilibili import load_bilibili_data
-from .tools.stat_summary import stat_summary
-from .tools.title_generator import title_generator
-from .report import render_markdown
+# 工具函数与报告渲染（依赖 numpy/langchain/jinja2）在首次生成报告时才导入，
+# 进程启动与 /health 不加载这些重型依赖
+from .report_cache import ReportCache
 from .config import get_settings
+from . import metrics
 
 # 报告请求模型，定义API输入参数
 class ReportRequest(BaseModel):
@@ -15,35 +19,217 @@ class ReportRequest(BaseModel):
 # 创建FastAPI应用实例
 app = FastAPI()
 
+
+class _MetricsMiddleware:
+    """
+    记录每个请求的状态码与耗时（到响应开始为止）；纯 ASGI 实现，不包装响应体，流式接口不受影响
+    路径标签取匹配到的路由模板，未匹配的请求记为 unmatched，避免标签基数随 URL 增长
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        started = False
+
+        def record(status) -> None:
+            path = getattr(scope.get("route"), "path", "unmatched")
+            metrics.HTTP_SECONDS.labels(path).observe(time.perf_counter() - start)
+            metrics.HTTP_REQUESTS.labels(path, status).inc()
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not started:
+                record(500)
+            raise
+
+
+app.add_middleware(_MetricsMiddleware)
+
+# 已完成报告的缓存，键为 (主题, 日期, 快照身份, 模型配置)，并发的相同请求合并为一次计算
+_report_cache = ReportCache()
+
 # 健康检查接口
 @app.get("/health")
 def health():
     """返回API服务状态"""
     return {"ok": True}
 
+
+# 监控指标接口（Prometheus 文本格式）
+@app.get("/metrics")
+def metrics_endpoint():
+    """导出阶段耗时直方图、缓存命中、模型调用与请求计数"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _load(date: str | None) -> dict:
+    """加载B站热搜数据（列式，只取统计需要的列）"""
+    from .tools.fetch_bilibili import load_bilibili_columns
+
+    with metrics.stage("load"):
+        return load_bilibili_columns(date=date, columns=("views", "like_rate"))
+
+
+def _stats(date: str | None, columns: dict) -> dict:
+    """对数据进行统计汇总"""
+    from .tools.stat_summary import summarize_columns
+    from .tools.keyword_freq import keyword_freq
+
+    with metrics.stage("stats"):
+        summary = summarize_columns(columns)
+
+    # 高频关键词（按快照缓存），写入 summary.keyword_freq 供报告展示
+    with metrics.stage("keywords"):
+        summary["keyword_freq"] = keyword_freq.func(date=date, top_k=20)
+    return summary
+
+
+def _summarize(date: str | None) -> dict:
+    """文件读取与统计（阻塞部分），在线程中执行"""
+    return _stats(date, _load(date))
+
+
+async def _build_report(topic: str, date: str | None) -> dict:
+    s = get_settings()
+    # 1. 数据加载与统计在线程中执行；2. 配置了密钥时同时异步生成标题建议（两者互不依赖）
+    if s.OPENAI_API_KEY:
+        from .tools.title_generator import agenerate_titles
+        summary, titles = await asyncio.gather(
+            asyncio.to_thread(_summarize, date),
+            agenerate_titles(topic=topic, context="热搜选题"),
+        )
+    else:
+        summary, titles = await asyncio.to_thread(_summarize, date), []
+    return {"summary": summary, "titles": titles}
+
+
+async def _cache_key(req: ReportRequest) -> tuple:
+    from .tools.fetch_bilibili import snapshot_identity
+
+    s = get_settings()
+    ident = await asyncio.to_thread(snapshot_identity, req.date)
+    return (req.topic, req.date, ident, s.MODEL_NAME, bool(s.OPENAI_API_KEY))
+
+
+async def _report_data(req: ReportRequest) -> dict:
+    """统计结果与标题建议；相同主题、日期且快照未变化时直接返回缓存结果"""
+    key = await _cache_key(req)
+    return await _report_cache.get_or_compute(key, lambda: _build_report(req.topic, req.date))
+
+
 # 生成报告接口
 @app.post("/report")
-def report(req: ReportRequest):
+async def report(req: ReportRequest):
     """
     生成数据分析报告
     加载B站数据，进行统计汇总，生成标题建议，并输出Markdown报告
     """
-    # 1. 加载B站热搜数据
-    data = load_bilibili_data.func(date=req.date)
+    from .report import render_markdown
 
-    # 2. 对数据进行统计汇总
-    summary = stat_summary.func(records=data)
+    data = await _report_data(req)
+    # 使用预编译模板渲染Markdown格式的报告
+    with metrics.stage("render"):
+        md = render_markdown(req.topic, data["summary"], data["titles"])
+    return {"summary": data["summary"], "titles": data["titles"], "markdown": md}
 
-    # 3. 初始化标题列表
-    titles: list[str] = []
-    s = get_settings()
 
-    # 4. 如果配置了OpenAI API密钥，则生成标题建议
-    if s.OPENAI_API_KEY:
-        titles = title_generator.func(topic=req.topic, context="热搜选题")
+# 流式报告接口
+@app.post("/report/stream")
+async def report_stream(req: ReportRequest):
+    """
+    以分块传输（chunked）返回Markdown报告，与 /report 的 markdown 字段内容相同
+    模板边渲染边发送，服务端不持有完整的报告字符串
+    """
+    from .report import stream_markdown
+
+    data = await _report_data(req)
+    return StreamingResponse(
+        stream_markdown(req.topic, data["summary"], data["titles"]),
+        media_type="text/markdown; charset=utf-8",
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _report_events(req: ReportRequest) -> AsyncIterator[str]:
+    """
+    报告流水线的阶段事件：load_bilibili_data → stat_summary → title_generator → render_markdown，
+    每个阶段完成时立即发送 {"stage", "elapsed_ms", ...阶段结果}，最后发送 done（总耗时）
+    标题生成在加载数据之前就并发启动，统计结果无需等待模型返回即可先行展示
+    命中报告缓存时直接发送缓存的统计与标题（cached: true）；完整跑完的结果写回缓存供 /report 复用
+    """
+    from .report import render_markdown
+
+    start = time.perf_counter()
+    key = await _cache_key(req)
+    data = _report_cache.get(key)
+    titles_task = None
+    try:
+        if data is None:
+            s = get_settings()
+            if s.OPENAI_API_KEY:
+                from .tools.title_generator import agenerate_titles
+
+                async def timed_titles():
+                    t = time.perf_counter()
+                    titles = await agenerate_titles(topic=req.topic, context="热搜选题")
+                    return titles, (time.perf_counter() - t) * 1000
+
+                titles_task = asyncio.create_task(timed_titles())
+
+            t = time.perf_counter()
+            columns = await asyncio.to_thread(_load, req.date)
+            yield _sse("stage", {"stage": "load_bilibili_data", "elapsed_ms": round((time.perf_counter() - t) * 1000, 2),
+                                 "rows": int(len(columns["views"]))})
+
+            t = time.perf_counter()
+            summary = await asyncio.to_thread(_stats, req.date, columns)
+            yield _sse("stage", {"stage": "stat_summary", "elapsed_ms": round((time.perf_counter() - t) * 1000, 2),
+                                 "summary": summary})
+
+            titles, titles_ms = (await titles_task) if titles_task else ([], 0.0)
+            yield _sse("stage", {"stage": "title_generator", "elapsed_ms": round(titles_ms, 2), "titles": titles,
+                                 "skipped": titles_task is None})
+            data = {"summary": summary, "titles": titles}
+            _report_cache.put(key, data)
+        else:
+            yield _sse("stage", {"stage": "stat_summary", "elapsed_ms": 0.0, "summary": data["summary"], "cached": True})
+            yield _sse("stage", {"stage": "title_generator", "elapsed_ms": 0.0, "titles": data["titles"], "cached": True})
+
+        t = time.perf_counter()
+        with metrics.stage("render"):
+            md = render_markdown(req.topic, data["summary"], data["titles"])
+        yield _sse("stage", {"stage": "render_markdown", "elapsed_ms": round((time.perf_counter() - t) * 1000, 2),
+                             "markdown": md})
+        yield _sse("done", {"elapsed_ms": round((time.perf_counter() - start) * 1000, 2)})
+    except Exception as e:
+        yield _sse("error", {"error": f"{type(e).__name__}: {e}"})
+    finally:
+        # 客户端断开或出错时不再等待模型返回
+        if titles_task is not None and not titles_task.done():
+            titles_task.cancel()
 
-    # 5. 渲染Markdown格式的报告
-    md = render_markdown(req.topic, summary, titles)
 
-    # 6. 返回完整的报告数据
-    return {"summary": summary, "titles": titles, "markdown": md}
+# 报告进度事件接口（SSE）
+@app.post("/report/events")
+async def report_events(req: ReportRequest):
+    """以 Server-Sent Events 推送报告流水线各阶段的耗时与阶段结果"""
+    return StreamingResponse(
+        _report_events(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
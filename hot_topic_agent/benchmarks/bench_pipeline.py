@@ -0,0 +1,148 @@
+"""
+离线流水线基准：在生成的快照（benchmarks/fixtures.py，默认 1k/10k/100k 行）上测量
+- loader：load_bilibili_data 冷/热、load_bilibili_columns 首次（生成 .cols）/复用、流式 iter_bilibili_batches
+- stats：stat_summary（记录）、stat_summary(group_by=topic)、summarize_columns（列式）
+- report：/report 端到端延迟（关闭结果缓存，p50/p99）与命中缓存时的延迟；
+  --llm-latency-ms > 0 时启动本地替身 chat-completions 服务器，标题生成计入端到端耗时（关闭模型结果缓存）
+
+用法：python hot_topic_agent/benchmarks/bench_pipeline.py [--sizes 1000,10000,100000] [--requests 20]
+      [--llm-latency-ms 0] [--out results.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# 结果输出与回归比较与爬虫基准共用 topic-crawler/benchmarks/_results.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "topic-crawler" / "benchmarks"))
+from hot_topic_agent import config
+from fixtures import DEFAULT_SIZES, snapshot_name, write_snapshots
+from _results import emit
+
+
+def _ms(fn, repeat: int = 3) -> float:
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+class _FakeChat(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.server.latency)
+        body = json.dumps({
+            "id": "bench", "object": "chat.completion", "created": 0, "model": "bench",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "- 标题一\n- 标题二"}}],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_loader(stem: str) -> dict:
+    from hot_topic_agent.tools import fetch_bilibili as fb
+    from hot_topic_agent.tools.stat_summary import summarize_batches
+
+    def cold():
+        fb._adapted_cache.clear()
+        fb.load_bilibili_data.func(date=stem)
+
+    cols_path = fb.columnar_path(fb._resolve_snapshot(stem) + ".json")
+    import shutil
+    shutil.rmtree(cols_path, ignore_errors=True)
+    t = time.perf_counter()
+    fb.load_bilibili_columns(date=stem)
+    columns_build = (time.perf_counter() - t) * 1000
+    return {
+        "load_records_cold_ms": _ms(cold),
+        "load_records_warm_ms": _ms(lambda: fb.load_bilibili_data.func(date=stem)),
+        "load_columns_build_ms": round(columns_build, 2),
+        "load_columns_warm_ms": _ms(lambda: fb.load_bilibili_columns(date=stem)),
+        "stream_summary_ms": _ms(lambda: summarize_batches(fb.iter_bilibili_batches(date=stem))),
+    }
+
+
+def bench_stats(stem: str) -> dict:
+    from hot_topic_agent.tools import fetch_bilibili as fb
+    from hot_topic_agent.tools.stat_summary import stat_summary, summarize_columns
+
+    records = fb.load_bilibili_data.func(date=stem)
+    columns = fb.load_bilibili_columns(date=stem, columns=("views", "like_rate"))
+    return {
+        "stat_summary_ms": _ms(lambda: stat_summary.func(records=records)),
+        "stat_summary_grouped_ms": _ms(lambda: stat_summary.func(records=records, group_by="topic")),
+        "summarize_columns_ms": _ms(lambda: summarize_columns(columns)),
+    }
+
+
+def bench_report(stem: str, requests: int) -> dict:
+    from fastapi.testclient import TestClient
+    from hot_topic_agent import app_api
+    from hot_topic_agent.report_cache import ReportCache
+
+    client = TestClient(app_api.app)
+    body = {"topic": "bench", "date": stem}
+    app_api._report_cache = ReportCache(ttl=0)
+    client.post("/report", json=body).raise_for_status()
+    samples = []
+    for _ in range(requests):
+        t = time.perf_counter()
+        client.post("/report", json=body).raise_for_status()
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    app_api._report_cache = ReportCache(ttl=300)
+    client.post("/report", json=body)
+    return {
+        "report_p50_ms": round(statistics.median(samples), 2),
+        "report_p99_ms": round(samples[max(0, int(len(samples) * 0.99) - 1)], 2),
+        "report_cached_ms": _ms(lambda: client.post("/report", json=body).raise_for_status(), repeat=5),
+    }
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    sizes = [int(x) for x in args[args.index("--sizes") + 1].split(",")] if "--sizes" in args else list(DEFAULT_SIZES)
+    requests = int(args[args.index("--requests") + 1]) if "--requests" in args else 20
+    llm_latency = float(args[args.index("--llm-latency-ms") + 1]) if "--llm-latency-ms" in args else 0.0
+    llm = None
+    results: dict = {}
+    with tempfile.TemporaryDirectory() as root:
+        settings = {"DATA_ROOT": root, "TIMESERIES_INDEX": False, "LLM_CACHE_TTL": 0}
+        if llm_latency > 0:
+            llm = ThreadingHTTPServer(("127.0.0.1", 0), _FakeChat)
+            llm.latency = llm_latency / 1000
+            threading.Thread(target=llm.serve_forever, daemon=True).start()
+            settings.update(OPENAI_API_KEY="bench", OPENAI_BASE_URL=f"http://127.0.0.1:{llm.server_port}/v1")
+        config._settings = config.Settings(**settings)
+        write_snapshots(root, sizes)
+        try:
+            for rows in sizes:
+                stem = snapshot_name(rows)
+                results[str(rows)] = {
+                    "loader": bench_loader(stem),
+                    "stats": bench_stats(stem),
+                    "report": bench_report(stem, requests),
+                }
+        finally:
+            if llm:
+                llm.shutdown()
+                llm.server_close()
+    return emit("hot_topic_agent", {"llm_latency": llm_latency, "sizes": results}, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""
+启动与智能体开销基准：每个场景在全新子进程中运行（模拟 worker 冷启动），重复多次取中位数
+- import_app：导入 hot_topic_agent.app_api 的耗时，以及导入后是否已加载 numpy/langchain 等重型依赖
+- first_health：导入 + 第一次 /health 响应
+- first_report：导入 + 第一次 /report（临时 DATA_ROOT 下的 1 万条快照，未配置模型密钥）
+- agent_cold / agent_build / agent_warm：首次构建智能体、此后每次重建（旧 run() 的行为）、复用预热实例（get_agent）的单次开销
+
+用法：python hot_topic_agent/benchmarks/bench_startup.py [--repeat 5] [--json]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+HEAVY = ("numpy", "langchain_core", "langchain_openai", "langchain", "jinja2")
+
+_IMPORT_APP = """
+import json, sys, time
+t = time.perf_counter()
+import hot_topic_agent.app_api
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({"ms": ms, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+_FIRST_HEALTH = """
+import json, time
+t = time.perf_counter()
+from fastapi.testclient import TestClient
+import hot_topic_agent.app_api as api
+TestClient(api.app).get("/health").raise_for_status()
+print(json.dumps({"ms": (time.perf_counter() - t) * 1000}))
+"""
+
+_FIRST_REPORT = """
+import json, time
+t = time.perf_counter()
+from fastapi.testclient import TestClient
+import hot_topic_agent.app_api as api
+r = TestClient(api.app).post("/report", json={"topic": "bench"})
+r.raise_for_status()
+print(json.dumps({"ms": (time.perf_counter() - t) * 1000, "count": r.json()["summary"]["count"]}))
+"""
+
+_AGENT = """
+import json, time
+from hot_topic_agent import agent_runner
+t = time.perf_counter(); agent_runner.get_agent(); cold = (time.perf_counter() - t) * 1000
+n = 50
+t = time.perf_counter()
+for _ in range(n):
+    agent_runner.build_agent()
+build = (time.perf_counter() - t) * 1000 / n
+t = time.perf_counter()
+for _ in range(n):
+    agent_runner.get_agent()
+warm = (time.perf_counter() - t) * 1000 / n
+print(json.dumps({"cold_ms": cold, "build_ms": build, "warm_ms": warm}))
+"""
+
+
+def _run(code: str, env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _snapshot(data_root: str, rows: int = 10_000) -> None:
+    base = os.path.join(data_root, "bilibili")
+    os.makedirs(base, exist_ok=True)
+    recs = [{"keyword": f"话题{i % 500}", "views": i * 10, "like_rate": (i % 100) / 1000} for i in range(rows)]
+    with open(os.path.join(base, "2025-11-20.json"), "w", encoding="utf-8") as f:
+        json.dump(recs, f, ensure_ascii=False)
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATA_ROOT": tmp, "OPENAI_API_KEY": "", "TIMESERIES_INDEX": "0", "REPORT_CACHE_TTL": "0"}
+        env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+        _snapshot(tmp)
+        imports = [_run(_IMPORT_APP, env) for _ in range(repeat)]
+        health = [_run(_FIRST_HEALTH, env)["ms"] for _ in range(repeat)]
+        report = [_run(_FIRST_REPORT, env)["ms"] for _ in range(repeat)]
+        agent = [_run(_AGENT, {**env, "OPENAI_API_KEY": "bench"}) for _ in range(repeat)]
+    results = {
+        "import_app_ms": round(statistics.median(r["ms"] for r in imports), 1),
+        "heavy_modules_after_import": imports[0]["loaded"],
+        "first_health_ms": round(statistics.median(health), 1),
+        "first_report_ms": round(statistics.median(report), 1),
+        "agent_cold_ms": round(statistics.median(a["cold_ms"] for a in agent), 1),
+        "agent_build_ms": round(statistics.median(a["build_ms"] for a in agent), 3),
+        "agent_warm_ms": round(statistics.median(a["warm_ms"] for a in agent), 4),
+    }
+    if "--json" in args:
+        print(json.dumps(results, ensure_ascii=False))
+    else:
+        for k, v in results.items():
+            print(f"{k:28s} {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
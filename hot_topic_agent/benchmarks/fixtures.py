@@ -0,0 +1,67 @@
+"""
+生成基准用的 B 站快照（爬虫 TopicItem 格式），数据按 seed 固定、可复现
+DATA_ROOT/bilibili/bench-<rows>.json，话题数约为行数的 1/20，播放量为长尾分布，少量字段缺失
+
+用法：python hot_topic_agent/benchmarks/fixtures.py <DATA_ROOT> [--sizes 1000,10000,100000]
+"""
+import json
+import os
+import random
+import sys
+from typing import List, Sequence
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+_WORDS = "城市 漫步 露营 徒步 骑行 美食 探店 数码 评测 手机 游戏 攻略 旅行 日常 学习 考研 音乐 翻唱 舞蹈 宠物".split()
+
+
+def snapshot_name(rows: int) -> str:
+    return f"bench-{rows}"
+
+
+def make_records(rows: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    topics = [f"{rng.choice(_WORDS)}{rng.choice(_WORDS)}{i}" for i in range(max(1, rows // 20))]
+    out = []
+    for i in range(rows):
+        views = int(rng.paretovariate(1.2) * 1000)
+        rec = {
+            "id": f"BV{seed}{i:09d}",
+            "keyword": rng.choice(topics),
+            "platform": "bilibili",
+            "rank": i % 100 + 1,
+            "views": views if rng.random() > 0.02 else None,
+            "like_rate": round(rng.random() * 0.2, 4) if rng.random() > 0.05 else None,
+            "publish_time": f"2025-11-20T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z",
+            "title": f"{rng.choice(_WORDS)}{rng.choice(_WORDS)}视频 {i}",
+        }
+        out.append(rec)
+    return out
+
+
+def write_snapshots(data_root: str, sizes: Sequence[int] = DEFAULT_SIZES, seed: int = 1) -> List[str]:
+    """写入（已存在则跳过）各尺寸快照，返回文件路径"""
+    base = os.path.join(data_root, "bilibili")
+    os.makedirs(base, exist_ok=True)
+    paths = []
+    for rows in sizes:
+        path = os.path.join(base, snapshot_name(rows) + ".json")
+        if not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_records(rows, seed), f, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv: List[str]) -> int:
+    if not argv:
+        print("usage: python hot_topic_agent/benchmarks/fixtures.py <DATA_ROOT> [--sizes 1000,10000]", file=sys.stderr)
+        return 2
+    sizes = [int(x) for x in argv[argv.index("--sizes") + 1].split(",")] if "--sizes" in argv else DEFAULT_SIZES
+    for p in write_snapshots(argv[0], sizes):
+        print(p)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,158 @@
+import os
+import re
+import sys
+import json
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+
+# 列式快照格式版本，结构变化时递增，旧版本快照会被视为过期重新生成
+FORMAT_VERSION = 1
+
+# 列定义：列名 -> (爬虫字段名, numpy dtype)
+# 数值缺失用 NaN，时间缺失用 NaT，字符串列为定长 unicode，均可 mmap 加载
+COLUMNS: Dict[str, tuple] = {
+    "topic": ("keyword", "U"),
+    "platform": ("platform", "U"),
+    "views": ("views", "float64"),
+    "like_rate": ("like_rate", "float64"),
+    "published_at": ("publish_time", "datetime64[s]"),
+}
+
+SUFFIX = ".cols"
+
+
+def columnar_path(json_path: str) -> str:
+    """YYYY-MM-DD.json 对应的列式快照目录 YYYY-MM-DD.cols"""
+    root, _ = os.path.splitext(json_path)
+    return root + SUFFIX
+
+
+def _number(v: Any) -> float:
+    # 与 stat_summary 一致：只有 int/float 计入，其余视为缺失
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return float(v)
+    return float("nan")
+
+
+def _timestamp(v: Any) -> np.datetime64:
+    if isinstance(v, str) and v.strip():
+        x = v.strip()
+        if x.endswith("Z"):
+            x = x[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(x)
+        except ValueError:
+            return np.datetime64("NaT")
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(dt, "s")
+    return np.datetime64("NaT")
+
+
+# numpy 能直接解析且与 datetime.fromisoformat 结果一致的 ISO 时间（无时区，或带 Z 表示 UTC）
+_ISO = r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?Z?)?"
+# 整列按行拼接后一次校验；原子组避免在长文本上回溯
+_ISO_LINES_RE = re.compile(rf"(?>(?>{_ISO})?\n)*+(?>{_ISO})?")
+
+_NUMBER_TYPES = {int, float, type(None)}
+_TIME_TYPES = {str, type(None)}
+
+
+def _numbers(values: List[Any]) -> np.ndarray:
+    """批量转 float64：全部为 int/float/None 时由 numpy 一次转换，否则逐个按 _number 处理（排除 bool 与字符串）"""
+    if set(map(type, values)) <= _NUMBER_TYPES:
+        return np.array(values, dtype="float64")
+    return np.array([_number(v) for v in values], dtype="float64")
+
+
+def _timestamps(values: List[Any]) -> np.ndarray:
+    """
+    批量解析时间为 datetime64[s]，结果与逐个 _timestamp 相同：
+    整列都是上述 ISO 格式（或缺失）时用一次正则校验、一次 numpy 解析；否则逐个处理
+    """
+    if values and set(map(type, values)) <= _TIME_TYPES:
+        text = "\n".join(values) if None not in values else "\n".join(v or "" for v in values)
+        if _ISO_LINES_RE.fullmatch(text):
+            try:
+                return np.array(text.replace("Z", "").split("\n"), dtype="datetime64[s]")
+            except ValueError:
+                # 形如 2025-02-30 的非法日期：退回逐个解析
+                pass
+    return np.array([_timestamp(v) for v in values], dtype="datetime64[s]")
+
+
+def build_columns(crawler_data: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """将爬虫原始记录（TopicItem 格式）转换为列数组，字段映射与 adapt_topic_item_to_analysis_format 一致。"""
+    items = crawler_data if isinstance(crawler_data, list) else list(crawler_data)
+    topics = [str(item.get("keyword") or "") for item in items]
+    platforms = [str(item.get("platform") or "bilibili") for item in items]
+    return {
+        "topic": np.array(topics, dtype=str) if topics else np.array([], dtype="U1"),
+        "platform": np.array(platforms, dtype=str) if platforms else np.array([], dtype="U1"),
+        "views": _numbers([item.get("views") for item in items]),
+        "like_rate": _numbers([item.get("like_rate") for item in items]),
+        "published_at": _timestamps([item.get("publish_time") for item in items]),
+    }
+
+
+def write_columnar_snapshot(crawler_data: Iterable[Dict[str, Any]], path: str, source_mtime: float | None = None) -> str:
+    """
+    写入列式快照目录：每列一个 .npy 文件，外加 meta.json（行数、列、来源文件修改时间）
+    先写临时目录再整体替换，读者不会看到写了一半的快照
+    """
+    cols = build_columns(crawler_data)
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, arr in cols.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr, allow_pickle=False)
+    meta = {
+        "version": FORMAT_VERSION,
+        "rows": int(len(cols["views"])),
+        "columns": list(cols),
+        "source_mtime": source_mtime,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+
+def read_meta(path: str) -> Dict[str, Any] | None:
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_columns(path: str, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """只加载请求的列，数组以只读 mmap 方式打开，不构造逐条记录的字典"""
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown columns: {unknown}")
+    return {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r", allow_pickle=False) for c in columns}
+
+
+def convert_json_snapshot(json_path: str) -> str:
+    """把已有的 YYYY-MM-DD.json 转换为同目录下的列式快照"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
+    return write_columnar_snapshot(raw_data, columnar_path(json_path), source_mtime=os.path.getmtime(json_path))
+
+
+def main(argv: List[str]) -> int:
+    """python -m hot_topic_agent.columnar <YYYY-MM-DD.json>...：批量转换 JSON 快照"""
+    if not argv:
+        print("usage: python -m hot_topic_agent.columnar <snapshot.json>...", file=sys.stderr)
+        return 2
+    for p in argv:
+        print(convert_json_snapshot(p))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -8,6 +8,12 @@ class Settings(BaseModel):
     OPENAI_BASE_URL: str | None = None  # OpenAI API基础URL
     MODEL_NAME: str = "gpt-4o-mini"  # 默认使用的模型名称
     DATA_ROOT: str = os.path.join(os.getcwd(), "data", "raw")  # 数据存储根目录
+    TIMESERIES_INDEX: bool = True  # 是否维护快照时序索引并回填 view_growth_24h
+    ITEM_STORE: bool = True  # 是否读取条目库 DATA_ROOT/items.sqlite（存在时优先于更旧的 JSON 快照）
+    REPORT_CACHE_TTL: float = 300.0  # /report 结果缓存秒数，0 表示不缓存
+    LLM_CACHE_TTL: float = 7 * 24 * 3600  # 模型调用结果持久化缓存秒数，0 表示不缓存
+    APP_ENV: str = "production"  # 运行环境，development 时模板修改后自动重新加载
+    METRICS_LOG: bool = False  # 是否输出结构化（JSON 行）阶段日志
 
 _settings: Settings | None = None  # 全局设置实例，初始为None
 
@@ -25,5 +31,11 @@ def get_settings() -> Settings:
             OPENAI_BASE_URL=os.getenv("OPENAI_BASE_URL"),
             MODEL_NAME=os.getenv("MODEL_NAME", "gpt-4o-mini"),
             DATA_ROOT=os.getenv("DATA_ROOT", os.path.join(os.getcwd(), "data", "raw")),
+            TIMESERIES_INDEX=os.getenv("TIMESERIES_INDEX", "1") not in ("0", "false", "False"),
+            ITEM_STORE=os.getenv("ITEM_STORE", "1") not in ("0", "false", "False"),
+            REPORT_CACHE_TTL=float(os.getenv("REPORT_CACHE_TTL", "300")),
+            LLM_CACHE_TTL=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            APP_ENV=os.getenv("APP_ENV", "production"),
+            METRICS_LOG=os.getenv("METRICS_LOG", "0") not in ("0", "false", "False"),
         )
     return _settings
\ No newline at end of file
@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import atexit
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+from .config import get_settings
+from . import metrics
+
+# 中文连续片段、英文单词（允许 C++/C#/Node.js 之类）、数字
+_TOKEN_RE = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]+|[A-Za-z][A-Za-z0-9+#.\-]*[A-Za-z0-9+#]|[A-Za-z]|\d+")
+
+# n-gram 首尾出现这些字时视为无意义片段（虚词、代词、语气词）
+_STOP_CHARS = set("的了是在和与及或就都而也被把这那我你他她它们吗呢吧啊着过之其为于以")
+_STOP_WORDS = {"the", "a", "an", "of", "to", "in", "on", "and", "or", "for", "is", "are", "with"}
+
+# 超过该条数的标题集合才启用多进程
+PARALLEL_THRESHOLD = 50_000
+
+# 磁盘缓存最多保留的快照结果数，超出时删除最久未写入的
+DISK_CACHE_MAX = 64
+
+# 每条记录的 metrics.keyword_freq 最多保留的关键词数
+RECORD_KEYWORDS = 10
+
+
+def tokenize(text: str, ngram_range: Tuple[int, int] = (2, 3)) -> List[str]:
+    """
+    标题分词：中文片段按字切成 n-gram（默认 2~3 字），英文按单词（小写），纯数字丢弃
+    不依赖分词词典，混合中英文标题也能直接计数
+    """
+    lo, hi = ngram_range
+    out: List[str] = []
+    for tok in _TOKEN_RE.findall(text):
+        first = tok[0]
+        if "\u3400" <= first <= "\u9fff":
+            n_chars = len(tok)
+            for n in range(lo, min(hi, n_chars) + 1):
+                for i in range(n_chars - n + 1):
+                    gram = tok[i:i + n]
+                    if gram[0] not in _STOP_CHARS and gram[-1] not in _STOP_CHARS:
+                        out.append(gram)
+        elif not first.isdigit():
+            word = tok.lower()
+            if len(word) > 1 and word not in _STOP_WORDS:
+                out.append(word)
+    return out
+
+
+def _count_batch(args: Tuple[List[str], Tuple[int, int]]) -> Counter:
+    texts, ngram_range = args
+    c: Counter = Counter()
+    for t in texts:
+        c.update(tokenize(t, ngram_range))
+    return c
+
+
+def _batches(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for t in texts:
+        batch.append(t)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    进程内共享的计数进程池，首次使用时创建，进程数变化时重建，进程退出时关闭
+    用 forkserver（不支持时 spawn）启动，避免在 API 服务的多线程进程中直接 fork
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=ctx)
+            _pool_workers = processes
+        return _pool
+
+
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown()
+
+
+atexit.register(_shutdown_pool)
+
+
+def count_keywords(
+    texts: Iterable[str],
+    ngram_range: Tuple[int, int] = (2, 3),
+    processes: int | None = None,
+    batch_size: int = 20_000,
+) -> Counter:
+    """
+    统计关键词频次：按 batch_size 分批计数后合并
+    processes=None 时按数据量自动决定（超过 PARALLEL_THRESHOLD 条才用多进程），processes<=1 强制单进程；
+    多进程时复用模块级进程池
+    """
+    texts = [t for t in texts if t]
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(texts) >= PARALLEL_THRESHOLD else 1
+    total: Counter = Counter()
+    if processes <= 1:
+        for batch in _batches(texts, batch_size):
+            total.update(_count_batch((batch, ngram_range)))
+        return total
+    for c in _get_pool(processes).map(_count_batch, ((b, ngram_range) for b in _batches(texts, batch_size))):
+        total.update(c)
+    return total
+
+
+def record_titles(records: Iterable[Any]) -> Iterator[str]:
+    """
+    从记录中取标题：兼容 NewsItem（title）、爬虫 TopicItem（keyword/title）与适配后的记录（topic）
+    输入也可以是 newsnow.json 那样按平台分组的 {platform: [items]} 结构
+    """
+    if isinstance(records, dict):
+        for items in records.values():
+            yield from record_titles(items)
+        return
+    for r in records:
+        if isinstance(r, dict):
+            t = r.get("title") or r.get("topic") or r.get("keyword")
+        else:
+            t = getattr(r, "title", None)
+        if isinstance(t, str) and t:
+            yield t
+
+
+class _SnapshotKeywordCache:
+    """
+    快照级关键词频次缓存，键为 (path, mtime_ns, size, ngram_range)
+    内存 LRU + 磁盘 JSON（DATA_ROOT/.index/keywords/），进程重启后仍可复用
+    磁盘上每个 (path, ngram_range) 只有一个文件，内容带快照身份：快照变化后新结果覆盖旧结果；
+    文件数超过 disk_max 时删除最久未写入的
+    """
+
+    def __init__(self, maxsize: int = 16, disk_max: int = DISK_CACHE_MAX):
+        self.maxsize = maxsize
+        self.disk_max = disk_max
+        self._mem: "OrderedDict[tuple, Counter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_dir(self) -> str:
+        return os.path.join(get_settings().DATA_ROOT, ".index", "keywords")
+
+    def _disk_path(self, key: tuple) -> str:
+        path, _, _, ngram_range = key
+        digest = hashlib.sha1(repr((path, ngram_range)).encode("utf-8")).hexdigest()
+        return os.path.join(self._disk_dir(), f"{digest}.json")
+
+    def get(self, key: tuple) -> Counter | None:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(doc, dict) or doc.get("identity") != list(key[1:3]):
+            return None
+        c = Counter(doc.get("counts") or {})
+        self._put_mem(key, c)
+        return c
+
+    def put(self, key: tuple, c: Counter) -> None:
+        self._put_mem(key, c)
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"identity": list(key[1:3]), "counts": c}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._prune()
+        except OSError:
+            pass
+
+    def _prune(self) -> None:
+        with os.scandir(self._disk_dir()) as it:
+            files = [(e.stat().st_mtime_ns, e.path) for e in it if e.name.endswith(".json")]
+        if len(files) <= self.disk_max:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.disk_max]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _put_mem(self, key: tuple, c: Counter) -> None:
+        with self._lock:
+            self._mem[key] = c
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.maxsize:
+                self._mem.popitem(last=False)
+
+
+_cache = _SnapshotKeywordCache()
+
+
+def snapshot_keyword_freq(path: str, ngram_range: Tuple[int, int] = (2, 3), processes: int | None = None, records: Any = None) -> Counter:
+    """
+    统计单个快照文件（.json 数组或 .jsonl）中所有标题的关键词频次，结果按文件身份缓存
+    调用方已读出文件内容时可通过 records 传入，未命中缓存时不再重新读取文件
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size, tuple(ngram_range))
+    cached = _cache.get(key)
+    metrics.cache_result("keywords", cached is not None)
+    if cached is not None:
+        return cached
+    data = records
+    if data is None:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                data = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
+    c = count_keywords(record_titles(data), ngram_range, processes=processes)
+    _cache.put(key, c)
+    return c
+
+
+def keyword_freq_for_paths(paths: Sequence[str], top_k: int = 50, ngram_range: Tuple[int, int] = (2, 3)) -> Dict[str, int]:
+    """合并多个快照的关键词频次并取前 top_k，输出可直接填入 Metrics.keyword_freq"""
+    total: Counter = Counter()
+    for p in paths:
+        total.update(snapshot_keyword_freq(p, ngram_range))
+    return dict(total.most_common(top_k))
+
+
+def fill_keyword_freq(records: List[Dict[str, Any]], counts: Counter, ngram_range: Tuple[int, int] = (2, 3), top_k: int = RECORD_KEYWORDS) -> None:
+    """
+    为已适配记录填充 metrics.keyword_freq：记录标题中的关键词及其在整个快照中的出现次数（按次数取前 top_k）
+    counts 为同一快照的 snapshot_keyword_freq / count_keywords 结果
+    """
+    for rec in records:
+        title = rec.get("topic")
+        if not isinstance(title, str) or not title:
+            continue
+        freq = [(t, counts[t]) for t in dict.fromkeys(tokenize(title, ngram_range))]
+        freq.sort(key=lambda kv: -kv[1])
+        rec["metrics"]["keyword_freq"] = dict(freq[:top_k])
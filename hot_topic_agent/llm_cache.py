@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from .config import get_settings
+
+
+def prompt_key(model: str, prompt: str, temperature: float) -> str:
+    """缓存键：模型、温度与提示词全文的摘要"""
+    raw = json.dumps([model, float(temperature), prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    模型调用的持久化缓存（SQLite），(model, prompt, temperature) -> 模型返回的原始文本
+    - 超过 ttl 秒的条目视为过期，读取时删除
+    - 条目数超过 max_entries 时按最近访问时间淘汰最旧的条目
+    默认位于 DATA_ROOT/.index/llm_cache.sqlite，进程重启后仍可命中
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10_000, ttl: float = 7 * 24 * 3600):
+        self.path = path or os.path.join(get_settings().DATA_ROOT, ".index", "llm_cache.sqlite")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS prompts (
+                key TEXT PRIMARY KEY, model TEXT, temperature REAL, prompt TEXT, response TEXT,
+                stored_at REAL, accessed_at REAL);
+            CREATE INDEX IF NOT EXISTS ix_prompts_accessed ON prompts(accessed_at);
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def get(self, model: str, prompt: str, temperature: float) -> Optional[str]:
+        key = prompt_key(model, prompt, temperature)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, stored_at FROM prompts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM prompts WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE prompts SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, model: str, prompt: str, temperature: float, response: str) -> None:
+        key = prompt_key(model, prompt, temperature)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO prompts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, float(temperature), prompt, response, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        n = self._db.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+        if n > self.max_entries:
+            self._db.execute(
+                "DELETE FROM prompts WHERE key IN (SELECT key FROM prompts ORDER BY accessed_at LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+
+_cache: Optional[PromptCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> Optional[PromptCache]:
+    """进程内共享的缓存实例（按当前 DATA_ROOT 打开）；LLM_CACHE_TTL <= 0 或目录不可写时返回 None"""
+    global _cache
+    s = get_settings()
+    if s.LLM_CACHE_TTL <= 0:
+        return None
+    with _cache_lock:
+        path = os.path.join(s.DATA_ROOT, ".index", "llm_cache.sqlite")
+        if _cache is None or _cache.path != path:
+            try:
+                _cache = PromptCache(path, ttl=s.LLM_CACHE_TTL)
+            except (OSError, sqlite3.Error):
+                return None
+        _cache.ttl = s.LLM_CACHE_TTL
+        return _cache
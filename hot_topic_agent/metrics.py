@@ -0,0 +1,81 @@
+import sys
+import json
+import time
+import logging
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+from .config import get_settings
+
+# 默认直方图分桶（秒），覆盖 1ms ~ 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 报告链路指标的独立注册表（不含 prometheus_client 默认的进程/GC 指标）
+REGISTRY = CollectorRegistry()
+
+
+def render() -> bytes:
+    """Prometheus 文本格式（0.0.4），/metrics 接口直接返回"""
+    return generate_latest(REGISTRY)
+
+
+def sample(name: str, **labels) -> float:
+    """读取一个样本的当前值（如 agent_cache_total, cache="report", result="hit"），未记录过时为 0"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+# ---- 结构化日志（Settings.METRICS_LOG 开启；关闭时 log_event 只有一次配置判断） ----
+
+_logger = logging.getLogger("hot_topic_agent")
+
+
+def _ensure_handler() -> None:
+    if not _logger.handlers:
+        h = logging.StreamHandler(sys.stderr)
+        h.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(h)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+
+
+def log_event(event: str, **fields) -> None:
+    """开启 METRICS_LOG 时每个事件以一行 JSON 写到 hot_topic_agent logger（未配置 handler 时输出到 stderr）"""
+    if not get_settings().METRICS_LOG:
+        return
+    _ensure_handler()
+    fields["event"] = event
+    fields["ts"] = round(time.time(), 3)
+    _logger.info(json.dumps(fields, ensure_ascii=False, default=str))
+
+
+# ---- 报告链路指标 ----
+
+STAGE_SECONDS = Histogram("agent_stage_seconds", "Report pipeline stage duration", ("stage",), buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+CACHE = Counter("agent_cache_total", "Cache lookups by cache and result", ("cache", "result"), registry=REGISTRY)
+LLM_REQUESTS = Counter("agent_llm_requests_total", "Prompts sent to the model by result", ("result",), registry=REGISTRY)
+HTTP_REQUESTS = Counter("agent_http_requests_total", "API requests by path and status", ("path", "status"), registry=REGISTRY)
+HTTP_SECONDS = Histogram("agent_http_request_seconds", "API request duration (until response start)", ("path",), buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+
+
+class _Stage:
+    __slots__ = ("name", "child", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.child = STAGE_SECONDS.labels(name)
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.start
+        self.child.observe(elapsed)
+        log_event("stage", stage=self.name, elapsed_ms=round(elapsed * 1000, 2), ok=exc[0] is None)
+
+
+def stage(name: str) -> _Stage:
+    """阶段计时：写入 agent_stage_seconds{stage=name}，并按配置输出结构化日志"""
+    return _Stage(name)
+
+
+def cache_result(cache: str, hit: bool) -> None:
+    CACHE.labels(cache, "hit" if hit else "miss").inc()
@@ -9,7 +9,7 @@ class Metrics(BaseModel):
     work_count: Optional[int] = None  # 作品数量
     top_creator_ratio: Optional[float] = None  # 头部创作者占比
     published_at: Optional[datetime] = None  # 发布时间
-    view_growth_24h: Optional[float] = None  # 24小时浏览量增长率
+    view_growth_24h: Optional[float] = None  # 24小时浏览量增长率（由 timeseries 索引回填）
     keyword_freq: Optional[Dict[str, int]] = None  # 关键词频率统计
 
 # 话题记录模型，代表一个热搜话题的完整信息
@@ -1,20 +1,60 @@
-from typing import Dict, List
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from typing import Dict, Iterator, List
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 import os
+import threading
+from .config import get_settings
+
+# 模板文件目录
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# 流式渲染时合并小片段，每次输出至少这么多字符
+CHUNK_CHARS = 8192
+
+# 模块级的 Jinja2 环境：模板只编译一次并缓存在环境中；
+# 生产环境不检查模板文件是否变化，APP_ENV=development 时每次取模板都检查修改时间并自动重新编译
+_env: Environment | None = None
+_env_lock = threading.Lock()
+
+
+def _environment() -> Environment:
+    global _env
+    dev = get_settings().APP_ENV == "development"
+    with _env_lock:
+        if _env is None or _env.auto_reload != dev:
+            _env = Environment(
+                loader=FileSystemLoader(TEMPLATE_DIR),
+                autoescape=select_autoescape(),
+                auto_reload=dev,
+                cache_size=-1,
+            )
+        return _env
+
+
+def get_template(name: str = "report.md.jinja") -> Template:
+    """从模板注册表取已编译的模板"""
+    return _environment().get_template(name)
+
 
 def render_markdown(topic: str, summary: Dict, titles: List[str]) -> str:
     """
     渲染Markdown报告模板
     使用Jinja2模板引擎，将数据渲染成Markdown格式的报告
     """
-    # 构建模板文件目录路径
-    base = os.path.join(os.path.dirname(__file__), "templates")
-
-    # 创建Jinja2环境，配置模板加载器和自动转义
-    env = Environment(loader=FileSystemLoader(base), autoescape=select_autoescape())
+    return get_template().render(topic=topic, summary=summary, titles=titles)
 
-    # 获取报告模板
-    tpl = env.get_template("report.md.jinja")
 
-    # 渲染模板，传入数据并返回最终的Markdown字符串
-    return tpl.render(topic=topic, summary=summary, titles=titles)
\ No newline at end of file
+def stream_markdown(topic: str, summary: Dict, titles: List[str], chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    """
+    流式渲染报告：基于 Template.generate() 逐段产出，相邻小片段合并到约 chunk_chars 个字符再输出
+    拼接结果与 render_markdown 相同，调用方无需在内存中持有完整报告
+    """
+    buf: List[str] = []
+    size = 0
+    for part in get_template().generate(topic=topic, summary=summary, titles=titles):
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_chars:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
@@ -0,0 +1,76 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from .config import get_settings
+from . import metrics
+
+
+class ReportCache:
+    """
+    已完成报告的 TTL + LRU 缓存，附带 single-flight 合并：
+    - 命中且未过期时直接返回
+    - 同一键已有计算在进行时，后到的请求等待同一个任务，不重复加载数据或调用模型
+    - 计算失败不缓存，所有等待者收到同一个异常
+    计算以独立任务运行并用 shield 等待，发起请求的客户端断开不会取消其他等待者共享的计算
+    ttl 为 None 时每次写入读取 Settings.REPORT_CACHE_TTL；ttl <= 0 表示不缓存（仍合并并发请求）
+    """
+
+    def __init__(self, ttl: float | None = None, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _ttl(self) -> float:
+        return self.ttl if self.ttl is not None else get_settings().REPORT_CACHE_TTL
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        ttl = self._ttl()
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            metrics.CACHE.labels("report", "hit").inc()
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            metrics.CACHE.labels("report", "coalesced").inc()
+        else:
+            self.misses += 1
+            metrics.CACHE.labels("report", "miss").inc()
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
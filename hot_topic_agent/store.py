@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .config import get_settings
+from .timeseries import _epoch, item_key
+
+# 与 topic-crawler/src/store.py 共用的表结构与迁移：两个包互不依赖，改动时需同步修改（hot_topic_agent/tests/test_tools.py 检查两份一致）
+# batches 每次写入（一个平台的一次抓取或一次导入）一行，条目通过 batch_id 归属批次，
+# 批次内各条目的 fetch_time 可以不同；batches.fetch_time 为批次内最大的 fetch_time
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    fetch_time REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY,
+    batch_id INTEGER NOT NULL,
+    platform TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    topic TEXT,
+    url TEXT,
+    rank INTEGER,
+    views REAL,
+    like_rate REAL,
+    publish_time TEXT,
+    fetch_time REAL NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (platform, item_id, fetch_time));
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_batches_platform_fetch ON batches(platform, fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_batch ON items(batch_id);
+CREATE INDEX IF NOT EXISTS ix_items_platform_fetch ON items(platform, fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_fetch ON items(fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_item_id ON items(item_id);
+CREATE INDEX IF NOT EXISTS ix_items_topic ON items(topic);
+"""
+
+
+def _migrate(db: sqlite3.Connection) -> None:
+    """旧库没有 batch_id 时补列，并把每个 (platform, fetch_time) 记为一个批次"""
+    if any(r[1] == "batch_id" for r in db.execute("PRAGMA table_info(items)")):
+        return
+    db.executescript("""
+        BEGIN;
+        ALTER TABLE items ADD COLUMN batch_id INTEGER NOT NULL DEFAULT 0;
+        INSERT INTO batches (platform, fetch_time) SELECT DISTINCT platform, fetch_time FROM items ORDER BY fetch_time;
+        UPDATE items SET batch_id = (
+            SELECT b.batch_id FROM batches b WHERE b.platform = items.platform AND b.fetch_time = items.fetch_time);
+        COMMIT;
+    """)
+
+
+BATCH_SIZE = 5000
+
+
+def store_path(data_root: Optional[str] = None) -> str:
+    return os.path.join(data_root or get_settings().DATA_ROOT, "items.sqlite")
+
+
+def _num(v: Any) -> Optional[float]:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+
+def _text(v: Any) -> Optional[str]:
+    return v if isinstance(v, str) and v else None
+
+
+def _day_range(date: str) -> Tuple[float, float]:
+    start = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+
+class ItemStore:
+    """
+    条目库（SQLite，DATA_ROOT/items.sqlite）：每次抓取的每个条目一行，原始记录以 JSON 保存在 data 列
+    - 每次 insert 是一个批次（batches 表），批次按 batch_id 读取，不依赖条目的 fetch_time 是否一致
+    - 索引：(platform, fetch_time) 与 fetch_time 支撑按平台/全平台的时间窗口查询，item_id 与 topic 支撑单条目/话题查询
+    - (platform, item_id, fetch_time) 唯一，同一批次重复写入会被忽略
+    - 写入按 batch_size 分批 executemany，整个批次一个事务，未提交的批次对读取方不可见
+    爬虫与分析侧可同时打开（WAL），读不阻塞写
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or store_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        _migrate(self._db)
+        self._db.executescript(INDEXES)
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ---- 写入 ----
+
+    def insert(self, platform: str, records: Iterable[Dict[str, Any]], fetch_time: Optional[float] = None, batch_size: int = BATCH_SIZE) -> int:
+        """
+        把一次抓取的记录作为一个批次批量写入，返回新写入的行数（全部重复时不产生批次）
+        记录自带 fetch_time/fetched_at/crawl_time 时以其为准，否则使用 fetch_time（默认当前时间）；
+        排名缺失时按记录在批次中的位置补齐
+        """
+        default_ts = fetch_time if fetch_time is not None else time.time()
+        # 批次行、全部条目与批次的最终 fetch_time 在同一个事务内写入：读取方只会看到完整的批次
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                batch_id = self._db.execute("INSERT INTO batches (platform, fetch_time) VALUES (?, ?)", (platform, default_ts)).lastrowid
+                added = 0
+                batch: List[tuple] = []
+                for idx, rec in enumerate(records, start=1):
+                    if not isinstance(rec, dict):
+                        continue
+                    # 与时序索引相同的条目键，跨快照关联同一条目
+                    item_id = item_key(rec)
+                    if not item_id:
+                        continue
+                    ts = _epoch(rec.get("fetch_time") or rec.get("fetched_at") or rec.get("crawl_time"))
+                    rank = rec.get("rank")
+                    batch.append((
+                        batch_id, platform, item_id,
+                        _text(rec.get("keyword")) or _text(rec.get("topic")) or _text(rec.get("title")),
+                        _text(rec.get("url")),
+                        rank if isinstance(rank, int) and not isinstance(rank, bool) else idx,
+                        _num(rec.get("views")), _num(rec.get("like_rate")),
+                        _text(rec.get("publish_time")),
+                        ts if ts is not None else default_ts,
+                        json.dumps(rec, ensure_ascii=False),
+                    ))
+                    if len(batch) >= batch_size:
+                        added += self._write(batch)
+                        batch = []
+                if batch:
+                    added += self._write(batch)
+                self._close_batch(batch_id, added)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return added
+
+    def _close_batch(self, batch_id: int, added: int) -> None:
+        if added:
+            self._db.execute(
+                "UPDATE batches SET fetch_time = (SELECT MAX(fetch_time) FROM items WHERE batch_id = ?) WHERE batch_id = ?",
+                (batch_id, batch_id),
+            )
+        else:
+            self._db.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+
+    def _write(self, rows: List[tuple]) -> int:
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO items (batch_id, platform, item_id, topic, url, rank, views, like_rate, publish_time, fetch_time, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return self._db.total_changes - before
+
+    # ---- 查询 ----
+
+    def query(
+        self,
+        platform: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        max_rank: Optional[int] = None,
+        item_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        条件查询，返回原始记录（按 fetch_time 降序、rank 升序）
+        since/until 为 epoch 秒；topic 为精确匹配（走 topic 索引）
+        """
+        sql = "SELECT data FROM items WHERE 1 = 1"
+        args: list = []
+        for cond, value in (
+            ("platform = ?", platform), ("fetch_time >= ?", since), ("fetch_time < ?", until),
+            ("rank <= ?", max_rank), ("item_id = ?", item_id), ("topic = ?", topic),
+        ):
+            if value is not None:
+                sql += " AND " + cond
+                args.append(value)
+        sql += " ORDER BY fetch_time DESC, rank"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self._lock:
+            return [json.loads(r[0]) for r in self._db.execute(sql, args)]
+
+    def latest_batch(self, platform: str, date: Optional[str] = None) -> Optional[Tuple[int, float]]:
+        """平台最近一个批次的 (batch_id, fetch_time)；指定日期（UTC）时只在当天范围内查找"""
+        sql = "SELECT batch_id, fetch_time FROM batches WHERE platform = ?"
+        args: list = [platform]
+        if date:
+            start, end = _day_range(date)
+            sql += " AND fetch_time >= ? AND fetch_time < ?"
+            args += [start, end]
+        with self._lock:
+            row = self._db.execute(sql + " ORDER BY fetch_time DESC, batch_id DESC LIMIT 1", args).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def batch_identity(self, batch_id: int) -> Tuple[int, int]:
+        """批次的 (行数, 最大 seq)，可作为派生结果的缓存键"""
+        with self._lock:
+            row = self._db.execute("SELECT COUNT(*), MAX(seq) FROM items WHERE batch_id = ?", (batch_id,)).fetchone()
+        return int(row[0]), int(row[1] or 0)
+
+    def batch(self, batch_id: int) -> List[Dict[str, Any]]:
+        """一个批次的全部记录，按写入顺序"""
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM items WHERE batch_id = ? ORDER BY seq", (batch_id,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def view_growth(self, platform: str, item_id: str, at: float, window: float = 24 * 3600) -> Optional[float]:
+        """与 TimeSeriesIndex.view_growth 同口径：at 时刻的播放量相对 window 秒前最近一次观测的增长率"""
+        sql = ("SELECT views FROM items WHERE item_id = ? AND platform = ? AND fetch_time <= ? AND views IS NOT NULL "
+               "ORDER BY fetch_time DESC LIMIT 1")
+        with self._lock:
+            cur = self._db.execute(sql, (item_id, platform, at)).fetchone()
+            prev = self._db.execute(sql, (item_id, platform, at - window)).fetchone()
+        if not cur or not prev or not prev[0]:
+            return None
+        return (cur[0] - prev[0]) / prev[0]
+
+    def view_growth_batch(self, platform: str, item_ids: Iterable[str], at: float, window: float = 24 * 3600, chunk: int = 500) -> Dict[str, float]:
+        """
+        与 view_growth 同口径的批量版本：{item_id: 增长率}（无法计算的条目不出现）
+        每 chunk 个 item_id 一次 IN 查询取出 at 之前的全部播放量观测，在内存中计算，不逐条查询
+        """
+        series: Dict[str, Tuple[List[float], List[float]]] = {}
+        ids = list(dict.fromkeys(i for i in item_ids if i))
+        for i in range(0, len(ids), chunk):
+            part = ids[i:i + chunk]
+            sql = ("SELECT item_id, fetch_time, views FROM items WHERE platform = ? AND fetch_time <= ? AND views IS NOT NULL "
+                   "AND item_id IN (%s) ORDER BY item_id, fetch_time" % ",".join("?" * len(part)))
+            with self._lock:
+                rows = self._db.execute(sql, [platform, at, *part]).fetchall()
+            for key, ts, views in rows:
+                s = series.setdefault(key, ([], []))
+                s[0].append(ts)
+                s[1].append(views)
+        out: Dict[str, float] = {}
+        for key, (ts, views) in series.items():
+            # 当前值为 at 之前最近一次观测，基数为 at - window 之前最近一次观测
+            j = bisect_right(ts, at - window) - 1
+            if j >= 0 and views[j]:
+                out[key] = (views[-1] - views[j]) / views[j]
+        return out
+
+    def import_snapshot(self, platform: str, path: str) -> int:
+        """导入一个 JSON 数组快照；记录没有抓取时间时以文件修改时间作为该批次的 fetch_time"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return self.insert(platform, data if isinstance(data, list) else [], fetch_time=os.path.getmtime(path))
+
+
+_store: Optional[ItemStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store(create: bool = False) -> Optional[ItemStore]:
+    """
+    进程内共享的条目库（按当前 DATA_ROOT 打开）
+    ITEM_STORE 关闭、或库文件不存在且 create=False 时返回 None，调用方退回 JSON 快照
+    """
+    global _store
+    s = get_settings()
+    if not s.ITEM_STORE:
+        return None
+    path = store_path(s.DATA_ROOT)
+    with _store_lock:
+        if _store is not None and _store.path == path:
+            return _store
+        if not create and not os.path.exists(path):
+            return None
+        _store = ItemStore(path)
+        return _store
+
+
+def main(argv: List[str]) -> int:
+    """python -m hot_topic_agent.store <platform> <snapshot.json>...：把已有 JSON 快照导入条目库"""
+    if len(argv) < 2:
+        print("usage: python -m hot_topic_agent.store <platform> <snapshot.json>...", file=sys.stderr)
+        return 2
+    store = ItemStore(store_path())
+    platform = argv[0]
+    for p in argv[1:]:
+        print(f"{p}: {store.import_snapshot(platform, p)}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
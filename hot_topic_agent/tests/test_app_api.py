@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from hot_topic_agent import app_api, config
+from hot_topic_agent.report_cache import ReportCache
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "_settings", config.Settings(DATA_ROOT=str(tmp_path), TIMESERIES_INDEX=False))
+    monkeypatch.setattr(app_api, "_report_cache", ReportCache())
+    base = tmp_path / "bilibili"
+    base.mkdir()
+    (base / "2025-11-20.json").write_text(json.dumps([{"keyword": "露营", "views": 10, "like_rate": 0.1}], ensure_ascii=False), encoding="utf-8")
+    return base
+
+
+def test_report_cache_single_flight_and_ttl():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"n": len(calls)}
+
+    async def main():
+        cache = ReportCache(ttl=60)
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(20)))
+        assert len(calls) == 1 and all(r is results[0] for r in results)
+        assert (cache.misses, cache.coalesced) == (1, 19)
+        assert await cache.get_or_compute("k", compute) is results[0] and cache.hits == 1
+
+        expired = ReportCache(ttl=0)
+        await expired.get_or_compute("k", compute)
+        await expired.get_or_compute("k", compute)
+        assert len(calls) == 3
+
+        async def boom():
+            raise RuntimeError("llm down")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("e", boom)
+        assert cache.get("e") is None and not cache._inflight
+
+    asyncio.run(main())
+
+
+def test_report_cached_until_snapshot_changes(data_root, monkeypatch):
+    calls = []
+    summarize = app_api._summarize
+    monkeypatch.setattr(app_api, "_summarize", lambda date: calls.append(date) or summarize(date))
+    client = TestClient(app_api.app)
+
+    first = client.post("/report", json={"topic": "户外", "date": "2025-11-20"}).json()
+    assert first["summary"]["count"] == 1 and first["titles"] == []
+    assert client.post("/report", json={"topic": "户外", "date": "2025-11-20"}).json() == first
+    assert len(calls) == 1
+
+    client.post("/report", json={"topic": "旅行", "date": "2025-11-20"})
+    assert len(calls) == 2
+
+    (data_root / "2025-11-20.json").write_text(json.dumps([{"keyword": "露营", "views": 10}] * 2, ensure_ascii=False), encoding="utf-8")
+    again = client.post("/report", json={"topic": "户外", "date": "2025-11-20"}).json()
+    assert len(calls) == 3 and again["summary"]["count"] == 2
+
+
+def test_app_import_is_light_and_health_works():
+    import subprocess
+
+    code = (
+        "import sys, hot_topic_agent.app_api as api\n"
+        "from fastapi.testclient import TestClient\n"
+        "assert TestClient(api.app).get('/health').json() == {'ok': True}\n"
+        "print(sorted(m for m in ('numpy', 'langchain_core', 'langchain_openai', 'jinja2') if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[2], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_agent_built_once_and_rebuilt_on_settings_change(monkeypatch):
+    from hot_topic_agent import agent_runner
+
+    built = []
+    monkeypatch.setattr(agent_runner, "build_agent", lambda: built.append(1) or object())
+    monkeypatch.setattr(config, "_settings", config.Settings(OPENAI_API_KEY="a"))
+    agent_runner.reset_agent()
+    first = agent_runner.get_agent()
+    assert agent_runner.get_agent() is first and len(built) == 1
+    monkeypatch.setattr(config, "_settings", config.Settings(OPENAI_API_KEY="a", MODEL_NAME="other"))
+    assert agent_runner.get_agent() is not first and len(built) == 2
+    agent_runner.reset_agent()
+
+
+def test_template_compiled_once_and_reloaded_in_development(tmp_path, monkeypatch):
+    from hot_topic_agent import report
+
+    (tmp_path / "report.md.jinja").write_text("v1 {{ topic }}", encoding="utf-8")
+    monkeypatch.setattr(report, "TEMPLATE_DIR", str(tmp_path))
+    monkeypatch.setattr(report, "_env", None)
+    monkeypatch.setattr(config, "_settings", config.Settings())
+    tpl = report.get_template()
+    assert report.get_template() is tpl and report.render_markdown("a", {}, []) == "v1 a"
+
+    (tmp_path / "report.md.jinja").write_text("v2 {{ topic }}!", encoding="utf-8")
+    assert report.render_markdown("a", {}, []) == "v1 a"
+
+    monkeypatch.setattr(config, "_settings", config.Settings(APP_ENV="development"))
+    assert report.render_markdown("a", {}, []) == "v2 a!"
+    path = tmp_path / "report.md.jinja"
+    path.write_text("v3 {{ topic }}", encoding="utf-8")
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 5))
+    assert report.render_markdown("a", {}, []) == "v3 a"
+    monkeypatch.setattr(report, "_env", None)
+
+
+def test_stream_markdown_matches_render_and_endpoint_is_chunked(data_root):
+    from hot_topic_agent.report import render_markdown, stream_markdown
+
+    summary = {"count": 3, "views_sum": 10, "like_rate_avg": 0.1, "keyword_freq": {f"词{i}": i for i in range(2000)}}
+    chunks = list(stream_markdown("户外", summary, ["标题"], chunk_chars=1024))
+    assert len(chunks) > 5 and all(len(c) >= 1024 for c in chunks[:-1])
+    assert "".join(chunks) == render_markdown("户外", summary, ["标题"])
+
+    client = TestClient(app_api.app)
+    body = {"topic": "户外", "date": "2025-11-20"}
+    with client.stream("POST", "/report/stream", json=body) as r:
+        assert r.headers["content-type"].startswith("text/markdown")
+        assert "content-length" not in r.headers
+        streamed = r.read().decode("utf-8")
+    assert streamed == client.post("/report", json=body).json()["markdown"]
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_report_events_emit_stats_before_slow_titles(data_root, monkeypatch):
+    from hot_topic_agent.tools import title_generator
+
+    monkeypatch.setattr(config, "_settings", config.Settings(DATA_ROOT=str(data_root.parent), TIMESERIES_INDEX=False, OPENAI_API_KEY="x"))
+    release = None
+
+    async def slow_titles(topic, context=None):
+        await release.wait()
+        return [f"{topic}标题"]
+
+    monkeypatch.setattr(title_generator, "agenerate_titles", slow_titles)
+
+    async def collect():
+        nonlocal release
+        release = asyncio.Event()
+        out = []
+        async for chunk in app_api._report_events(app_api.ReportRequest(topic="户外", date="2025-11-20")):
+            out.extend(_parse_sse(chunk))
+            if out[-1][1].get("stage") == "stat_summary":
+                # 统计结果已送达，而模型调用仍未返回
+                assert not release.is_set()
+                release.set()
+        return out
+
+    events = asyncio.run(collect())
+    stages = [d.get("stage") for _, d in events]
+    assert stages == ["load_bilibili_data", "stat_summary", "title_generator", "render_markdown", None]
+    assert events[0][1]["rows"] == 1 and events[1][1]["summary"]["count"] == 1
+    assert events[2][1]["titles"] == ["户外标题"] and "户外标题" in events[3][1]["markdown"]
+    assert events[-1][0] == "done" and all(d["elapsed_ms"] >= 0 for _, d in events)
+
+    # 完整结果写回缓存：/report 与再次请求事件流都直接命中
+    client = TestClient(app_api.app)
+    assert client.post("/report", json={"topic": "户外", "date": "2025-11-20"}).json()["titles"] == ["户外标题"]
+    r = client.post("/report/events", json={"topic": "户外", "date": "2025-11-20"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    cached = _parse_sse(r.text)
+    assert [d.get("cached") for _, d in cached[:2]] == [True, True]
+
+
+def test_metrics_endpoint_and_structured_logs(data_root, monkeypatch, capsys):
+    from hot_topic_agent import metrics
+
+    monkeypatch.setattr(config, "_settings", config.Settings(DATA_ROOT=str(data_root.parent), TIMESERIES_INDEX=False, METRICS_LOG=True))
+    monkeypatch.setattr(metrics._logger, "handlers", [])
+    hits = metrics.sample("agent_cache_total", cache="report", result="hit")
+    client = TestClient(app_api.app)
+    for _ in range(2):
+        client.post("/report", json={"topic": "户外", "date": "2025-11-20"})
+
+    r = client.get("/metrics")
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    for stage in ("load", "stats", "keywords", "render"):
+        assert f'agent_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'agent_http_requests_total{path="/report",status="200"}' in text
+    assert metrics.sample("agent_cache_total", cache="report", result="hit") == hits + 1
+
+    logged = [json.loads(line) for line in capsys.readouterr().err.splitlines() if line.startswith("{")]
+    assert {e["stage"] for e in logged if e["event"] == "stage"} >= {"load", "stats", "render"}
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from hot_topic_agent import config, llm_cache
+from hot_topic_agent.llm_cache import PromptCache
+from hot_topic_agent.tools import title_generator as tg
+
+
+class _FakeChatHandler(BaseHTTPRequestHandler):
+    """最小的 chat-completions 接口：回显提示词中的主题，记录请求数与最大并发"""
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with srv.lock:
+            srv.requests.append(body)
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+        time.sleep(srv.delay)
+        with srv.lock:
+            srv.active -= 1
+        prompt = body["messages"][-1]["content"]
+        topic = prompt[len("根据主题"):prompt.index("生成")]
+        payload = {
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"- {topic}标题一\n- {topic}标题二"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_llm(tmp_path, monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeChatHandler)
+    srv.requests, srv.active, srv.peak, srv.delay, srv.lock = [], 0, 0, 0.05, threading.Lock()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(config, "_settings", config.Settings(
+        DATA_ROOT=str(tmp_path), OPENAI_API_KEY="test", OPENAI_BASE_URL=f"http://127.0.0.1:{srv.server_port}/v1",
+    ))
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(tg, "_clients", {})
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_title_generator_reuses_client_and_caches(fake_llm, monkeypatch):
+    assert tg.title_generator.func(topic="露营") == ["露营标题一", "露营标题二"]
+    client = tg._llm()
+    assert tg.title_generator.func(topic="露营") == ["露营标题一", "露营标题二"]
+    assert len(fake_llm.requests) == 1 and tg._llm() is client
+
+    # 持久化：换一个缓存实例（模拟进程重启）仍然命中
+    llm_cache._cache = None
+    tg.title_generator.func(topic="露营")
+    assert len(fake_llm.requests) == 1
+
+    # 换提示词或换温度都不命中，换温度时请求也使用新的温度
+    assert tg.title_generator.func(topic="露营", context="周末") == ["露营标题一", "露营标题二"]
+    assert len(fake_llm.requests) == 2
+    monkeypatch.setattr(tg, "TEMPERATURE", 0.2)
+    tg.title_generator.func(topic="露营")
+    assert len(fake_llm.requests) == 3 and fake_llm.requests[-1]["temperature"] == 0.2
+
+
+def test_title_batch_concurrent_and_cached(fake_llm, monkeypatch):
+    tg.title_generator.func(topic="t0")
+    topics = [f"t{i}" for i in range(6)] + ["t1"]
+    out = tg.generate_titles_batch(topics, max_concurrency=4)
+    assert list(out) == [f"t{i}" for i in range(6)]
+    assert out["t3"] == ["t3标题一", "t3标题二"]
+    assert len(fake_llm.requests) == 6 and fake_llm.peak > 1
+
+    async def run():
+        return await tg.agenerate_titles_batch(["t2", "t9", "t10"])
+
+    # 异步路径的缓存读写不在事件循环线程上执行
+    threads = []
+    for name in ("_cached", "_store"):
+        orig = getattr(tg, name)
+        def wrapped(*a, _orig=orig):
+            threads.append(threading.current_thread())
+            return _orig(*a)
+        monkeypatch.setattr(tg, name, wrapped)
+    assert asyncio.run(run())["t10"] == ["t10标题一", "t10标题二"]
+    assert len(fake_llm.requests) == 8
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+
+def test_prompt_cache_eviction_and_ttl(tmp_path):
+    cache = PromptCache(str(tmp_path / "c.sqlite"), max_entries=3)
+    for i in range(3):
+        cache.put("m", f"p{i}", 0.7, f"r{i}")
+    assert cache.get("m", "p0", 0.7) == "r0"
+    assert cache.get("m", "p0", 0.0) is None and cache.get("other", "p0", 0.7) is None
+    time.sleep(0.01)
+    cache.put("m", "p3", 0.7, "r3")
+    assert len(cache) == 3
+    assert cache.get("m", "p1", 0.7) is None and cache.get("m", "p0", 0.7) == "r0"
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("m", "p0", 0.7) is None
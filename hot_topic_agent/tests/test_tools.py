@@ -0,0 +1,382 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from hot_topic_agent import config
+from hot_topic_agent.tools.fetch_bilibili import load_bilibili_data, load_bilibili_columns
+from hot_topic_agent.tools.stat_summary import stat_summary, summarize_columns
+
+RECORDS = [
+    {"keyword": "Citywalk", "platform": "bilibili", "views": 1200, "like_rate": 0.1, "publish_time": "2025-11-20T12:00:00Z"},
+    {"keyword": "露营", "views": 800.5, "like_rate": None, "publish_time": "2025-11-20T15:30:00"},
+    {"keyword": "徒步", "views": "n/a", "like_rate": 0.3},
+    {"keyword": "骑行", "views": None, "like_rate": 0.05, "publish_time": "bad"},
+]
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "_settings", config.Settings(DATA_ROOT=str(tmp_path)))
+    base = tmp_path / "bilibili"
+    base.mkdir()
+    (base / "2025-11-20.json").write_text(json.dumps(RECORDS, ensure_ascii=False), encoding="utf-8")
+    return base
+
+
+def test_columnar_summary_matches_record_summary(data_root):
+    expected = stat_summary.func(records=load_bilibili_data.func(date="2025-11-20"))
+    cols = load_bilibili_columns(date="2025-11-20")
+    assert set(cols) == {"views", "like_rate"}
+    assert summarize_columns(cols) == expected
+    assert (data_root / "2025-11-20.cols" / "meta.json").exists()
+
+
+def test_columnar_snapshot_reused_and_refreshed(data_root):
+    load_bilibili_columns()
+    cols = load_bilibili_columns(columns=("topic", "published_at"))
+    assert isinstance(cols["topic"], np.memmap)
+    assert list(cols["topic"]) == ["Citywalk", "露营", "徒步", "骑行"]
+    assert str(cols["published_at"][0]) == "2025-11-20T12:00:00"
+    assert np.isnat(cols["published_at"][3])
+
+    path = data_root / "2025-11-20.json"
+    path.write_text(json.dumps(RECORDS[:1]), encoding="utf-8")
+    os.utime(path, (1, 2_000_000_000))
+    assert summarize_columns(load_bilibili_columns())["count"] == 1
+
+
+def test_columnar_without_json_and_missing_data(data_root):
+    load_bilibili_columns(date="2025-11-20")
+    (data_root / "2025-11-20.json").unlink()
+    assert summarize_columns(load_bilibili_columns(date="2025-11-20"))["count"] == 4
+    assert summarize_columns(load_bilibili_columns(date="2025-01-01")) == {"count": 0, "views_sum": 0, "like_rate_avg": 0.0}
+
+
+def test_latest_snapshot_ignores_cols_conversion_time(data_root):
+    from hot_topic_agent.tools import fetch_bilibili as fb
+    from hot_topic_agent.tools.keyword_freq import keyword_freq
+
+    old = data_root / "2024-01-01.json"
+    old.write_text(json.dumps([{"keyword": "旧话题", "views": 1}], ensure_ascii=False), encoding="utf-8")
+    os.utime(old, (1, 1_000_000_000))
+    # 转换旧日期后 .cols 的修改时间最新，但未指定日期时仍应取最新的 JSON 快照
+    load_bilibili_columns(date="2024-01-01")
+    fb._index._dirs.clear()
+    assert fb.snapshot_identity()[0].endswith("2025-11-20")
+    assert summarize_columns(load_bilibili_columns())["count"] == 4
+    assert load_bilibili_data.func()[0]["topic"] == "Citywalk"
+    assert "旧话题" not in keyword_freq.func()
+
+
+def test_load_bilibili_data_cached_by_file_identity(data_root, monkeypatch):
+    from hot_topic_agent.tools import fetch_bilibili
+
+    fetch_bilibili._adapted_cache.clear()
+    monkeypatch.setattr(config._settings, "TIMESERIES_INDEX", False)
+    loads = []
+    real_load = json.load
+    # 只统计快照文件的读取（关键词磁盘缓存的读取不计）
+    monkeypatch.setattr(fetch_bilibili.json, "load", lambda f: (os.path.dirname(f.name) == str(data_root) and loads.append(f.name)) or real_load(f))
+
+    first = load_bilibili_data.func()
+    second = load_bilibili_data.func()
+    assert first == second and first is not second
+    assert len(loads) == 1
+
+    path = data_root / "2025-11-20.json"
+    path.write_text(json.dumps(RECORDS[:2], ensure_ascii=False), encoding="utf-8")
+    assert len(load_bilibili_data.func(date="2025-11-20")) == 2
+    assert len(loads) == 2
+
+    newer = data_root / "2025-11-21.json"
+    newer.write_text(json.dumps(RECORDS[:1]), encoding="utf-8")
+    os.utime(newer, (1, 2_000_000_000))
+    assert [r["topic"] for r in load_bilibili_data.func()] == ["Citywalk"]
+
+
+def test_grouped_stats_match_numpy_reference():
+    from hot_topic_agent.analytics import grouped_stats, top_records
+
+    rng = np.random.default_rng(0)
+    n = 5000
+    cols = {
+        "platform": rng.choice(["bilibili", "weibo", "zhihu"], n),
+        "topic": rng.choice([f"t{i}" for i in range(50)], n),
+        "views": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 10_000, n).astype(float)),
+        "like_rate": np.where(rng.random(n) < 0.1, np.nan, rng.random(n)),
+        "published_at": np.datetime64("2025-11-20T00:00:00") + rng.integers(0, 86400, n).astype("timedelta64[s]"),
+    }
+    groups = {g["key"]: g for g in grouped_stats(cols, by="platform")}
+    for key, g in groups.items():
+        m = cols["platform"] == key
+        v, lr = cols["views"][m], cols["like_rate"][m]
+        both = ~np.isnan(v) & ~np.isnan(lr)
+        assert g["count"] == m.sum()
+        assert g["views_sum"] == int(np.nansum(v))
+        assert g["views_p90"] == pytest.approx(np.nanpercentile(v, 90))
+        assert g["like_rate_median"] == pytest.approx(np.nanmedian(lr))
+        assert g["like_rate_weighted"] == pytest.approx((lr[both] * v[both]).sum() / v[both].sum())
+    hours = grouped_stats(cols, by="hour", top_n=5)
+    assert len(hours) == 5 and all(0 <= h["key"] < 24 for h in hours)
+    top = top_records(cols, n=3)
+    assert [t["views"] for t in top] == sorted(np.sort(cols["views"][~np.isnan(cols["views"])])[-3:], reverse=True)
+
+
+def test_stat_summary_contract_with_groups():
+    records = [
+        {"topic": "a", "platform": "bilibili", "metrics": {"views": 10, "like_rate": 0.2, "published_at": "2025-11-20T08:00:00"}},
+        {"topic": "b", "platform": "weibo", "views": 30, "like_rate": 0.4},
+        {"topic": "c", "platform": "bilibili", "metrics": {"views": None}},
+    ]
+    out = stat_summary.func(records=records)
+    assert out == {"count": 3, "views_sum": 40, "like_rate_avg": pytest.approx(0.3)}
+    grouped = stat_summary.func(records=records, group_by="platform")
+    assert [g["key"] for g in grouped["groups"]] == ["weibo", "bilibili"]
+    assert grouped["groups"][1]["count"] == 2
+
+    # 与列式 _number 一致：bool 与字符串不计入数值；时间整列解析与逐条 _timestamp 一致
+    from hot_topic_agent.analytics import records_to_columns
+    from hot_topic_agent.columnar import _timestamp
+    cols = records_to_columns([
+        {"views": True, "like_rate": "0.5", "publish_time": "2025-11-20T08:00:00Z"},
+        {"views": 5, "metrics": {"like_rate": 0.1, "published_at": "2025-11-20T16:00:00+08:00"}},
+        {"views": None, "publish_time": "2025-02-30"},
+    ])
+    assert np.isnan(cols["views"][0]) and cols["views"][1] == 5 and np.isnan(cols["like_rate"][0])
+    assert list(cols["published_at"][:2]) == [_timestamp("2025-11-20T08:00:00Z")] * 2 and np.isnat(cols["published_at"][2])
+
+
+def test_iter_json_array_small_chunks(tmp_path):
+    from hot_topic_agent.tools.fetch_bilibili import iter_json_array
+
+    items = [{"keyword": "含 ] 和 , 的\"标题\"", "views": 12345678901234, "nested": {"a": [1, 2, {"b": "}"}]}}, 7, "x", None]
+    path = tmp_path / "a.json"
+    path.write_text("﻿  [\n" + ",\n ".join(json.dumps(i, ensure_ascii=False) for i in items) + "\n]\n", encoding="utf-8")
+    for chunk_size in (1, 3, 7, 1 << 16):
+        assert list(iter_json_array(str(path), chunk_size=chunk_size)) == items
+    (tmp_path / "empty.json").write_text("[ ]", encoding="utf-8")
+    assert list(iter_json_array(str(tmp_path / "empty.json"))) == []
+    (tmp_path / "bad.json").write_text('[{"a": 1}, {"b":', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(tmp_path / "bad.json"), chunk_size=4))
+
+
+def test_streaming_summary_bounded_memory(data_root):
+    import tracemalloc
+    from hot_topic_agent.tools.fetch_bilibili import iter_bilibili_batches, iter_bilibili_records
+    from hot_topic_agent.tools.stat_summary import summarize_batches
+
+    big = [dict(RECORDS[i % 4], keyword=f"话题{i}", extra="x" * 200) for i in range(20000)]
+    (data_root / "2025-11-22.json").write_text(json.dumps(big, ensure_ascii=False), encoding="utf-8")
+    expected = stat_summary.func(records=load_bilibili_data.func(date="2025-11-22"))
+
+    tracemalloc.start()
+    got = summarize_batches(iter_bilibili_batches(date="2025-11-22", batch_size=500))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert got == pytest.approx(expected)
+    assert peak < 2_000_000
+    assert next(iter_bilibili_records(date="2025-11-22", drop_raw=True))["raw"] is None
+
+
+def test_timeseries_index_incremental_queries(tmp_path, monkeypatch):
+    from hot_topic_agent.timeseries import TimeSeriesIndex
+
+    base = tmp_path / "weibo"
+    base.mkdir()
+    day1 = [{"id": "a", "views": 100, "fetch_time": "2025-11-20T00:00:00Z"}, {"id": "b", "views": 50, "fetch_time": "2025-11-20T00:00:00Z"}]
+    (base / "2025-11-20.json").write_text(json.dumps(day1), encoding="utf-8")
+    index = TimeSeriesIndex(data_root=str(tmp_path))
+    assert index.update() == 2
+    assert index.update() == 0
+
+    log = base / "2025-11-21.jsonl"
+    log.write_text(json.dumps({"id": "b", "views": 80, "rank": 1, "fetch_time": "2025-11-21T01:00:00Z"}) + "\n", encoding="utf-8")
+    assert index.update() == 1
+    with log.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "a", "views": 150, "rank": 2, "fetch_time": "2025-11-21T02:00:00Z"}) + "\n")
+        # 爬虫调度器写入的掉榜记录不算观测
+        f.write(json.dumps({"id": "b", "prev_rank": 1, "change": "dropped", "fetch_time": "2025-11-21T02:00:00Z"}) + "\n")
+        f.write('{"id": "partial"')
+    assert index.update() == 1
+
+    assert index.view_growth_24h("weibo", "a") == pytest.approx(0.5)
+    assert index.view_growth_24h("weibo", "b") == pytest.approx(0.6)
+    assert index.view_growth_24h("weibo", "b", at=_ts("2025-11-20T12:00:00")) is None
+    assert [r for _, r in index.rank_history("weibo", "a")] == [1, 2]
+    assert index.seen_range("weibo", "b") == (_ts("2025-11-20T00:00:00"), _ts("2025-11-21T01:00:00"))
+    assert index.seen_range("weibo", "missing") is None
+
+    # 批量回填与逐条 view_growth_24h 结果一致，整批只查询一次
+    raws = [{"id": "a"}, {"id": "b"}, {"id": "b", "fetch_time": "2025-11-20T12:00:00Z"}, {"id": "missing"}, {}]
+    recs = [{"metrics": {"view_growth_24h": None}} for _ in raws]
+    queries = []
+    index._db.set_trace_callback(queries.append)
+    index.annotate_view_growth("weibo", raws, recs)
+    index._db.set_trace_callback(None)
+    assert [r["metrics"]["view_growth_24h"] for r in recs] == [pytest.approx(0.5), pytest.approx(0.6), None, None, None]
+    assert len(queries) == 1
+
+
+def _ts(s):
+    from datetime import datetime, timezone
+    return datetime.fromisoformat(s).replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_loader_fills_view_growth(data_root):
+    older = [{"id": "x", "keyword": "话题", "views": 100, "fetch_time": "2025-11-20T00:00:00Z"}]
+    newer = [{"id": "x", "keyword": "话题", "views": 300, "fetch_time": "2025-11-21T00:00:00Z"}]
+    (data_root / "2025-11-20.json").write_text(json.dumps(older), encoding="utf-8")
+    (data_root / "2025-11-21.json").write_text(json.dumps(newer), encoding="utf-8")
+    recs = load_bilibili_data.func(date="2025-11-21")
+    assert recs[0]["metrics"]["view_growth_24h"] == pytest.approx(2.0)
+    # 返回的是副本：调用方修改记录不会污染已适配结果的缓存
+    recs[0]["topic"] = "改"
+    recs[0]["metrics"]["view_growth_24h"] = None
+    again = load_bilibili_data.func(date="2025-11-21")
+    assert again[0]["topic"] == "话题" and again[0]["metrics"]["view_growth_24h"] == pytest.approx(2.0)
+
+
+def test_loader_growth_uses_snapshot_time_and_skips_broken_files(data_root):
+    # TopicItem 快照没有抓取时间：以文件修改时间为参考时间，加载旧日期时不取最新快照的播放量
+    for day, views in ((1, 100), (2, 200), (3, 800)):
+        path = data_root / f"2025-01-0{day}.json"
+        path.write_text(json.dumps([{"keyword": "话题", "views": views}], ensure_ascii=False), encoding="utf-8")
+        os.utime(path, (_ts(f"2025-01-0{day}T00:00:00"),) * 2)
+    # 其他截断/写到一半的快照不影响加载；.jsonl 中无法解析的整行被跳过
+    (data_root / "2025-01-04.json").write_text('[{"keyword": "话题", "vie', encoding="utf-8")
+    (data_root / "broken.jsonl").write_bytes(b'{"id": "z", "views": 1}\n\xff{oops\n{"id": "z", "views": 2}\n')
+    assert load_bilibili_data.func(date="2025-01-02")[0]["metrics"]["view_growth_24h"] == pytest.approx(1.0)
+    assert load_bilibili_data.func(date="2025-01-03")[0]["metrics"]["view_growth_24h"] == pytest.approx(3.0)
+
+
+def test_item_store_schema_matches_crawler_copy():
+    # 两个包各自保存一份条目库表结构与迁移（互不依赖），这里保证两份不会悄悄分叉
+    import ast
+    import inspect
+    from hot_topic_agent import store
+
+    crawler = ast.parse((Path(__file__).resolve().parents[2] / "topic-crawler" / "src" / "store.py").read_text(encoding="utf-8"))
+    nodes = {
+        n.targets[0].id: ast.literal_eval(n.value) for n in crawler.body
+        if isinstance(n, ast.Assign) and getattr(n.targets[0], "id", None) in ("SCHEMA", "INDEXES")
+    }
+    assert nodes["SCHEMA"] == store.SCHEMA and nodes["INDEXES"] == store.INDEXES
+    migrate = next(n for n in crawler.body if isinstance(n, ast.FunctionDef) and n.name == "_migrate")
+    assert ast.dump(migrate) == ast.dump(ast.parse(inspect.getsource(store._migrate)).body[0])
+
+
+def test_keyword_tokenize_and_parallel_count():
+    from hot_topic_agent.keywords import tokenize, count_keywords
+
+    assert tokenize("iPhone 17发布会 的 C++ 2025") == ["iphone", "发布", "布会", "发布会", "c++"]
+    titles = ["在日中国游客提前回国 机场仿佛春运", "美官员：乌克兰同意和平协议", "Citywalk 城市漫步攻略"] * 50
+    serial = count_keywords(titles, processes=1, batch_size=7)
+    assert count_keywords(titles, processes=2, batch_size=20) == serial
+    # 多进程计数复用同一个模块级进程池
+    from hot_topic_agent import keywords
+    pool = keywords._pool
+    assert count_keywords(titles, processes=2, batch_size=20) == serial and keywords._pool is pool
+    assert serial["citywalk"] == 50 and serial["协议"] == 50 and "和平" not in serial
+
+
+def test_keyword_freq_tool_cached_per_snapshot(data_root, monkeypatch):
+    from hot_topic_agent import keywords
+    from hot_topic_agent.tools.keyword_freq import keyword_freq
+
+    (data_root / "2025-11-23.json").write_text(
+        json.dumps([{"keyword": "城市漫步"}, {"keyword": "城市露营"}, {"title": "City walk"}], ensure_ascii=False), encoding="utf-8"
+    )
+    freq = keyword_freq.func(date="2025-11-23", top_k=3)
+    assert list(freq.items())[0] == ("城市", 2)
+
+    keywords._cache._mem.clear()
+    count = keywords.count_keywords
+    monkeypatch.setattr(keywords, "count_keywords", lambda *a, **k: pytest.fail("recounted"))
+    assert keyword_freq.func(date="2025-11-23", top_k=3) == freq
+    assert keyword_freq.func(date="2025-01-01") == {}
+    # 加载器复用同一份快照计数，为每条记录填充标题关键词在快照中的频次
+    recs = load_bilibili_data.func(date="2025-11-23")
+    assert recs[0]["metrics"]["keyword_freq"] == {"城市": 2, "市漫": 1, "漫步": 1, "城市漫": 1, "市漫步": 1}
+    assert recs[2]["metrics"]["keyword_freq"] is None
+    monkeypatch.setattr(keywords, "count_keywords", count)
+
+    # 快照重写后新结果覆盖旧结果，磁盘上每个快照只保留一份；超过上限时删除最旧的
+    cache_dir = data_root.parent / ".index" / "keywords"
+    snap = data_root / "2025-11-23.json"
+    snap.write_text(json.dumps([{"keyword": "城市骑行"}], ensure_ascii=False), encoding="utf-8")
+    os.utime(snap, ns=(snap.stat().st_mtime_ns + 10**9,) * 2)
+    assert keyword_freq.func(date="2025-11-23", top_k=1) == {"城市": 1}
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    monkeypatch.setattr(keywords._cache, "disk_max", 2)
+    for day in (24, 25, 26):
+        (data_root / f"2025-11-{day}.json").write_text(json.dumps([{"keyword": f"话题{day}"}], ensure_ascii=False), encoding="utf-8")
+        keyword_freq.func(date=f"2025-11-{day}")
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_item_store_indexed_queries_and_loader(data_root):
+    from hot_topic_agent.store import ItemStore, store_path, get_store
+    from hot_topic_agent.tools.fetch_bilibili import snapshot_identity, iter_bilibili_records
+    from hot_topic_agent.tools.keyword_freq import keyword_freq
+    from hot_topic_agent.tools.query_items import query_items
+
+    store = ItemStore(store_path())
+    base = _ts("2025-11-20T00:00:00")
+    rows = [{"id": f"x{i % 50}", "title": f"标题{i % 50}", "rank": i % 50 + 1, "fetch_time": base + (i // 50) * 600} for i in range(5000)]
+    assert store.insert("weibo", rows, batch_size=512) == 5000
+    assert store.insert("weibo", rows[:100]) == 0
+    hits = store.query(platform="weibo", since=base + 94 * 600, max_rank=20)
+    assert len(hits) == 6 * 20 and hits[0]["fetch_time"] == base + 99 * 600
+    assert [r["id"] for r in store.query(item_id="x7", limit=3)] == ["x7"] * 3
+    assert len(store.query(topic="标题3")) == 100
+    plan = " ".join(str(r) for r in store._db.execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM items WHERE platform = ? AND fetch_time >= ? AND rank <= ?", ("weibo", base, 20)))
+    assert "ix_items_platform_fetch" in plan
+    plan = " ".join(str(r) for r in store._db.execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM items WHERE fetch_time >= ? AND rank <= ?", (base, 20)))
+    assert "ix_items_fetch" in plan
+
+    # JSON 快照比条目库新时仍读 JSON；条目库中有更新的批次后加载器改为从库中读取
+    assert get_store() is not None
+    assert load_bilibili_data.func(date="2025-11-20")[0]["topic"] == "Citywalk"
+    later = os.path.getmtime(data_root / "2025-11-20.json") + 60
+    batch = [{"keyword": "城市漫步", "views": 300}, {"keyword": "城市露营", "views": 100}]
+    store.insert("bilibili", [{"keyword": "城市漫步", "views": 100}], fetch_time=later - 86400)
+    store.insert("bilibili", batch, fetch_time=later)
+    queries = []
+    get_store()._db.set_trace_callback(queries.append)
+    recs = load_bilibili_data.func()
+    get_store()._db.set_trace_callback(None)
+    assert [r["topic"] for r in recs] == ["城市漫步", "城市露营"]
+    assert sum("views IS NOT NULL" in q for q in queries) == 1
+    assert recs[0]["metrics"]["view_growth_24h"] == pytest.approx(2.0)
+    assert list(recs[1]["metrics"]["keyword_freq"].items())[0] == ("城市", 2)
+    assert load_bilibili_columns(columns=("views",))["views"].tolist() == [300.0, 100.0]
+    assert [r["topic"] for r in iter_bilibili_records(drop_raw=True)] == ["城市漫步", "城市露营"]
+    assert snapshot_identity()[1:] == (3, 2, 5003)
+    assert keyword_freq.func(top_k=1) == {"城市": 2}
+
+    # 批次内各条目的抓取时间不同时，加载器仍读到完整的批次
+    staggered = [{"keyword": f"话题{i}", "views": i, "fetch_time": later + 60 + i} for i in range(3)]
+    assert store.insert("bilibili", staggered) == 3
+    assert [r["topic"] for r in load_bilibili_data.func()] == ["话题0", "话题1", "话题2"]
+    assert store.latest_batch("bilibili") == (4, later + 62)
+
+    # 写入中的批次（跨多次 executemany）对其他连接不可见，加载器仍读上一批次
+    seen = []
+
+    def slow_rows():
+        for i in range(4):
+            seen.append([r["topic"] for r in load_bilibili_data.func()])
+            yield {"keyword": f"新话题{i}", "views": i}
+
+    assert store.insert("bilibili", slow_rows(), fetch_time=later + 600, batch_size=2) == 4
+    assert seen == [["话题0", "话题1", "话题2"]] * 4
+    assert store.latest_batch("bilibili") == (5, later + 600)
+    assert len(query_items.func(platform="weibo", hours=None, max_rank=1)) == 100
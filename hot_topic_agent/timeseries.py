@@ -0,0 +1,283 @@
+import os
+import json
+import sqlite3
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from .config import get_settings
+from . import metrics
+
+DAY = 24 * 3600
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """跨快照关联同一条目的键：优先平台 id / bvid / url，退化为话题或标题"""
+    for k in ("id", "bvid", "aid", "url", "keyword", "topic", "title"):
+        v = item.get(k)
+        if v not in (None, ""):
+            return str(v)
+    return ""
+
+
+def _epoch(v: Any) -> Optional[float]:
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return float(v)
+    if isinstance(v, str) and v.strip():
+        x = v.strip()
+        if x.endswith("Z"):
+            x = x[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(x)
+        except ValueError:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    return None
+
+
+def _iter_lines(path: str, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """从 offset 开始逐行读取 NDJSON，产出 (记录, 该行结束位置)；末尾未写完的行不读取，无法解析的行跳过"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        pos = offset
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            pos += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                metrics.log_event("timeseries_skip", path=path, offset=pos - len(line))
+                continue
+            yield rec, pos
+
+
+class TimeSeriesIndex:
+    """
+    快照历史的时序索引（SQLite），覆盖 DATA_ROOT/<platform>/ 下的 *.json 与 *.jsonl 快照
+    - snapshots：已入库文件的 (mtime_ns, size, offset)，update() 只处理新增或变化的文件；
+      .jsonl 追加写入时从上次的 offset 继续读取，.json 变化时整体重建该文件的观测
+    - observations：(platform, item_key, ts) 主键上的播放量与排名观测
+    - items：每个条目的首次/最近出现时间
+    所有窗口查询都落在主键索引上，单次查询为一次索引定位
+    """
+
+    def __init__(self, path: Optional[str] = None, data_root: Optional[str] = None):
+        self.data_root = data_root or get_settings().DATA_ROOT
+        self.path = path or os.path.join(self.data_root, ".index", "timeseries.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                path TEXT PRIMARY KEY, platform TEXT, mtime_ns INTEGER, size INTEGER, offset INTEGER);
+            CREATE TABLE IF NOT EXISTS observations (
+                platform TEXT, item_key TEXT, ts REAL, views REAL, rank INTEGER, source TEXT,
+                PRIMARY KEY (platform, item_key, ts)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS ix_observations_source ON observations(source);
+            CREATE TABLE IF NOT EXISTS items (
+                platform TEXT, item_key TEXT, first_seen REAL, last_seen REAL,
+                PRIMARY KEY (platform, item_key)) WITHOUT ROWID;
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ---- 增量更新 ----
+
+    def update(self, platforms: Optional[Sequence[str]] = None) -> int:
+        """扫描平台目录，把新增或变化的快照写入索引，返回本次写入的观测数"""
+        if not os.path.isdir(self.data_root):
+            return 0
+        if platforms is None:
+            platforms = [d for d in os.listdir(self.data_root) if not d.startswith(".") and os.path.isdir(os.path.join(self.data_root, d))]
+        added = 0
+        for platform in platforms:
+            base = os.path.join(self.data_root, platform)
+            if not os.path.isdir(base):
+                continue
+            with os.scandir(base) as it:
+                files = sorted((e.path, e.stat()) for e in it if e.name.endswith((".json", ".jsonl")) and e.is_file())
+            for path, st in files:
+                added += self._update_file(platform, path, st)
+        return added
+
+    def _update_file(self, platform: str, path: str, st: os.stat_result) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT mtime_ns, size, offset FROM snapshots WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+            return 0
+        default_ts = st.st_mtime
+        if path.endswith(".jsonl"):
+            # 追加写入：文件只增长时从上次位置继续，否则从头重建
+            offset = row[2] if row and st.st_size >= row[1] else 0
+            records = []
+            end = offset
+            for rec, end in _iter_lines(path, offset):
+                records.append(rec)
+            return self._ingest(platform, path, records, default_ts, st, end, reset=offset == 0)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except ValueError as e:
+            # 截断或写到一半的快照（含非 UTF-8 内容）：记为无观测，文件再次变化时重新读取
+            metrics.log_event("timeseries_skip", path=path, error=type(e).__name__)
+            data = []
+        records = data if isinstance(data, list) else []
+        return self._ingest(platform, path, records, default_ts, st, st.st_size, reset=True)
+
+    def _ingest(self, platform: str, path: str, records: List[Dict[str, Any]], default_ts: float, st: os.stat_result, offset: int, reset: bool) -> int:
+        rows = []
+        for idx, rec in enumerate(records, start=1):
+            # 爬虫调度器的增量文件中 change="dropped" 表示掉榜，不是一次观测
+            if not isinstance(rec, dict) or rec.get("change") == "dropped":
+                continue
+            key = item_key(rec)
+            if not key:
+                continue
+            ts = _epoch(rec.get("fetch_time") or rec.get("fetched_at") or rec.get("crawl_time"))
+            views = rec.get("views")
+            rank = rec.get("rank")
+            rows.append((
+                platform, key, ts if ts is not None else default_ts,
+                float(views) if isinstance(views, (int, float)) and not isinstance(views, bool) else None,
+                int(rank) if isinstance(rank, int) else idx,
+                path,
+            ))
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if reset:
+                    self._db.execute("DELETE FROM observations WHERE source = ?", (path,))
+                self._db.executemany("INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._db.executemany(
+                    "INSERT INTO items VALUES (?, ?, ?, ?) ON CONFLICT(platform, item_key) DO UPDATE SET "
+                    "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)",
+                    [(r[0], r[1], r[2], r[2]) for r in rows],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                    (path, platform, st.st_mtime_ns, st.st_size, offset),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    # ---- 查询 ----
+
+    def _latest(self, platform: str, key: str, at: Optional[float]) -> Optional[Tuple[float, Optional[float], Optional[int]]]:
+        sql = "SELECT ts, views, rank FROM observations WHERE platform = ? AND item_key = ?"
+        args: list = [platform, key]
+        if at is not None:
+            sql += " AND ts <= ?"
+            args.append(at)
+        with self._lock:
+            return self._db.execute(sql + " ORDER BY ts DESC LIMIT 1", args).fetchone()
+
+    def view_growth(self, platform: str, key: str, window: float = DAY, at: Optional[float] = None) -> Optional[float]:
+        """
+        窗口增长率：(当前播放 - window 秒前最近一次观测的播放) / window 秒前的播放
+        at 为参考时间（默认该条目最新观测时间）；缺少窗口前的观测或基数为 0 时返回 None
+        """
+        cur = self._latest(platform, key, at)
+        if not cur or cur[1] is None:
+            return None
+        prev = self._latest(platform, key, cur[0] - window)
+        if not prev or not prev[1]:
+            return None
+        return (cur[1] - prev[1]) / prev[1]
+
+    def view_growth_24h(self, platform: str, key: str, at: Optional[float] = None) -> Optional[float]:
+        return self.view_growth(platform, key, DAY, at)
+
+    def rank_history(self, platform: str, key: str, since: Optional[float] = None, until: Optional[float] = None) -> List[Tuple[float, Optional[int]]]:
+        """排名轨迹：[(ts, rank), ...]，按时间升序"""
+        sql = "SELECT ts, rank FROM observations WHERE platform = ? AND item_key = ?"
+        args: list = [platform, key]
+        if since is not None:
+            sql += " AND ts >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND ts <= ?"
+            args.append(until)
+        with self._lock:
+            return [tuple(r) for r in self._db.execute(sql + " ORDER BY ts", args)]
+
+    def seen_range(self, platform: str, key: str) -> Optional[Tuple[float, float]]:
+        """(first_seen, last_seen)，未出现过时返回 None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT first_seen, last_seen FROM items WHERE platform = ? AND item_key = ?", (platform, key)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _series(self, platform: str, keys: Sequence[str], chunk: int = 500) -> Dict[str, Tuple[List[float], List[Optional[float]]]]:
+        """一批条目的全部观测 {key: ([ts...], [views...])}，按时间升序；每 chunk 个键一次主键范围查询"""
+        out: Dict[str, Tuple[List[float], List[Optional[float]]]] = {}
+        keys = list(dict.fromkeys(keys))
+        for i in range(0, len(keys), chunk):
+            part = keys[i:i + chunk]
+            sql = ("SELECT item_key, ts, views FROM observations WHERE platform = ? AND item_key IN (%s) "
+                   "ORDER BY item_key, ts" % ",".join("?" * len(part)))
+            with self._lock:
+                rows = self._db.execute(sql, [platform, *part]).fetchall()
+            for key, ts, views in rows:
+                series = out.setdefault(key, ([], []))
+                series[0].append(ts)
+                series[1].append(views)
+        return out
+
+    def annotate_view_growth(self, platform: str, raw_items: Iterable[Dict[str, Any]], adapted: List[Dict[str, Any]],
+                             window: float = DAY, at: Optional[float] = None) -> None:
+        """
+        为已适配记录回填 metrics.view_growth_24h（raw_items 与 adapted 一一对应）
+        与 view_growth 同口径，但一次取出整批条目的观测后在内存中计算，不逐条查询
+        记录没有抓取时间时以 at 为参考时间（快照文件的修改时间，与入库时的观测时间一致）
+        """
+        targets = []
+        for raw, rec in zip(raw_items, adapted):
+            key = item_key(raw)
+            if key:
+                ts = _epoch(raw.get("fetch_time") or raw.get("fetched_at") or raw.get("crawl_time"))
+                targets.append((key, ts if ts is not None else at, rec))
+        if not targets:
+            return
+        all_series = self._series(platform, [t[0] for t in targets])
+        for key, at, rec in targets:
+            series = all_series.get(key)
+            if not series:
+                continue
+            ts, views = series
+            # 参考时间 at（默认最新观测）处的观测，以及 window 秒前最近一次观测
+            i = (bisect_right(ts, at) if at is not None else len(ts)) - 1
+            if i < 0 or views[i] is None:
+                continue
+            j = bisect_right(ts, ts[i] - window) - 1
+            if j < 0 or not views[j]:
+                continue
+            rec["metrics"]["view_growth_24h"] = (views[i] - views[j]) / views[j]
+
+
+_index: Optional[TimeSeriesIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> TimeSeriesIndex:
+    """进程内共享的索引实例（按当前 DATA_ROOT 打开）"""
+    global _index
+    with _index_lock:
+        root = get_settings().DATA_ROOT
+        if _index is None or _index.data_root != root:
+            _index = TimeSeriesIndex(data_root=root)
+        return _index
@@ -1,13 +1,23 @@
 import os
 import json
-from typing import List, Dict, Any
+import time
+import threading
+import sqlite3
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, Sequence, Tuple
+import numpy as np
 from langchain_core.tools import tool
 from ..config import get_settings
+from .. import metrics
+from ..timeseries import get_index, item_key
+from ..store import ItemStore, get_store
+from ..keywords import count_keywords, fill_keyword_freq, record_titles, snapshot_keyword_freq
+from ..columnar import FORMAT_VERSION, SUFFIX, columnar_path, read_meta, load_columns, build_columns, write_columnar_snapshot
 
-def adapt_topic_item_to_analysis_format(crawler_item: Dict[str, Any]) -> Dict[str, Any]:
+def adapt_topic_item_to_analysis_format(crawler_item: Dict[str, Any], keep_raw: bool = True) -> Dict[str, Any]:
     """
     将爬虫系统的TopicItem数据适配成分析系统需要的格式
-    负责字段映射和数据类型转换
+    负责字段映射和数据类型转换；keep_raw=False 时不保留原始数据，降低内存占用
     """
     return {
         "topic": crawler_item.get("keyword", ""),  # keyword -> topic
@@ -16,13 +26,13 @@ def adapt_topic_item_to_analysis_format(crawler_item: Dict[str, Any]) -> Dict[st
             "views": crawler_item.get("views"),  # 浏览量
             "like_rate": crawler_item.get("like_rate"),  # 点赞率
             "published_at": crawler_item.get("publish_time"),  # 发布时间
-            # 以下字段B站API无法直接获取，保持为None
+            # 以下字段B站API无法直接获取，保持为None（view_growth_24h、keyword_freq 由加载器按快照回填）
             "work_count": None,
             "top_creator_ratio": None,
             "view_growth_24h": None,
             "keyword_freq": None,
         },
-        "raw": crawler_item.get("raw") or crawler_item  # 保留原始数据
+        "raw": (crawler_item.get("raw") or crawler_item) if keep_raw else None  # 保留原始数据
     }
 
 def adapt_crawler_data(crawler_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -35,6 +45,173 @@ def adapt_crawler_data(crawler_data: List[Dict[str, Any]]) -> List[Dict[str, Any
 
     return [adapt_topic_item_to_analysis_format(item) for item in crawler_data]
 
+class _SnapshotIndex:
+    """
+    快照目录索引：缓存目录下各快照的 (mtime_ns, size)
+    仅当目录自身 mtime 变化（新增/删除/重命名文件）或距上次扫描超过 ttl 秒时才重新 scandir，
+    其余调用只需对目录做一次 stat
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._dirs: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def entries(self, base: str) -> Dict[str, tuple]:
+        try:
+            dir_mtime = os.stat(base).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        now = time.monotonic()
+        with self._lock:
+            cached = self._dirs.get(base)
+            if cached and cached[0] == dir_mtime and now - cached[1] < self.ttl:
+                return cached[2]
+        entries = {}
+        with os.scandir(base) as it:
+            for e in it:
+                if e.name.endswith(".json") or e.name.endswith(SUFFIX):
+                    st = e.stat()
+                    entries[e.name] = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            self._dirs[base] = (dir_mtime, now, entries)
+        return entries
+
+    def latest(self, base: str, suffixes: Sequence[str]) -> str | None:
+        entries = self.entries(base)
+        names = [n for n in entries if n.endswith(tuple(suffixes))]
+        if not names:
+            return None
+        return max(names, key=lambda n: entries[n][0])
+
+
+class _AdaptedCache:
+    """已适配快照的进程内 LRU 缓存，键为 (path, mtime_ns, size)，文件变化后旧条目随即被替换"""
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> List[Dict[str, Any]] | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for old in [k for k in self._data if k[0] == key[0]]:
+                del self._data[old]
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_index = _SnapshotIndex()
+_adapted_cache = _AdaptedCache()
+
+
+def _resolve_snapshot(date: str | None) -> str | None:
+    """
+    定位快照（不含扩展名的路径）：指定日期时取 YYYY-MM-DD（JSON 或列式快照存在即可），
+    否则取修改时间最新的 JSON 快照；.cols 目录的修改时间是转换时间而不是数据日期，只在没有任何 JSON 时参与查找
+    所有加载路径（记录、列式、流式、关键词、快照身份）共用该结果，同一次报告不会混用两个快照
+    """
+    s = get_settings()
+    base = os.path.join(s.DATA_ROOT, "bilibili")
+    if date:
+        stem = os.path.join(base, date)
+        if os.path.exists(stem + ".json") or os.path.exists(stem + SUFFIX):
+            return stem
+        return None
+    name = _index.latest(base, (".json",)) or _index.latest(base, (SUFFIX,))
+    if name is None:
+        return None
+    return os.path.join(base, os.path.splitext(name)[0])
+
+
+def _snapshot_mtime(stem: str) -> float | None:
+    for path in (stem + ".json", os.path.join(stem + SUFFIX, "meta.json")):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            continue
+    return None
+
+
+def _store_snapshot(date: str | None) -> Tuple[ItemStore, int, float] | None:
+    """
+    条目库中可代替 JSON 快照的批次 (store, batch_id, fetch_time)：指定日期时取当天（UTC）最后一个批次，否则取最近一个批次
+    同时存在对应的 JSON/列式快照时，只有条目库的批次更新才使用；条目库不存在或不可读时返回 None
+    """
+    try:
+        store = get_store()
+        latest = store.latest_batch("bilibili", date) if store is not None else None
+    except (OSError, ValueError, sqlite3.Error):
+        return None
+    if latest is None:
+        return None
+    stem = _resolve_snapshot(date)
+    mtime = _snapshot_mtime(stem) if stem is not None else None
+    if mtime is not None and mtime > latest[1]:
+        return None
+    return (store,) + latest
+
+
+def snapshot_identity(date: str | None = None) -> tuple | None:
+    """
+    快照身份 (stem, mtime_ns, size)：优先取 JSON 文件，只有列式快照时取其 meta.json
+    数据来自条目库时为 (库路径#平台, batch_id, 行数, 最大 seq)
+    文件被重写或追加后身份随之变化，可作为派生结果（如报告）的缓存键；无数据时返回 None
+    """
+    src = _store_snapshot(date)
+    if src is not None:
+        store, batch_id, _ = src
+        return (f"{store.path}#bilibili", batch_id) + store.batch_identity(batch_id)
+    stem = _resolve_snapshot(date)
+    if stem is None:
+        return None
+    for path in (stem + ".json", os.path.join(stem + SUFFIX, "meta.json")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        return (stem, st.st_mtime_ns, st.st_size)
+    return None
+
+
+def _copy_records(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """缓存中的记录返回给调用方前复制记录、metrics 与 keyword_freq 字典，调用方修改结果不会影响缓存（raw 只读，共享）"""
+    out = []
+    for r in data:
+        m = dict(r["metrics"])
+        if m.get("keyword_freq"):
+            m["keyword_freq"] = dict(m["keyword_freq"])
+        out.append({**r, "metrics": m})
+    return out
+
+
+def _annotate_growth(raw_data: List[Dict[str, Any]], data: List[Dict[str, Any]], at: float) -> None:
+    """
+    增量更新时序索引并回填 metrics.view_growth_24h；at 为快照文件的修改时间，记录没有抓取时间时以其为参考时间
+    索引不可用（如目录只读、其他快照损坏）时保持为 None
+    """
+    if not get_settings().TIMESERIES_INDEX:
+        return
+    try:
+        index = get_index()
+        index.update(["bilibili"])
+        index.annotate_view_growth("bilibili", [r if isinstance(r, dict) else {} for r in raw_data], data, at=at)
+    except (OSError, ValueError, sqlite3.Error):
+        pass
+
+
 @tool("load_bilibili_data")
 def load_bilibili_data(date: str | None = None) -> List[Dict]:
     """
@@ -43,33 +220,185 @@ def load_bilibili_data(date: str | None = None) -> List[Dict]:
     2. 通过适配器转换成分析系统需要的格式
     3. 返回标准化的数据列表
     """
-    s = get_settings()
-    base = os.path.join(s.DATA_ROOT, "bilibili")  # 构建B站数据目录路径
+    # 条目库中有更新的批次时从库中读取（按 batch_id 定位，走索引）
+    src = _store_snapshot(date)
+    if src is not None:
+        return _load_from_store(*src)
 
-    # 如果数据目录不存在，返回空列表
-    if not os.path.isdir(base):
+    # 定位指定日期或最新的 JSON 快照，不存在时返回空列表
+    stem = _resolve_snapshot(date)
+    if stem is None:
+        return []
+    path = stem + ".json"
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
         return []
 
-    # 如果指定了日期，尝试加载指定日期的数据
-    if date:
-        path = os.path.join(base, f"{date}.json")
-        # 如果指定日期的文件不存在，返回空列表
-        if not os.path.exists(path):
-            return []
-        # 读取爬虫原始数据（TopicItem格式）
+    # 文件未变化（路径、修改时间、大小一致）时直接复用已适配的结果
+    key = (path, st.st_mtime_ns, st.st_size)
+    data = _adapted_cache.get(key)
+    metrics.cache_result("adapted", data is not None)
+    if data is None:
+        # 读取爬虫原始数据（TopicItem格式），通过适配器转换为分析系统格式
         with open(path, "r", encoding="utf-8") as f:
             raw_data = json.load(f)
-    else:
-        # 未指定日期时，加载最新的数据
-        files = [fn for fn in os.listdir(base) if fn.endswith(".json")]
-        if not files:
-            return []
-        # 按修改时间排序，获取最新的文件
-        files.sort(key=lambda fn: os.path.getmtime(os.path.join(base, fn)), reverse=True)
-        target = os.path.join(base, files[0])
-        # 读取最新文件的数据
-        with open(target, "r", encoding="utf-8") as f:
-            raw_data = json.load(f)
+        data = adapt_crawler_data(raw_data)
+        _annotate_growth(raw_data, data, st.st_mtime)
+        # 每条记录的标题关键词在整个快照中的频次（快照计数按文件身份缓存，与 keyword_freq 工具共用）
+        fill_keyword_freq(data, snapshot_keyword_freq(path, records=raw_data))
+        _adapted_cache.put(key, data)
+    return _copy_records(data)
+
+
+def _load_from_store(store: ItemStore, batch_id: int, ts: float) -> List[Dict]:
+    key = (f"{store.path}#bilibili@{batch_id}",) + store.batch_identity(batch_id)
+    data = _adapted_cache.get(key)
+    metrics.cache_result("adapted", data is not None)
+    if data is None:
+        raw_data = store.batch(batch_id)
+        data = adapt_crawler_data(raw_data)
+        if get_settings().TIMESERIES_INDEX:
+            # 24h 增长直接在条目库中按 item_id 索引批量查询
+            keys = [item_key(raw) for raw in raw_data]
+            growth = store.view_growth_batch("bilibili", keys, ts)
+            for key, rec in zip(keys, data):
+                if key in growth:
+                    rec["metrics"]["view_growth_24h"] = growth[key]
+        fill_keyword_freq(data, count_keywords(record_titles(raw_data)))
+        _adapted_cache.put(key, data)
+    return _copy_records(data)
+
+
+def _empty_columns(columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    empty = build_columns([])
+    return {c: empty[c] for c in columns}
+
+
+def load_bilibili_columns(date: str | None = None, columns: Sequence[str] = ("views", "like_rate")) -> Dict[str, np.ndarray]:
+    """
+    列式加载B站热搜数据，只返回请求的列（numpy 数组），不构造逐条记录的字典
+    1. 优先读取与 JSON 同名的 .cols 列式快照（mmap 加载）
+    2. 列式快照缺失或比 JSON 旧时，从 JSON 构建列并写回 .cols，后续请求直接复用
+    无数据时返回各列的空数组
+    """
+    src = _store_snapshot(date)
+    if src is not None:
+        # 条目库批次在内存中构建列（不写 .cols）
+        cols = build_columns(src[0].batch(src[1]))
+        return {c: cols[c] for c in columns}
+    stem = _resolve_snapshot(date)
+    if stem is None:
+        return _empty_columns(columns)
+    json_path = stem + ".json"
+    cols_path = columnar_path(json_path)
+    json_mtime = os.path.getmtime(json_path) if os.path.exists(json_path) else None
+    meta = read_meta(cols_path)
+    if meta and meta.get("version") == FORMAT_VERSION and (json_mtime is None or meta.get("source_mtime") == json_mtime):
+        metrics.cache_result("columnar", True)
+        return load_columns(cols_path, columns)
+    metrics.cache_result("columnar", False)
+    if json_mtime is None:
+        return _empty_columns(columns)
+    with open(json_path, "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
+    try:
+        write_columnar_snapshot(raw_data, cols_path, source_mtime=json_mtime)
+        return load_columns(cols_path, columns)
+    except OSError:
+        # 数据目录只读时退化为内存中的列
+        cols = build_columns(raw_data)
+        return {c: cols[c] for c in columns}
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    增量解析顶层为数组的 JSON 文件，逐个产出元素
+    每次只读取 chunk_size 个字符，缓冲区中只保留当前未解析完的元素，内存占用与文件大小无关
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            # 丢弃已解析部分并追加新数据；没有更多数据时返回 False
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            data = f.read(chunk_size)
+            if not data:
+                eof = True
+                return False
+            buf = buf[pos:] + data
+            pos = 0
+            return True
+
+        def skip_ws() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ""
+
+        if skip_ws() == "\ufeff":
+            pos += 1
+        if skip_ws() != "[":
+            raise ValueError(f"{path}: top-level JSON array expected")
+        pos += 1
+        if skip_ws() == "]":
+            return
+        while True:
+            if not skip_ws():
+                raise ValueError(f"{path}: unexpected end of JSON array")
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # 元素恰好结束在缓冲区末尾时（如被截断的数字），读入更多数据后重新解析
+                if end == len(buf) and fill():
+                    continue
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            yield obj
+            pos = end
+            ch = skip_ws()
+            if ch == ",":
+                pos += 1
+            elif ch == "]":
+                return
+            else:
+                raise ValueError(f"{path}: malformed JSON array at offset {pos}")
+
+
+def iter_bilibili_records(date: str | None = None, drop_raw: bool = False, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    流式加载B站热搜数据：边解析 JSON 边适配，逐条产出分析格式的记录
+    drop_raw=True 时不保留原始数据字段，适合只做统计的场景
+    """
+    src = _store_snapshot(date)
+    if src is not None:
+        for item in src[0].batch(src[1]):
+            yield adapt_topic_item_to_analysis_format(item, keep_raw=not drop_raw)
+        return
+    stem = _resolve_snapshot(date)
+    if stem is None or not os.path.exists(stem + ".json"):
+        return
+    for item in iter_json_array(stem + ".json", chunk_size=chunk_size):
+        yield adapt_topic_item_to_analysis_format(item, keep_raw=not drop_raw)
+
 
-    # 通过适配器将爬虫数据转换为分析系统格式
-    return adapt_crawler_data(raw_data)
\ No newline at end of file
+def iter_bilibili_batches(date: str | None = None, batch_size: int = 5000, drop_raw: bool = True) -> Iterator[List[Dict[str, Any]]]:
+    """按 batch_size 分批产出记录，可直接喂给 SummaryAccumulator 等逐批聚合器"""
+    batch: List[Dict[str, Any]] = []
+    for rec in iter_bilibili_records(date, drop_raw=drop_raw):
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,22 @@
+import os
+from typing import Dict
+from langchain_core.tools import tool
+from ..keywords import keyword_freq_for_paths, count_keywords, record_titles
+from .fetch_bilibili import _resolve_snapshot, _store_snapshot
+
+@tool("keyword_freq")
+def keyword_freq(date: str | None = None, top_k: int = 30) -> Dict[str, int]:
+    """
+    关键词频次工具
+    统计指定日期（默认最新）B站热搜快照中所有标题的高频关键词与 n-gram，返回前 top_k 个及其出现次数
+    """
+    # 数据来自条目库时直接对该批次计数
+    src = _store_snapshot(date)
+    if src is not None:
+        return dict(count_keywords(record_titles(src[0].batch(src[1]))).most_common(top_k))
+    # 定位快照文件，不存在时返回空字典
+    stem = _resolve_snapshot(date)
+    if stem is None or not os.path.exists(stem + ".json"):
+        return {}
+    # 结果按快照文件身份缓存，同一文件重复调用不会重新计数
+    return keyword_freq_for_paths([stem + ".json"], top_k=top_k)
@@ -0,0 +1,24 @@
+import time
+from typing import Any, Dict, List
+from langchain_core.tools import tool
+from ..store import get_store
+
+@tool("query_items")
+def query_items(
+    platform: str | None = None,
+    hours: float | None = 24,
+    max_rank: int | None = None,
+    topic: str | None = None,
+    item_id: str | None = None,
+    limit: int = 200,
+) -> List[Dict[str, Any]]:
+    """
+    条目库查询工具
+    按平台、最近 hours 小时、排名上限（max_rank）、话题或条目 id 过滤历史抓取记录，最近的在前，最多返回 limit 条
+    条目库（DATA_ROOT/items.sqlite）不存在时返回空列表
+    """
+    store = get_store()
+    if store is None:
+        return []
+    since = time.time() - hours * 3600 if hours else None
+    return store.query(platform=platform, since=since, max_rank=max_rank, topic=topic, item_id=item_id, limit=limit)
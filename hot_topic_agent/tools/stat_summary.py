@@ -1,30 +1,32 @@
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any
 import numpy as np
 from langchain_core.tools import tool
+from ..analytics import records_to_columns, summarize, grouped_stats, top_records, SummaryAccumulator
 
 @tool("stat_summary")
-def stat_summary(records: List[Dict[str, Any]]) -> Dict:
-    """对数据记录进行简单统计汇总。支持原始结构或带metrics嵌套结构。"""
+def stat_summary(records: List[Dict[str, Any]], group_by: str | None = None, top_n: int = 10) -> Dict:
+    """对数据记录进行统计汇总。支持原始结构或带metrics嵌套结构。
+    group_by 可选 platform / hour / topic，额外返回分组聚合（分位数、中位数、加权点赞率）与播放量前 top_n 的记录。"""
     if not records:
         return {"count": 0, "views_sum": 0, "like_rate_avg": 0.0}
 
-    def get_views(r: Dict[str, Any]):
-        v = r.get("views")
-        if v is None:
-            v = (r.get("metrics") or {}).get("views")
-        return v
+    # 一次性构建类型化数组，后续统计全部向量化
+    columns = records_to_columns(records)
+    result = summarize(columns)
+    if group_by:
+        result["groups"] = grouped_stats(columns, by=group_by, top_n=top_n)
+        result["top"] = top_records(columns, n=top_n)
+    return result
 
-    def get_like_rate(r: Dict[str, Any]):
-        lr = r.get("like_rate")
-        if lr is None:
-            lr = (r.get("metrics") or {}).get("like_rate")
-        return lr
 
-    views = [v for v in (get_views(r) for r in records) if isinstance(v, (int, float))]
-    like_rates = [lr for lr in (get_like_rate(r) for r in records) if isinstance(lr, (int, float))]
+def summarize_columns(columns: Dict[str, np.ndarray]) -> Dict:
+    """列式数据的统计汇总，输出与 stat_summary 相同；views/like_rate 中的 NaN 视为缺失"""
+    return summarize(columns)
 
-    count = len(records)
-    views_sum = int(sum(views)) if views else 0
-    like_rate_avg = float(np.mean(like_rates)) if like_rates else 0.0
 
-    return {"count": count, "views_sum": views_sum, "like_rate_avg": like_rate_avg}
+def summarize_batches(batches: Iterable[List[Dict[str, Any]]]) -> Dict:
+    """逐批统计汇总（如 iter_bilibili_batches 的输出），输出与 stat_summary 相同，内存只与批大小相关"""
+    acc = SummaryAccumulator()
+    for batch in batches:
+        acc.update(batch)
+    return acc.result()
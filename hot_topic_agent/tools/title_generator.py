@@ -1,26 +1,46 @@
-from typing import List
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Sequence, Tuple
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from ..config import get_settings
+from ..llm_cache import get_prompt_cache
+from .. import metrics
 
-@tool("title_generator")
-def title_generator(topic: str, context: str | None = None) -> List[str]:
-    """
-    标题生成工具
-    基于指定主题和上下文，调用AI生成5个中文标题建议
-    """
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# 标题生成使用较高温度值以获得更有创意的标题
+TEMPERATURE = 0.7
+
+# 模型客户端按 (model, api_key, base_url, temperature) 复用，内部的 HTTP 连接池在多次调用间共享
+_clients: Dict[tuple, "ChatOpenAI"] = {}
+_clients_lock = threading.Lock()
+
+
+def _llm(temperature: float | None = None) -> "ChatOpenAI":
+    # langchain_openai 导入较慢（约 1 秒），只在第一次真正调用模型时加载
+    from langchain_openai import ChatOpenAI
+
+    # 默认温度在调用时读取，与缓存键使用的 TEMPERATURE 保持一致
+    temperature = TEMPERATURE if temperature is None else temperature
     s = get_settings()
-    # 初始化OpenAI模型，使用较高温度值以获得更有创意的标题
-    llm = ChatOpenAI(model=s.MODEL_NAME, api_key=s.OPENAI_API_KEY, base_url=s.OPENAI_BASE_URL, temperature=0.7)
+    key = (s.MODEL_NAME, s.OPENAI_API_KEY, s.OPENAI_BASE_URL, temperature)
+    with _clients_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            llm = ChatOpenAI(model=s.MODEL_NAME, api_key=s.OPENAI_API_KEY, base_url=s.OPENAI_BASE_URL, temperature=temperature)
+            _clients[key] = llm
+        return llm
 
+
+def _prompt(topic: str, context: str | None) -> str:
     # 构建提示词，要求AI生成5个爆款中文标题
-    prompt = f"根据主题{topic}生成5个可能爆款的中文标题。{context or ''}"
+    return f"根据主题{topic}生成5个可能爆款的中文标题。{context or ''}"
 
-    # 调用AI模型生成标题
-    msg = llm.invoke([HumanMessage(content=prompt)])
-    text = msg.content or ""
 
+def _parse_titles(text: str) -> List[str]:
     # 解析AI返回的内容，提取标题行
     lines = [x.strip("-• ") for x in text.splitlines() if x.strip()]
 
@@ -29,4 +49,103 @@ def title_generator(topic: str, context: str | None = None) -> List[str]:
         lines = [text]
 
     # 最多返回5个标题
-    return lines[:5]
\ No newline at end of file
+    return lines[:5]
+
+
+def _cached(prompts: Sequence[str]) -> List[str | None]:
+    """按 (model, prompt, temperature) 查持久化缓存，未命中为 None"""
+    cache = get_prompt_cache()
+    if cache is None:
+        return [None] * len(prompts)
+    model = get_settings().MODEL_NAME
+    texts = [cache.get(model, p, TEMPERATURE) for p in prompts]
+    for t in texts:
+        metrics.cache_result("llm", t is not None)
+    return texts
+
+
+def _store(prompts: Sequence[str], texts: Sequence[str]) -> None:
+    cache = get_prompt_cache()
+    if cache is None:
+        return
+    model = get_settings().MODEL_NAME
+    for p, t in zip(prompts, texts):
+        # 空回复不缓存，下次重新请求
+        if t:
+            cache.put(model, p, TEMPERATURE, t)
+
+
+@tool("title_generator")
+def title_generator(topic: str, context: str | None = None) -> List[str]:
+    """
+    标题生成工具
+    基于指定主题和上下文，调用AI生成5个中文标题建议
+    """
+    return generate_titles_batch([topic], context)[topic]
+
+
+async def agenerate_titles(topic: str, context: str | None = None) -> List[str]:
+    """title_generator 的异步版本，供 /report 在事件循环中调用，不占用线程池"""
+    return (await agenerate_titles_batch([topic], context))[topic]
+
+
+# 批量生成的状态：(去重后的主题, 提示词, 缓存命中的回复（未命中为 None）, 未命中的下标)
+_Batch = Tuple[List[str], List[str], List[str | None], List[int]]
+
+
+def _lookup(topics: Sequence[str], context: str | None) -> _Batch:
+    """去重主题、构建提示词并查缓存（阻塞的 SQLite 读，异步路径在线程中执行）"""
+    topics = list(dict.fromkeys(topics))
+    prompts = [_prompt(t, context) for t in topics]
+    texts = _cached(prompts)
+    return topics, prompts, texts, [i for i, t in enumerate(texts) if t is None]
+
+
+def _finish(batch: _Batch, msgs: Sequence) -> Dict[str, List[str]]:
+    """回填新生成的回复并写缓存（阻塞的 SQLite 写，异步路径在线程中执行），返回 {主题: 标题列表}"""
+    topics, prompts, texts, miss = batch
+    fresh = [m.content or "" for m in msgs]
+    _store([prompts[i] for i in miss], fresh)
+    for i, t in zip(miss, fresh):
+        texts[i] = t
+    return {topic: _parse_titles(text or "") for topic, text in zip(topics, texts)}
+
+
+def _messages(batch: _Batch) -> List[List[HumanMessage]]:
+    _, prompts, _, miss = batch
+    return [[HumanMessage(content=prompts[i])] for i in miss]
+
+
+@contextmanager
+def _llm_stage(n: int) -> Iterator[None]:
+    """模型调用计时（agent_stage_seconds{stage=llm}），按结果计入 agent_llm_requests_total"""
+    with metrics.stage("llm"):
+        try:
+            yield
+        except Exception:
+            metrics.LLM_REQUESTS.labels("error").inc(n)
+            raise
+    metrics.LLM_REQUESTS.labels("ok").inc(n)
+
+
+def generate_titles_batch(topics: Sequence[str], context: str | None = None, max_concurrency: int = 8) -> Dict[str, List[str]]:
+    """
+    批量生成标题：先查缓存，未命中的主题通过 ChatOpenAI.batch 并发请求（最多 max_concurrency 个同时进行）
+    返回 {主题: 标题列表}，重复主题只请求一次
+    """
+    batch = _lookup(topics, context)
+    msgs: List = []
+    if batch[3]:
+        with _llm_stage(len(batch[3])):
+            msgs = _llm().batch(_messages(batch), config={"max_concurrency": max_concurrency})
+    return _finish(batch, msgs)
+
+
+async def agenerate_titles_batch(topics: Sequence[str], context: str | None = None, max_concurrency: int = 8) -> Dict[str, List[str]]:
+    """generate_titles_batch 的异步版本（ChatOpenAI.abatch），缓存读写在线程中执行，不阻塞事件循环"""
+    batch = await asyncio.to_thread(_lookup, topics, context)
+    msgs: List = []
+    if batch[3]:
+        with _llm_stage(len(batch[3])):
+            msgs = await _llm().abatch(_messages(batch), config={"max_concurrency": max_concurrency})
+    return await asyncio.to_thread(_finish, batch, msgs)
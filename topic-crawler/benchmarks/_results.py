@@ -0,0 +1,76 @@
+"""基准结果的输出与回归比较：JSON 文档 {"benchmark", "env", "results"}，results 为扁平的指标字典"""
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def environment() -> Dict[str, object]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def flatten(d: dict, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def _direction(name: str) -> int:
+    """1：越大越好（吞吐）；-1：越小越好（耗时）；0：不比较"""
+    leaf = name.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_s"):
+        return 1
+    if leaf.endswith(("_ms", "_us", "_s", "_mb")):
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """与基线比较，返回变差超过 tolerance（相对比例）的指标说明"""
+    cur, base = flatten(results), flatten(baseline)
+    out = []
+    for name, b in base.items():
+        c = cur.get(name)
+        d = _direction(name)
+        if c is None or d == 0 or b == 0:
+            continue
+        change = (c - b) / abs(b)
+        if -d * change > tolerance:
+            out.append(f"{name}: {b:g} -> {c:g} ({change:+.0%})")
+    return out
+
+
+def emit(name: str, results: dict, args: List[str]) -> int:
+    """
+    输出结果：--out <path> 写入文件（否则打印到 stdout）；
+    --compare <baseline.json> [--tolerance 0.2] 与基线比较，存在回归时返回 1
+    """
+    doc = {"benchmark": name, "env": environment(), "results": results}
+    text = json.dumps(doc, ensure_ascii=False, indent=2)
+    out: Optional[str] = args[args.index("--out") + 1] if "--out" in args else None
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if "--compare" in args:
+        with open(args[args.index("--compare") + 1], "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        tolerance = float(args[args.index("--tolerance") + 1]) if "--tolerance" in args else 0.2
+        regressions = compare(results, baseline.get("results", baseline), tolerance)
+        for r in regressions:
+            print(f"regression: {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
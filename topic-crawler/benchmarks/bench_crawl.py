@@ -0,0 +1,97 @@
+"""
+离线爬虫基准：本地替身 newsnow 服务器（benchmarks/fake_newsnow.py）上的抓取吞吐与详情解析延迟
+
+- crawl：fetch_newsnow_batch 抓取 --platforms 个平台（每个 --items 条，前 --details 条解析详情页），
+  服务端延迟 --latency-ms、文章页错误率 --error-rate、页面大小 --page-kb；
+  限速关闭（rate_per_host=0），测的是抓取流水线本身而不是礼貌间隔
+- parse：_extract_details 对不同大小页面的单次解析延迟（p50/p99，微秒）
+
+用法：python benchmarks/bench_crawl.py [--platforms 12] [--items 30] [--details 8] [--latency-ms 20]
+      [--error-rate 0.05] [--page-kb 16] [--out results.json] [--compare baseline.json] [--tolerance 0.2]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from src import crawler
+from src.crawler import fetch_newsnow_batch, _extract_details
+from src.models import EnrichStats
+from fake_newsnow import FakeNewsnow, make_article
+from _results import emit
+
+
+def _arg(args, name, default, cast=float):
+    return cast(args[args.index(name) + 1]) if name in args else default
+
+
+def bench_crawl(platforms: int, items: int, details: int, latency_ms: float, error_rate: float, page_kb: int, concurrency: int) -> dict:
+    with FakeNewsnow(items=items, page_kb=page_kb, latency_ms=latency_ms, jitter_ms=latency_ms / 4, error_rate=error_rate) as srv:
+        original = crawler.NEWSNOW_API_URL
+        crawler.NEWSNOW_API_URL = srv.api_url
+        try:
+            stats = EnrichStats()
+            ids = [(f"p{i}", None) for i in range(platforms)]
+            start = time.perf_counter()
+            data = asyncio.run(fetch_newsnow_batch(
+                ids, concurrency=concurrency, rate_per_host=0, max_details=details,
+                detail_concurrency=16, detail_deadline=60.0, enrich_stats=stats,
+            ))
+            elapsed = time.perf_counter() - start
+        finally:
+            crawler.NEWSNOW_API_URL = original
+        total = sum(len(v) for v in data.values())
+        return {
+            "platforms": platforms,
+            "items": total,
+            "detail_pages": stats.attempted,
+            "detail_hits": stats.hits,
+            "detail_errors": stats.errors,
+            "server_requests": srv.requests,
+            "elapsed_s": round(elapsed, 3),
+            "items_per_s": round(total / elapsed, 1),
+            "pages_per_s": round(stats.attempted / elapsed, 1),
+        }
+
+
+def bench_parse(sizes_kb=(4, 16, 64, 256), rounds: int = 200) -> dict:
+    out = {}
+    for kb in sizes_kb:
+        html = make_article("p", 1, kb).decode("utf-8")
+        _extract_details(html)
+        samples = []
+        for _ in range(rounds):
+            t = time.perf_counter()
+            _extract_details(html)
+            samples.append((time.perf_counter() - t) * 1e6)
+        samples.sort()
+        out[f"{kb}kb"] = {
+            "bytes": len(html.encode("utf-8")),
+            "p50_us": round(statistics.median(samples), 1),
+            "p99_us": round(samples[int(len(samples) * 0.99) - 1], 1),
+        }
+    return out
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    results = {
+        "crawl": bench_crawl(
+            platforms=_arg(args, "--platforms", 12, int),
+            items=_arg(args, "--items", 30, int),
+            details=_arg(args, "--details", 8, int),
+            latency_ms=_arg(args, "--latency-ms", 20.0),
+            error_rate=_arg(args, "--error-rate", 0.05),
+            page_kb=_arg(args, "--page-kb", 16, int),
+            concurrency=_arg(args, "--concurrency", 8, int),
+        ),
+        "extract_details": bench_parse(),
+    }
+    return emit("topic-crawler", results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
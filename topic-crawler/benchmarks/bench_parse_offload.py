@@ -0,0 +1,99 @@
+"""
+详情页解析卸载基准：500 个页面经 MockTransport 返回，分别以 inline / thread / process
+三种方式解析，同时用 1ms 心跳协程测量事件循环延迟（lag = 实际唤醒时间 - 预期唤醒时间）。
+
+用法：python benchmarks/bench_parse_offload.py [--pages 500] [--json]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import Executor, Future
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.crawler import _enrich_details, make_parse_executor
+from src.models import NewsItem, EnrichStats
+
+
+class _InlineExecutor(Executor):
+    """在调用线程同步执行，模拟卸载之前直接在事件循环里解析的行为。"""
+
+    def submit(self, fn, *args, **kwargs):
+        fut: Future = Future()
+        fut.set_result(fn(*args, **kwargs))
+        return fut
+
+
+def _make_page(n: int) -> bytes:
+    metas = "".join(f'<meta name="x-{i}" content="填充内容 {i} {"abc" * 8}">\n' for i in range(1500))
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        + metas
+        + f'<meta property="og:description" content="第 {n} 篇文章摘要">'
+        + f'<meta property="article:published_time" content="2025-11-25T08:{n % 60:02d}:00Z">'
+        + "</head><body>" + "<p>正文</p>" * 2000 + "</body></html>"
+    ).encode("utf-8")
+
+
+async def _measure(pages: int, executor: Executor) -> dict:
+    page = _make_page(0)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.005)
+        return httpx.Response(200, content=page, headers={"content-type": "text/html; charset=utf-8"})
+
+    items = [NewsItem(id=str(i), title=f"t{i}", url=f"https://h{i % 20}.example.com/a{i}") for i in range(pages)]
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            t0 = loop.time()
+            await asyncio.sleep(0.001)
+            lags.append((loop.time() - t0 - 0.001) * 1000)
+
+    stats = EnrichStats()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        tick = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await _enrich_details(client, None, items, pages, 50, 600.0, stats, executor)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await tick
+    lags.sort()
+    return {
+        "pages": pages,
+        "hits": stats.hits,
+        "elapsed_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags), 2),
+        "lag_p99_ms": round(lags[int(len(lags) * 0.99) - 1], 2),
+        "lag_max_ms": round(lags[-1], 2),
+    }
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    pages = int(args[args.index("--pages") + 1]) if "--pages" in args else 500
+    results = {}
+    for name, make in [
+        ("inline", _InlineExecutor),
+        ("thread", lambda: make_parse_executor("thread")),
+        ("process", lambda: make_parse_executor("process")),
+    ]:
+        with make() as ex:
+            results[name] = asyncio.run(_measure(pages, ex))
+    if "--json" in args:
+        print(json.dumps(results, ensure_ascii=False))
+    else:
+        for name, r in results.items():
+            print(f"{name:8s} elapsed={r['elapsed_s']:.3f}s lag p50={r['lag_p50_ms']}ms p99={r['lag_p99_ms']}ms max={r['lag_max_ms']}ms hits={r['hits']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""
+输出序列化基准：cli.py 各输出模式对同一批 NewsItem 的编码耗时与输出大小
+
+- legacy：逐条 model_dump 后 json.dumps 两次（紧凑到 stdout、缩进到文件），compact 模式再删除 raw
+- compact：encode_batch 一次编码，同一份字节写入两个输出
+- ndjson / ndjson_gzip / ndjson_zstd：write_ndjson 逐条编码流式写入（zstd 需要 zstandard）
+- build：逐条构造 NewsItem 与 NEWS_ITEMS 整批校验的耗时
+
+用法：python benchmarks/bench_serialize.py [--platforms 20] [--items 100] [--repeat 5] [--out results.json] [--compare baseline.json]
+"""
+import io
+import gzip
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from src.models import NewsItem, NEWS_ITEMS
+from src.serialize import encode_batch, write_all, write_ndjson
+from _results import emit
+
+
+def _arg(args, name, default, cast=int):
+    return cast(args[args.index(name) + 1]) if name in args else default
+
+
+def make_rows(platforms: int, items: int) -> dict:
+    now = datetime.now(timezone.utc)
+    out = {}
+    for p in range(platforms):
+        pid = f"p{p}"
+        rows = []
+        for n in range(items):
+            url = f"https://{pid}.example.com/{n}"
+            raw = {"id": url, "title": f"{pid} 热点标题 {n} 相关讨论持续升温", "url": url, "extra": {"hover": "摘要" * 20, "info": f"{n}万热度"}}
+            rows.append({"id": url, "title": raw["title"], "url": url, "platform_id": pid, "platform_name": f"平台{p}",
+                         "rank": n + 1, "fetch_time": now, "summary": "文章摘要" * 10, "raw": raw})
+        out[pid] = rows
+    return out
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return round(best * 1000, 2)
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    repeat = _arg(args, "--repeat", 5)
+    rows = make_rows(_arg(args, "--platforms", 20), _arg(args, "--items", 100))
+    data = {pid: NEWS_ITEMS.validate_python(r) for pid, r in rows.items()}
+    sizes = {}
+
+    def legacy():
+        payload = {pid: [i.model_dump(mode="json", exclude_none=True) for i in items] for pid, items in data.items()}
+        for items in payload.values():
+            for i in items:
+                i.pop("raw", None)
+        a = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        b = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        sizes["legacy"] = len(b)
+        return a, b
+
+    def compact():
+        encoded = encode_batch(data)
+        write_all(encoded, [io.BytesIO(), io.BytesIO()])
+        sizes["compact"] = len(encoded)
+
+    def ndjson(kind=None):
+        sink = io.BytesIO()
+        f = gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=6) if kind == "gzip" else sink
+        if kind == "zstd":
+            import zstandard
+            f = zstandard.ZstdCompressor(level=3).stream_writer(sink, closefd=False)
+        write_ndjson((it for items in data.values() for it in items), [io.BytesIO(), f])
+        if f is not sink:
+            f.close()
+        sizes["ndjson" + (f"_{kind}" if kind else "")] = len(sink.getvalue())
+
+    serialize = {
+        "legacy_ms": _best(legacy, repeat),
+        "compact_ms": _best(compact, repeat),
+        "ndjson_ms": _best(ndjson, repeat),
+        "ndjson_gzip_ms": _best(lambda: ndjson("gzip"), repeat),
+    }
+    try:
+        serialize["ndjson_zstd_ms"] = _best(lambda: ndjson("zstd"), repeat)
+    except ImportError:
+        pass
+    build = {
+        "per_item_ms": _best(lambda: [[NewsItem(**r) for r in rs] for rs in rows.values()], repeat),
+        "batch_validate_ms": _best(lambda: [NEWS_ITEMS.validate_python(rs) for rs in rows.values()], repeat),
+    }
+    results = {
+        "items": sum(len(v) for v in data.values()),
+        "serialize": serialize,
+        "bytes": sizes,
+        "build": build,
+    }
+    return emit("topic-crawler-serialize", results, args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+"""
+本地的 newsnow 接口与文章页替身服务器，供离线基准使用（真实 socket，走完整的 httpx 连接池路径）
+
+- GET /api/s?id=<platform>&latest：返回 items 条榜单，url 指向本服务器的 /article/<platform>/<n>
+- GET /article/<platform>/<n>：返回 head 含 og:description / article:published_time 的文章页，
+  head 中填充 page_kb KiB 的无关 meta，正文再填充同样大小
+- 每个请求先等待 latency_ms（± jitter_ms），按 error_rate 返回 500（列表接口与文章页分别配置）
+- 随机数按 seed 固定，同一配置的负载可复现
+
+用法：
+    with FakeNewsnow(items=30, latency_ms=20) as srv:
+        crawler.NEWSNOW_API_URL = srv.api_url
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def make_article(platform: str, n: int, page_kb: int = 16) -> bytes:
+    filler = "".join(f'<meta name="x-{i}" content="{"填充" * 20}">' for i in range(page_kb * 1024 // 80))
+    head = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>文章</title>'
+        + filler
+        + f'<meta property="og:description" content="{platform} 第 {n} 篇文章摘要">'
+        + f'<meta property="article:published_time" content="2025-11-25T08:{n % 60:02d}:00Z">'
+        + "</head>"
+    )
+    body = "<body>" + "<p>正文内容</p>" * (page_kb * 1024 // 20) + "</body></html>"
+    return (head + body).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        parts = urlsplit(self.path)
+        is_list = parts.path == "/api/s"
+        with srv.lock:
+            srv.requests += 1
+            delay = max(0.0, srv.latency_ms + srv.rng.uniform(-srv.jitter_ms, srv.jitter_ms)) / 1000
+            fail = srv.rng.random() < (srv.list_error_rate if is_list else srv.error_rate)
+        time.sleep(delay)
+        if fail:
+            with srv.lock:
+                srv.errors += 1
+            return self._send(500, b"error", "text/plain")
+        if is_list:
+            pid = parse_qs(parts.query).get("id", ["x"])[0]
+            pad = "热" * srv.title_chars
+            items = [
+                {"title": f"{pid} 热点标题 {n} {pad}", "url": f"{srv.base_url}/article/{pid}/{n}", "mobileUrl": f"{srv.base_url}/m/{pid}/{n}"}
+                for n in range(srv.items)
+            ]
+            return self._send(200, json.dumps({"status": "success", "items": items}, ensure_ascii=False).encode("utf-8"), "application/json")
+        if parts.path.startswith("/article/"):
+            _, _, pid, n = parts.path.split("/", 3)
+            return self._send(200, srv.article(pid, int(n)), "text/html; charset=utf-8")
+        self._send(404, b"not found", "text/plain")
+
+    def _send(self, status: int, body: bytes, ctype: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeNewsnow:
+    def __init__(
+        self,
+        items: int = 30,
+        title_chars: int = 10,
+        page_kb: int = 16,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        list_error_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        s = self._server
+        s.items, s.title_chars, s.latency_ms, s.jitter_ms = items, title_chars, latency_ms, jitter_ms
+        s.error_rate, s.list_error_rate = error_rate, list_error_rate
+        s.rng, s.lock = random.Random(seed), threading.Lock()
+        s.requests = s.errors = 0
+        s.base_url = f"http://127.0.0.1:{s.server_port}"
+        pages: dict = {}
+
+        def article(pid: str, n: int) -> bytes:
+            # 同一页面只生成一次，避免把造数耗时算进服务端延迟
+            key = (pid, n)
+            if key not in pages:
+                pages[key] = make_article(pid, n, page_kb)
+            return pages[key]
+
+        s.article = article
+        self._thread = threading.Thread(target=s.serve_forever, daemon=True)
+
+    @property
+    def api_url(self) -> str:
+        return self._server.base_url + "/api/s"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    @property
+    def errors(self) -> int:
+        return self._server.errors
+
+    def start(self) -> "FakeNewsnow":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeNewsnow":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
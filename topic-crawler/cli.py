@@ -1,54 +1,170 @@
+import os
 import sys
+import argparse
 import json
 import asyncio
 from pathlib import Path
-from src.crawler import fetch_newsnow_latest, fetch_newsnow_batch
+from src.crawler import fetch_newsnow_latest, fetch_newsnow_batch, make_parse_executor, DEFAULT_CACHE_TTLS
+from src.cache import HttpCache
+from src.models import EnrichStats
+from src.cluster import cluster_batch
+from src.scheduler import CrawlScheduler
+from src.store import ItemStore
+from src.serialize import encode_batch, encode_items, open_sink, write_all, write_ndjson, check_compression, COMPRESSIONS
+from src import metrics
 
 
-def main() -> int:
-    if len(sys.argv) < 2:
-        print("usage: python cli.py <platform_id|--all> [--compact]", file=sys.stderr)
+def _print_enrich_stats(stats: EnrichStats) -> None:
+    if stats.attempted:
+        print(
+            f"details: attempted={stats.attempted} hits={stats.hits} misses={stats.misses} "
+            f"errors={stats.errors} timeouts={stats.timeouts} cached={stats.cached} elapsed_ms={stats.elapsed_ms:.0f}",
+            file=sys.stderr,
+        )
+
+
+def _write_clusters(data) -> None:
+    # 跨平台近似重复标题聚类，写入 clusters.json，供下游分析与提示词使用去重后的话题
+    clusters = cluster_batch(data)
+    total = sum(len(v) for v in data.values())
+    print(f"clusters: items={total} clusters={len(clusters)}", file=sys.stderr)
+    out = Path(__file__).with_name("clusters.json")
+    payload = [c.model_dump(mode="json", exclude_none=True) for c in clusters]
+    out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# 最小集平台，后续可改为读取 YAML
+DEFAULT_PLATFORMS = [("toutiao", "今日头条"), ("weibo", "微博"), ("zhihu", "知乎")]
+
+
+def _parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python cli.py", description="抓取 newsnow 热榜并输出 JSON/NDJSON")
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("platform", nargs="?", help="平台 id，如 toutiao")
+    target.add_argument("--all", action="store_true", help="抓取默认平台集合")
+    target.add_argument("--daemon", action="store_true", help="常驻增量抓取")
+    p.add_argument("--compact", action="store_true", help="一次编码输出紧凑 JSON（不含 raw）")
+    p.add_argument("--ndjson", action="store_true", help="每条一行流式输出")
+    p.add_argument("--out", metavar="PATH", help="输出文件，默认 newsnow.json / newsnow.ndjson")
+    p.add_argument("--compress", choices=COMPRESSIONS, help="NDJSON 文件压缩方式")
+    p.add_argument("--store", metavar="PATH", help="条目库（SQLite）路径")
+    p.add_argument("--concurrency", type=int, default=4, metavar="N")
+    p.add_argument("--parse-workers", type=int, default=0, metavar="N", help="解析进程数，默认使用共享进程池")
+    # 单次抓取默认不用缓存，--daemon 默认开启；--cache/--no-cache 显式覆盖
+    p.add_argument("--cache", action=argparse.BooleanOptionalAction, default=None, help="磁盘 HTTP 缓存")
+    p.add_argument("--cluster", action="store_true", help="--all 时额外写入 clusters.json")
+    p.add_argument("--metrics-file", metavar="PATH", help="退出时写出 Prometheus textfile")
+    p.add_argument("--log-json", action="store_true", help="输出 JSON 行日志")
+    p.add_argument("--per", type=int, metavar="N", help=argparse.SUPPRESS)
+    daemon = p.add_argument_group("daemon")
+    daemon.add_argument("--platforms", metavar="A,B", help="逗号分隔的平台 id，默认最小集平台")
+    daemon.add_argument("--data-root", metavar="PATH", help="快照目录，默认 $DATA_ROOT 或 ./data/raw")
+    daemon.add_argument("--min-interval", type=float, default=60.0, metavar="S")
+    daemon.add_argument("--max-interval", type=float, default=1800.0, metavar="S")
+    return p
+
+
+def _daemon(opts: argparse.Namespace, executor, cache, store=None) -> int:
+    # 常驻增量抓取：python cli.py --daemon [--platforms a,b] [--data-root PATH] [--min-interval S] [--max-interval S]
+    known = dict(DEFAULT_PLATFORMS)
+    platforms = [(p, known.get(p)) for p in opts.platforms.split(",") if p] if opts.platforms else DEFAULT_PLATFORMS
+    data_root = opts.data_root or os.getenv("DATA_ROOT", os.path.join(os.getcwd(), "data", "raw"))
+    scheduler = CrawlScheduler(
+        platforms, data_root, min_interval=opts.min_interval, max_interval=opts.max_interval,
+        concurrency=opts.concurrency, parse_executor=executor, cache=cache, store=store,
+    )
+    print(f"daemon: platforms={','.join(p for p, _ in platforms)} data_root={data_root}", file=sys.stderr)
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None) -> int:
+    try:
+        opts = _parser().parse_args(argv)
+    except SystemExit as e:
+        # 参数错误时 argparse 已打印 usage，返回码为 2
+        return e.code if isinstance(e.code, int) else 2
+    try:
+        # 未安装 zstandard 时在抓取前报错，而不是抓完才失败
+        check_compression(opts.out or "", opts.compress)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
         return 2
-    args = sys.argv[1:]
-    compact = False
-    per = None
-    if "--compact" in args:
-        compact = True
-        args = [a for a in args if a != "--compact"]
-    if "--per" in args:
-        i = args.index("--per")
-        try:
-            per = int(args[i+1])
-        except Exception:
-            print("--per requires integer", file=sys.stderr)
-            return 2
-        args = args[:i] + args[i+2:]
-    target = args[0]
+    if opts.log_json:
+        metrics.enable_logs()
+    target = "--all" if opts.all else "--daemon" if opts.daemon else opts.platform
+    stats = EnrichStats()
+    # 默认使用爬虫模块的共享进程池解析；指定 --parse-workers 时按该进程数单独建池
+    executor = make_parse_executor("process", opts.parse_workers) if opts.parse_workers > 0 else None
+    # 磁盘缓存：newsnow 接口按 TTL 复用并条件请求，文章页复用已解析的 publish_time/summary
+    # 单次抓取默认不用缓存（--cache 开启），避免拿到最长 2 分钟前的榜单；--daemon 默认开启（--no-cache 关闭）
+    use_cache = opts.daemon if opts.cache is None else opts.cache
+    cache = HttpCache(str(Path(__file__).with_name(".cache") / "http.sqlite"), ttls=DEFAULT_CACHE_TTLS) if use_cache else None
+    # 条目库：每次抓取的条目批量写入 SQLite，供 hot_topic_agent 按平台/时间/排名查询
+    store = ItemStore(opts.store) if opts.store else None
+    try:
+        if opts.daemon:
+            return _daemon(opts, executor, cache, store)
+        return _run(target, opts.compact, opts.concurrency, stats, executor, cache, opts.cluster, opts.ndjson, opts.out, opts.compress, store)
+    finally:
+        if store:
+            store.close()
+        if opts.metrics_file:
+            # Prometheus textfile 格式，可由 node_exporter 的 textfile collector 采集
+            metrics.write_textfile(opts.metrics_file)
+        if executor:
+            executor.shutdown()
+        if cache:
+            cache.close()
+
+
+def _run(target: str, compact: bool, concurrency: int, stats: EnrichStats, executor, cache, cluster: bool = False,
+         ndjson: bool = False, out_path=None, compression=None, store=None) -> int:
     if target == "--all":
-        # 最小集平台，后续可改为读取 YAML
-        platforms = [("toutiao", "今日头条"), ("weibo", "微博"), ("zhihu", "知乎")]
-        data = asyncio.run(fetch_newsnow_batch(platforms))
+        data = asyncio.run(fetch_newsnow_batch(DEFAULT_PLATFORMS, concurrency=concurrency, enrich_stats=stats, parse_executor=executor, cache=cache))
+    else:
+        data = {target: asyncio.run(fetch_newsnow_latest(target, enrich_stats=stats, parse_executor=executor, cache=cache))}
+    if store is not None:
+        added = store.write_batch(data)
+        print(f"store: added={added} path={store.path}", file=sys.stderr)
+    if ndjson:
+        _write_ndjson(data, out_path, compression)
+    elif compact:
+        # 一次编码（不含 raw），同一份字节写入 stdout 与文件
+        encoded = encode_batch(data) if target == "--all" else encode_items(data[target])
+        out = Path(out_path) if out_path else Path(__file__).with_name("newsnow.json")
+        sys.stdout.flush()
+        with open(out, "wb") as f:
+            write_all(encoded, [sys.stdout.buffer, f])
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.flush()
+    else:
         payload = {pid: [i.model_dump(mode="json", exclude_none=True) for i in items] for pid, items in data.items()}
-        if compact:
-            for pid in payload:
-                for i in payload[pid]:
-                    i.pop("raw", None)
+        if target != "--all":
+            payload = payload[target]
         print(json.dumps(payload, ensure_ascii=False))
-        out = Path(__file__).with_name("newsnow.json")
+        out = Path(out_path) if out_path else Path(__file__).with_name("newsnow.json")
         out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-        return 0
-    else:
-        items = asyncio.run(fetch_newsnow_latest(target))
-    if compact:
-        for i in items:
-            if hasattr(i, "raw"):
-                i.raw = None
-    payload = [i.model_dump(mode="json", exclude_none=True) for i in items]
-    print(json.dumps(payload, ensure_ascii=False))
-    out = Path(__file__).with_name("newsnow.json")
-    out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    _print_enrich_stats(stats)
+    if cluster and target == "--all":
+        _write_clusters(data)
     return 0
 
+
+def _write_ndjson(data, out_path, compression) -> None:
+    # 每条一行流式写出：stdout 为明文，文件按 --compress 或后缀（.gz/.zst）压缩，两者共用同一次编码
+    if not out_path:
+        suffix = {"gzip": ".gz", "zstd": ".zst"}.get(compression or "", "")
+        out_path = str(Path(__file__).with_name("newsnow.ndjson")) + suffix
+    sys.stdout.flush()
+    with open_sink(out_path, compression) as f:
+        n = write_ndjson((it for items in data.values() for it in items), [sys.stdout.buffer, f])
+    sys.stdout.flush()
+    print(f"ndjson: items={n} out={out_path}", file=sys.stderr)
+
 # 功能：命令行入口，读取参数并调用抓取，输出 JSON 与文件；模块：cli.py
 
 
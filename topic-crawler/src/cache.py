@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from . import metrics
+
+
+# 重建响应时去掉的头：缓存中保存的是已解码的正文
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+# 超出容量时淘汰到 max_bytes 的这一比例，每轮按 accessed_at 索引取 EVICT_BATCH 条候选
+EVICT_LOW_WATER = 0.9
+EVICT_BATCH = 256
+
+
+def cache_key(url: httpx.URL) -> str:
+    """URL + 排序后的查询参数作为缓存键，参数顺序不同的同一请求命中同一条目。"""
+    params = sorted(url.params.multi_items())
+    base = f"{url.scheme}://{url.host}{':' + str(url.port) if url.port else ''}{url.path}"
+    return f"{base}?{urlencode(params)}" if params else base
+
+
+class HttpCache:
+    """
+    基于 SQLite 的磁盘缓存，包含两张表：
+    - responses：按 URL+参数 缓存 GET 响应，按 ttls 中的 URL 前缀决定有效期，过期后携带 ETag/Last-Modified 条件请求
+    - details：文章页解析结果 (publish_time, summary)，文章发布后基本不变，有效期为 details_ttl；
+      两者都为空的结果（页面暂时没有元数据）只保留 empty_details_ttl，之后重新请求
+    两张表共用 max_bytes 容量，超出时按最近访问时间淘汰（LRU）到 90% 容量。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        details_ttl: float = 7 * 24 * 3600,
+        empty_details_ttl: float = 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self.details_ttl = details_ttl
+        self.empty_details_ttl = empty_details_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, etag TEXT, last_modified TEXT, "
+            "stored_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            "url TEXT PRIMARY KEY, publish_time TEXT, summary TEXT, stored_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses(accessed_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_details_accessed ON details(accessed_at)")
+        row = self._db.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM responses) + (SELECT COALESCE(SUM(size), 0) FROM details)"
+        ).fetchone()
+        self._size = row[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """最长前缀匹配的 TTL；未配置的 URL 返回 None，表示不经过响应缓存。"""
+        best = None
+        for prefix, ttl in self.ttls.items():
+            if url.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+                best = (prefix, ttl)
+        return best[1] if best else None
+
+    def get_response(self, key: str) -> Optional[dict]:
+        row = self._db.execute(
+            "SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        status, headers, body, etag, last_modified, stored_at = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def put_response(self, key: str, status: int, headers: list, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        now = time.time()
+        size = len(body) + len(key)
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, status, json.dumps(headers), body, etag, last_modified, now, now, size),
+        )
+        self._size += size - (old[0] if old else 0)
+        self._evict()
+
+    def refresh_response(self, key: str) -> None:
+        """304 重新验证成功：刷新存储时间，有效期重新计算。"""
+        now = time.time()
+        self._db.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def get_details(self, url: str) -> Optional[Tuple[Optional[datetime], Optional[str]]]:
+        row = self._db.execute("SELECT publish_time, summary, stored_at FROM details WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        publish_time, summary, stored_at = row
+        ttl = self.details_ttl if publish_time or summary else self.empty_details_ttl
+        if time.time() - stored_at >= ttl:
+            return None
+        self._db.execute("UPDATE details SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return (datetime.fromisoformat(publish_time) if publish_time else None), summary
+
+    def put_details(self, url: str, publish_time: Optional[datetime], summary: Optional[str]) -> None:
+        now = time.time()
+        size = len(url) + len((summary or "").encode("utf-8")) + 32
+        old = self._db.execute("SELECT size FROM details WHERE url = ?", (url,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?, ?)",
+            (url, publish_time.isoformat() if publish_time else None, summary, now, now, size),
+        )
+        self._size += size - (old[0] if old else 0)
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        超出 max_bytes 时按 accessed_at 索引分批取出两张表最久未访问的条目，淘汰到 max_bytes * EVICT_LOW_WATER，
+        留出余量，后续写入不必每次都淘汰
+        """
+        if self._size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * EVICT_LOW_WATER)
+        size = self._size
+        self._db.execute("BEGIN")
+        try:
+            while self._size > target:
+                picked = []
+                # 只取到两张表本批次都覆盖的时间点为止，保证跨表的淘汰顺序仍是全局 LRU
+                horizon = float("inf")
+                for table, col in (("responses", "key"), ("details", "url")):
+                    rows = self._db.execute(
+                        f"SELECT accessed_at, {col}, size FROM {table} ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)
+                    ).fetchall()
+                    picked += [(accessed, table, col, key, size) for accessed, key, size in rows]
+                    if len(rows) == EVICT_BATCH:
+                        horizon = min(horizon, rows[-1][0])
+                if not picked:
+                    self._size = 0
+                    break
+                picked.sort(key=lambda r: r[0])
+                doomed: Dict[Tuple[str, str], list] = {}
+                for accessed, table, col, key, size in picked:
+                    if self._size <= target or accessed > horizon:
+                        break
+                    doomed.setdefault((table, col), []).append((key,))
+                    self._size -= size
+                for (table, col), keys in doomed.items():
+                    self._db.executemany(f"DELETE FROM {table} WHERE {col} = ?", keys)
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            self._size = size
+            raise
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """包装底层 transport：对配置了 TTL 的 GET 请求先查磁盘缓存，过期时发条件请求，304 直接返回缓存正文。"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, cache: HttpCache):
+        self.inner = inner
+        self.cache = cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        ttl = self.cache.ttl_for(str(request.url)) if request.method == "GET" else None
+        if ttl is None:
+            return await self.inner.handle_async_request(request)
+        key = cache_key(request.url)
+        entry = self.cache.get_response(key)
+        if entry and time.time() - entry["stored_at"] < ttl:
+            metrics.HTTP_CACHE.labels("fresh").inc()
+            return self._from_entry(request, entry)
+        if entry:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+        resp = await self.inner.handle_async_request(request)
+        if resp.status_code == 304 and entry:
+            metrics.HTTP_CACHE.labels("revalidated").inc()
+            await resp.aclose()
+            self.cache.refresh_response(key)
+            return self._from_entry(request, entry)
+        metrics.HTTP_CACHE.labels("miss").inc()
+        if resp.status_code != 200:
+            return resp
+        body = await resp.aread()
+        await resp.aclose()
+        headers = [(k, v) for k, v in resp.headers.multi_items() if k.lower() not in _DROP_HEADERS]
+        self.cache.put_response(key, 200, headers, body, resp.headers.get("etag"), resp.headers.get("last-modified"))
+        return httpx.Response(200, headers=headers, content=body, request=request, extensions=resp.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    @staticmethod
+    def _from_entry(request: httpx.Request, entry: dict) -> httpx.Response:
+        headers = [tuple(h) for h in entry["headers"]]
+        return httpx.Response(entry["status"], headers=headers, content=entry["body"], request=request)
@@ -0,0 +1,180 @@
+import re
+import struct
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from .models import NewsItem, ClusterMember, TopicCluster
+
+# 归一化时丢弃的字符：标点、空白、符号（中英文）
+_STRIP_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(title: str) -> str:
+    t = unicodedata.normalize("NFKC", title or "").lower()
+    return _STRIP_RE.sub("", t)
+
+
+def shingles(title: str, k: int = 2) -> Set[str]:
+    """标题归一化后切成字符 k-gram 集合；短标题整体作为一个 shingle"""
+    t = normalize_title(title)
+    if not t:
+        return set()
+    if len(t) <= k:
+        return {t}
+    return {t[i:i + k] for i in range(len(t) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+class MinHasher:
+    """
+    每个 shingle 用 SHAKE-128 一次产出 num_perm 个 32 位哈希，相当于 num_perm 个独立的随机排列；
+    签名为各位置上的最小值（zip + min 在 C 层完成）。seed 固定时签名在进程间可复现
+    shingle 的哈希向量有上限缓存，中文二元组的词表有限，重复标题基本不再计算哈希
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1, cache_size: int = 200_000):
+        self.num_perm = num_perm
+        self._seed = seed.to_bytes(8, "little")
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+        self._cache: Dict[str, Tuple[int, ...]] = {}
+        self._cache_size = cache_size
+
+    def _hashes(self, shingle: str) -> Tuple[int, ...]:
+        h = self._cache.get(shingle)
+        if h is None:
+            h = self._unpack(hashlib.shake_128(self._seed + shingle.encode("utf-8")).digest(4 * self.num_perm))
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[shingle] = h
+        return h
+
+    def signature(self, hs: Set[str]) -> Tuple[int, ...]:
+        if not hs:
+            return (0xFFFFFFFF,) * self.num_perm
+        return tuple(map(min, zip(*map(self._hashes, hs))))
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x: int) -> int:
+        p = self.parent
+        while p[x] != x:
+            p[x] = p[p[x]]
+            x = p[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            if ra > rb:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+class TopicClusterer:
+    """
+    跨平台、跨快照的近似重复标题聚类：MinHash 签名 + LSH 分桶
+    - 签名切成 bands 段，任意一段完全相同的条目成为候选对，避免两两比较
+    - 候选对再以 shingle 集合的精确 Jaccard 校验（>= threshold 才合并），过滤 LSH 的假阳性
+    - 同一 (platform_id, id) 重复出现（多次快照）时只保留最近一次的排名
+    bands * rows 必须等于 num_perm；默认 16x4 时，相似度约 0.5 以上的标题大概率进入同一候选桶
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64, bands: int = 16, k: int = 2, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.k = k
+        self._hasher = MinHasher(num_perm, seed)
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self._shingles: List[Set[str]] = []
+        self._members: List[ClusterMember] = []
+        self._by_key: Dict[Tuple[Optional[str], str], int] = {}
+        self._uf = _UnionFind()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def add(self, items: Iterable[NewsItem]) -> None:
+        for it in items:
+            self.add_item(it)
+
+    def add_item(self, it: NewsItem) -> int:
+        member = ClusterMember(
+            id=it.id, title=it.title, url=it.url, platform_id=it.platform_id,
+            platform_name=it.platform_name, rank=it.rank, fetch_time=it.fetch_time,
+        )
+        key = (it.platform_id, it.id)
+        idx = self._by_key.get(key)
+        if idx is not None:
+            old = self._members[idx]
+            if old.fetch_time is None or (it.fetch_time is not None and it.fetch_time >= old.fetch_time):
+                self._members[idx] = member
+            return idx
+        hs = shingles(it.title, self.k)
+        idx = self._uf.add()
+        self._members.append(member)
+        self._shingles.append(hs)
+        self._by_key[key] = idx
+        if not hs:
+            return idx
+        sig = self._hasher.signature(hs)
+        checked: Set[int] = set()
+        for b in range(self.bands):
+            band = sig[b * self.rows:(b + 1) * self.rows]
+            bucket = self._buckets[b].setdefault(band, [])
+            for other in bucket:
+                if other in checked:
+                    continue
+                checked.add(other)
+                if self._uf.find(other) != self._uf.find(idx) and jaccard(hs, self._shingles[other]) >= self.threshold:
+                    self._uf.union(idx, other)
+            bucket.append(idx)
+        return idx
+
+    def clusters(self, min_size: int = 1) -> List[TopicCluster]:
+        """合并后的话题簇：覆盖平台数多者在前，其次按成员数、最好排名排序"""
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(self._members)):
+            groups.setdefault(self._uf.find(i), []).append(i)
+        out: List[TopicCluster] = []
+        for idxs in groups.values():
+            if len(idxs) < min_size:
+                continue
+            members = [self._members[i] for i in idxs]
+            members.sort(key=lambda m: (m.rank if m.rank is not None else 1 << 30))
+            rep = members[0]
+            platforms = list(dict.fromkeys(m.platform_id for m in members if m.platform_id))
+            ranks = [m.rank for m in members if m.rank is not None]
+            out.append(TopicCluster(
+                id=rep.id, title=rep.title, size=len(members), platforms=platforms,
+                best_rank=min(ranks) if ranks else None, members=members,
+            ))
+        out.sort(key=lambda c: (-len(c.platforms), -c.size, c.best_rank if c.best_rank is not None else 1 << 30))
+        return out
+
+
+def cluster_items(items: Iterable[NewsItem], threshold: float = 0.5, num_perm: int = 64, bands: int = 16) -> List[TopicCluster]:
+    """对一批条目聚类（可混合多个平台、多次快照的结果）"""
+    c = TopicClusterer(threshold=threshold, num_perm=num_perm, bands=bands)
+    c.add(items)
+    return c.clusters()
+
+
+def cluster_batch(batch: Dict[str, Sequence[NewsItem]], **kwargs) -> List[TopicCluster]:
+    """fetch_newsnow_batch 输出的便捷入口"""
+    return cluster_items((it for items in batch.values() for it in items), **kwargs)
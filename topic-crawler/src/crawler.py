@@ -1,11 +1,107 @@
 import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+import time
 from typing import List, Optional, Tuple, Dict
 from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from html.parser import HTMLParser
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import codecs
+import hashlib
 import re
 import json
-from bs4 import BeautifulSoup
 import httpx
-from .models import NewsItem
+from .models import NewsItem, EnrichStats, NEWS_ITEMS
+from .cache import HttpCache, CachingTransport
+from . import metrics
+
+
+NEWSNOW_API_URL = "https://newsnow.busiyi.world/api/s"
+
+# 磁盘缓存的默认有效期（秒），按 URL 前缀匹配；文章页走详情结果缓存，不缓存原始响应
+DEFAULT_CACHE_TTLS = {NEWSNOW_API_URL: 120}
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+    "Cache-Control": "no-cache",
+}
+
+_PAGE_HEADERS = {
+    **_HEADERS,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """按 host 维护令牌桶：rate 为每秒请求数，burst 为桶容量；overrides/bursts 可为个别 host 指定速率与桶容量。"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        overrides: Optional[Dict[str, float]] = None,
+        bursts: Optional[Dict[str, float]] = None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = dict(overrides or {})
+        self.bursts = dict(bursts or {})
+        self._buckets: Dict[str, _TokenBucket] = {}
+
+    async def acquire(self, url: str) -> None:
+        host = urlsplit(url).hostname or ""
+        rate = self.overrides.get(host, self.rate)
+        if rate <= 0:
+            return
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _TokenBucket(rate, self.bursts.get(host, self.burst))
+        await bucket.acquire()
+
+
+def api_rate_limiter(rate: float, burst: float, detail_rate: float = 0.0, detail_burst: float = 1.0) -> HostRateLimiter:
+    """
+    newsnow 接口 host 按 rate/burst 限速；文章页分散在各站点，另按 detail_rate/detail_burst 限速
+    （<=0 不限速，单 host 并发仍受 detail_concurrency 约束），不与接口共用配额
+    """
+    host = urlsplit(NEWSNOW_API_URL).hostname or ""
+    return HostRateLimiter(detail_rate, burst=detail_burst, overrides={host: rate}, bursts={host: burst})
+
+
+def _make_client(proxy_url: Optional[str] = None, max_connections: int = 10, cache: Optional[HttpCache] = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=30)
+    if cache is not None:
+        inner = httpx.AsyncHTTPTransport(http2=True, limits=limits, proxy=proxy_url or None)
+        return httpx.AsyncClient(timeout=15, transport=CachingTransport(inner, cache))
+    return httpx.AsyncClient(timeout=15, proxy=proxy_url or None, limits=limits, http2=True)
 
 
 def _parse_datetime_str(s: str) -> Optional[datetime]:
@@ -40,87 +136,223 @@ def _parse_datetime_str(s: str) -> Optional[datetime]:
     return None
 
 
+_SUMMARY_METAS = [
+    ("property", "og:description"),
+    ("name", "twitter:description"),
+    ("name", "description"),
+]
+
+_PUBLISH_TIME_METAS = [
+    ("property", "article:published_time"),
+    ("property", "og:published_time"),
+    ("property", "og:updated_time"),
+    ("name", "pubdate"),
+    ("name", "publish-date"),
+    ("name", "parsely-pub-date"),
+    ("itemprop", "datePublished"),
+]
+
+_META_KEYS = ("property", "name", "itemprop")
+
+# 详情页最多读取的字节数：大多数页面的 <head> 远小于该值，门户首页正文可达数 MB
+HEAD_BYTE_BUDGET = 256 * 1024
+
+
+class _HeadMetaParser(HTMLParser):
+    """
+    单遍收集 <meta> 与 JSON-LD：每个 (属性, 值) 只保留文档中第一个 meta 的 content，
+    与逐个 find 的语义一致；遇到 </head> 或 <body> 后置 done，之后的内容不再收集。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.metas: Dict[Tuple[str, str], Optional[str]] = {}
+        self.ld_blocks: List[str] = []
+        self.done = False
+        self._ld_buf: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "meta":
+            d = dict(attrs)
+            for key in _META_KEYS:
+                val = d.get(key)
+                if val is not None:
+                    self.metas.setdefault((key, val), d.get("content"))
+        elif tag == "script" and dict(attrs).get("type") == "application/ld+json":
+            self._ld_buf = []
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._ld_buf is not None:
+            self.ld_blocks.append("".join(self._ld_buf))
+            self._ld_buf = None
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._ld_buf is not None:
+            self._ld_buf.append(data)
+
+    def result(self) -> Tuple[Optional[datetime], Optional[str]]:
+        summary = None
+        for key in _SUMMARY_METAS:
+            content = self.metas.get(key)
+            if content:
+                summary = content.strip()
+                if summary:
+                    break
+        dt = None
+        for key in _PUBLISH_TIME_METAS:
+            content = self.metas.get(key)
+            if content:
+                dt = _parse_datetime_str(content)
+                if dt:
+                    break
+        if not dt:
+            try:
+                for block in self.ld_blocks:
+                    data = json.loads(block.strip())
+                    if isinstance(data, dict):
+                        val = data.get("datePublished") or data.get("dateCreated")
+                        if isinstance(val, str):
+                            dt = _parse_datetime_str(val)
+                            if dt:
+                                break
+            except Exception:
+                pass
+        return dt, summary
+
+
 def _extract_details(html: str) -> Tuple[Optional[datetime], Optional[str]]:
-    soup = BeautifulSoup(html, "html.parser")
-    summary = None
-    for attrs in [
-        {"property": "og:description"},
-        {"name": "twitter:description"},
-        {"name": "description"},
-    ]:
-        el = soup.find("meta", attrs=attrs)
-        if el and el.get("content"):
-            summary = el.get("content").strip()
-            if summary:
-                break
-    dt = None
-    for attrs in [
-        {"property": "article:published_time"},
-        {"property": "og:published_time"},
-        {"property": "og:updated_time"},
-        {"name": "pubdate"},
-        {"name": "publish-date"},
-        {"name": "parsely-pub-date"},
-        {"itemprop": "datePublished"},
-    ]:
-        el = soup.find("meta", attrs=attrs)
-        if el and el.get("content"):
-            dt = _parse_datetime_str(el.get("content"))
-            if dt:
-                break
-    if not dt:
-        try:
-            for sc in soup.find_all("script", attrs={"type": "application/ld+json"}):
-                data = json.loads(sc.get_text(strip=True))
-                if isinstance(data, dict):
-                    val = data.get("datePublished") or data.get("dateCreated")
-                    if isinstance(val, str):
-                        dt = _parse_datetime_str(val)
-                        if dt:
-                            break
-        except Exception:
-            pass
-    return dt, summary
+    parser = _HeadMetaParser()
+    parser.feed(html)
+    if not parser.done:
+        parser.close()
+    return parser.result()
+
+
+async def _read_head(resp: httpx.Response, budget: int = HEAD_BYTE_BUDGET) -> str:
+    """增量读取响应，出现 </head> 或 <body 或读满 budget 字节即停止，剩余正文不再下载。"""
+    decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+    parts: List[str] = []
+    tail = ""
+    read = 0
+    async for chunk in resp.aiter_bytes():
+        read += len(chunk)
+        text = decoder.decode(chunk)
+        parts.append(text)
+        window = (tail + text).lower()
+        if "</head" in window or "<body" in window or read >= budget:
+            break
+        tail = window[-6:]
+    else:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def _mp_context():
+    # 事件循环与 httpx 的后台线程不适合直接 fork，子进程用 forkserver（不支持时 spawn）启动
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def make_parse_executor(kind: str = "process", workers: Optional[int] = None) -> Executor:
+    """创建详情页解析用的执行器：kind 为 process（多核并行）或 thread。"""
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawler-parse")
+    raise ValueError(f"unknown executor kind: {kind}")
 
 
-async def fetch_newsnow_latest(platform_id: str, platform_name: Optional[str] = None, proxy_url: Optional[str] = None, retries: int = 2, max_details: int = 8) -> List[NewsItem]:
+_shared_executor: Optional[Executor] = None
+_shared_lock = threading.Lock()
+
+
+def shared_parse_executor() -> Executor:
+    """未指定 parse_executor 时使用的进程内共享进程池（首次使用时创建，进程退出时关闭）"""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = make_parse_executor("process", max(1, min(4, os.cpu_count() or 1)))
+            atexit.register(_shared_executor.shutdown)
+        return _shared_executor
+
+
+async def fetch_newsnow_latest(
+    platform_id: str,
+    platform_name: Optional[str] = None,
+    proxy_url: Optional[str] = None,
+    retries: int = 2,
+    max_details: int = 8,
+    client: Optional[httpx.AsyncClient] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    detail_concurrency: int = 4,
+    detail_deadline: float = 10.0,
+    enrich_stats: Optional[EnrichStats] = None,
+    parse_executor: Optional[Executor] = None,
+    cache: Optional[HttpCache] = None,
+) -> List[NewsItem]:
     if not platform_id:
         return []
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Connection": "keep-alive",
-        "Cache-Control": "no-cache",
-    }
+    if client is None:
+        async with _make_client(proxy_url, cache=cache) as own:
+            return await fetch_newsnow_latest(
+                platform_id, platform_name, proxy_url, retries, max_details,
+                own, limiter, detail_concurrency, detail_deadline, enrich_stats, parse_executor, cache,
+            )
+    items = await _fetch_list(client, limiter, platform_id, platform_name, retries)
+    if max_details > 0 and items:
+        stats = enrich_stats if enrich_stats is not None else EnrichStats()
+        await _enrich_details(client, limiter, items, max_details, detail_concurrency, detail_deadline, stats, parse_executor, cache)
+    return items
+
+
+async def _fetch_list(
+    client: httpx.AsyncClient,
+    limiter: Optional[HostRateLimiter],
+    platform_id: str,
+    platform_name: Optional[str],
+    retries: int,
+) -> List[NewsItem]:
+    headers = _HEADERS
     params = {"id": platform_id, "latest": ""}
-    proxies = None
-    if proxy_url:
-        proxies = {"http": proxy_url, "https": proxy_url}
 
     attempt = 0
     data = None
-    async with httpx.AsyncClient(timeout=15, proxies=proxies) as client:
-        while attempt <= retries and data is None:
+    while attempt <= retries and data is None:
+        try:
+            if limiter:
+                await limiter.acquire(NEWSNOW_API_URL)
+            t0 = time.perf_counter()
             try:
-                resp = await client.get("https://newsnow.busiyi.world/api/s", params=params, headers=headers)
-                resp.raise_for_status()
-                j = resp.json()
-                status = j.get("status", "")
-                if status not in ("success", "cache"):
-                    raise ValueError(f"bad status: {status}")
-                data = j
-            except Exception:
-                attempt += 1
-                if attempt > retries:
-                    break
-                await asyncio.sleep(3 + attempt)
+                resp = await client.get(NEWSNOW_API_URL, params=params, headers=headers)
+            finally:
+                metrics.HTTP_SECONDS.labels("list").observe(time.perf_counter() - t0)
+            metrics.HTTP_REQUESTS.labels("list", resp.status_code).inc()
+            resp.raise_for_status()
+            j = resp.json()
+            status = j.get("status", "")
+            if status not in ("success", "cache"):
+                raise ValueError(f"bad status: {status}")
+            data = j
+        except Exception as e:
+            attempt += 1
+            metrics.ERRORS.labels("list", type(e).__name__).inc()
+            metrics.log_event("list_error", platform=platform_id, attempt=attempt, error=f"{type(e).__name__}: {e}")
+            if attempt > retries:
+                break
+            metrics.LIST_RETRIES.labels(platform_id).inc()
+            await asyncio.sleep(3 + attempt)
 
     if not data:
         return []
 
     now = datetime.now(timezone.utc)
-    items: List[NewsItem] = []
+    rows: List[dict] = []
     for idx, it in enumerate(data.get("items", [])[:100], start=1):
         title = it.get("title")
         if title is None or isinstance(title, float) or not str(title).strip():
@@ -128,44 +360,157 @@ async def fetch_newsnow_latest(platform_id: str, platform_name: Optional[str] =
         title = str(title).strip()
         url = it.get("url") or ""
         mobile_url = it.get("mobileUrl") or None
-        id_val = url or f"{platform_id}:{idx}:{abs(hash(title))}"
-        items.append(NewsItem(
-            id=id_val,
-            title=title,
-            url=url,
-            mobile_url=mobile_url,
-            platform_id=platform_id,
-            platform_name=platform_name,
-            rank=idx,
-            fetch_time=now,
-            raw=it if isinstance(it, dict) else None,
-        ))
-    if max_details > 0 and items:
-        count = 0
-        for it in items:
-            if count >= max_details:
-                break
-            if not it.url.startswith("http"):
+        # 没有 url 时按平台 + 标题生成稳定的 id（不含排名，跨进程、跨轮次不变）
+        id_val = url or platform_id + ":" + hashlib.sha1(f"{platform_id}\0{title}".encode("utf-8")).hexdigest()
+        rows.append({
+            "id": id_val,
+            "title": title,
+            "url": url,
+            "mobile_url": mobile_url,
+            "platform_id": platform_id,
+            "platform_name": platform_name,
+            "rank": idx,
+            "fetch_time": now,
+            "raw": it if isinstance(it, dict) else None,
+        })
+    # 整个榜单一次校验，避免逐条构造 NewsItem 的开销
+    return NEWS_ITEMS.validate_python(rows)
+
+
+async def _enrich_details(
+    client: httpx.AsyncClient,
+    limiter: Optional[HostRateLimiter],
+    items: List[NewsItem],
+    max_details: int,
+    per_host: int,
+    deadline: float,
+    stats: EnrichStats,
+    parse_executor: Optional[Executor] = None,
+    cache: Optional[HttpCache] = None,
+) -> None:
+    """
+    并发抓取前 max_details 条文章页并回填 publish_time/summary，命中情况累加到 stats。
+    同一 host 最多 per_host 个请求同时进行；整个阶段超过 deadline 秒后未完成的请求被取消并计入 timeouts。
+    网络读取留在事件循环上，HTML 解析交给 parse_executor（默认为共享进程池，见 shared_parse_executor）。
+    提供 cache 时先查详情结果缓存，命中的条目不再请求，成功解析的结果写回缓存。
+    """
+    targets = [it for it in items if it.url.startswith("http")][:max_details]
+    if not targets:
+        return
+    stats.attempted += len(targets)
+    if cache is not None:
+        remaining = []
+        for it in targets:
+            cached = cache.get_details(it.url)
+            if cached is None:
+                remaining.append(it)
                 continue
+            stats.cached += 1
+            metrics.ENRICH.labels("cached").inc()
+            _apply_details(it, cached[0], cached[1], stats)
+        targets = remaining
+        if not targets:
+            return
+    loop = asyncio.get_running_loop()
+    executor = parse_executor or shared_parse_executor()
+    start = loop.time()
+    host_sems: Dict[str, asyncio.Semaphore] = {}
+
+    async def one(it: NewsItem) -> Tuple[Optional[datetime], Optional[str]]:
+        host = urlsplit(it.url).hostname or ""
+        sem = host_sems.setdefault(host, asyncio.Semaphore(max(1, per_host)))
+        async with sem:
+            if limiter:
+                await limiter.acquire(it.url)
+            t0 = time.perf_counter()
             try:
-                r = await client.get(it.url, headers=headers)
-                r.raise_for_status()
-                dt, summ = _extract_details(r.text)
-                if dt:
-                    it.publish_time = dt
-                if summ:
-                    it.summary = summ
-            except Exception:
-                pass
-            count += 1
-    return items
+                async with client.stream("GET", it.url, headers=_PAGE_HEADERS) as r:
+                    metrics.HTTP_REQUESTS.labels("page", r.status_code).inc()
+                    r.raise_for_status()
+                    html = await _read_head(r)
+            finally:
+                metrics.HTTP_SECONDS.labels("page").observe(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        result = await loop.run_in_executor(executor, _extract_details, html)
+        metrics.PARSE_SECONDS.observe(time.perf_counter() - t0)
+        if cache is not None:
+            cache.put_details(it.url, result[0], result[1])
+        return result
+
+    tasks = [asyncio.ensure_future(one(it)) for it in targets]
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    for it, t in zip(targets, tasks):
+        if t in pending:
+            stats.timeouts += 1
+            metrics.ENRICH.labels("timeout").inc()
+        elif t.exception() is not None:
+            stats.errors += 1
+            e = t.exception()
+            metrics.ENRICH.labels("error").inc()
+            metrics.ERRORS.labels("detail", type(e).__name__).inc()
+            metrics.log_event("detail_error", url=it.url, error=f"{type(e).__name__}: {e}")
+        else:
+            dt, summ = t.result()
+            _apply_details(it, dt, summ, stats)
+    stats.elapsed_ms += (loop.time() - start) * 1000
+    metrics.log_event("enrich", targets=len(targets), timeouts=len(pending), elapsed_ms=round((loop.time() - start) * 1000, 1))
 
 
-async def fetch_newsnow_batch(platforms: List[Tuple[str, Optional[str]]], interval_ms: int = 1000, proxy_url: Optional[str] = None) -> Dict[str, List[NewsItem]]:
+def _apply_details(it: NewsItem, dt: Optional[datetime], summ: Optional[str], stats: EnrichStats) -> None:
+    if dt:
+        it.publish_time = dt
+    if summ:
+        it.summary = summ
+    if dt or summ:
+        stats.hits += 1
+        metrics.ENRICH.labels("hit").inc()
+    else:
+        stats.misses += 1
+        metrics.ENRICH.labels("miss").inc()
+
+
+async def fetch_newsnow_batch(
+    platforms: List[Tuple[str, Optional[str]]],
+    interval_ms: int = 1000,
+    proxy_url: Optional[str] = None,
+    concurrency: int = 4,
+    rate_per_host: Optional[float] = None,
+    max_details: int = 8,
+    detail_concurrency: int = 4,
+    detail_deadline: float = 10.0,
+    enrich_stats: Optional[EnrichStats] = None,
+    parse_executor: Optional[Executor] = None,
+    cache: Optional[HttpCache] = None,
+    detail_rate_per_host: float = 0.0,
+) -> Dict[str, List[NewsItem]]:
+    """
+    并发抓取多个平台：最多 concurrency 个平台同时进行，共享一个连接池客户端。
+    newsnow 接口的请求速率由令牌桶限制，默认按 interval_ms 换算（1000ms -> 1 req/s），桶容量等于 concurrency；
+    文章页按 detail_rate_per_host 单独限速（默认不限速）；返回结果按 platforms 顺序排列。enrich_stats 累计所有平台的详情解析命中情况，
+    parse_executor 为所有平台共用的解析执行器（见 make_parse_executor），cache 为共用的磁盘缓存。
+    """
     results: Dict[str, List[NewsItem]] = {}
-    for i, (pid, pname) in enumerate(platforms):
-        items = await fetch_newsnow_latest(pid, pname, proxy_url)
+    if not platforms:
+        return results
+    concurrency = max(1, concurrency)
+    rate = rate_per_host if rate_per_host is not None else 1000 / max(50, interval_ms)
+    limiter = api_rate_limiter(rate, concurrency, detail_rate_per_host, detail_concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(pid: str, pname: Optional[str]) -> List[NewsItem]:
+        async with sem:
+            return await fetch_newsnow_latest(
+                pid, pname, retries=2, max_details=max_details, client=client, limiter=limiter,
+                detail_concurrency=detail_concurrency, detail_deadline=detail_deadline, enrich_stats=enrich_stats,
+                parse_executor=parse_executor, cache=cache,
+            )
+
+    async with _make_client(proxy_url, max_connections=max(10, concurrency * 2), cache=cache) as client:
+        fetched = await asyncio.gather(*(one(pid, pname) for pid, pname in platforms))
+    for (pid, _), items in zip(platforms, fetched):
         results[pid] = items
-        if i < len(platforms) - 1:
-            await asyncio.sleep(max(0.05, interval_ms / 1000))
     return results
@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import time
+import logging
+from typing import Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, write_to_textfile
+
+# 默认直方图分桶（秒），覆盖 1ms ~ 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 爬虫指标的独立注册表（不含 prometheus_client 默认的进程/GC 指标）
+REGISTRY = CollectorRegistry()
+
+
+def render(registry: Optional[CollectorRegistry] = None) -> str:
+    """Prometheus 文本格式（0.0.4）"""
+    return generate_latest(registry or REGISTRY).decode("utf-8")
+
+
+def sample(name: str, **labels) -> float:
+    """读取一个样本的当前值（如 crawler_enrich_total, result="hit"），未记录过时为 0"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+# ---- 结构化日志（默认关闭；关闭时 log_event 只有一次布尔判断） ----
+
+_logger = logging.getLogger("topic_crawler")
+_log_enabled = os.getenv("CRAWLER_LOG_JSON", "") not in ("", "0", "false")
+
+
+def enable_logs(enabled: bool = True) -> None:
+    """开启后每个事件以一行 JSON 写到 topic_crawler logger（未配置 handler 时输出到 stderr）"""
+    global _log_enabled
+    _log_enabled = enabled
+    if enabled and not _logger.handlers:
+        h = logging.StreamHandler(sys.stderr)
+        h.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(h)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+
+
+def log_event(event: str, **fields) -> None:
+    if not _log_enabled:
+        return
+    fields["event"] = event
+    fields["ts"] = round(time.time(), 3)
+    _logger.info(json.dumps(fields, ensure_ascii=False, default=str))
+
+
+def write_textfile(path: str, registry: Optional[CollectorRegistry] = None) -> None:
+    """写出 Prometheus textfile（node_exporter textfile collector 可直接采集），先写临时文件再替换"""
+    write_to_textfile(path, registry or REGISTRY)
+
+
+# ---- 爬虫指标 ----
+
+HTTP_REQUESTS = Counter("crawler_http_requests_total", "HTTP requests by kind (list/page) and status", ("kind", "status"), registry=REGISTRY)
+HTTP_SECONDS = Histogram("crawler_http_request_seconds", "HTTP request duration incl. head read", ("kind",), buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+LIST_RETRIES = Counter("crawler_list_retries_total", "newsnow list fetch retries", ("platform",), registry=REGISTRY)
+ERRORS = Counter("crawler_errors_total", "Swallowed exceptions by stage and type", ("stage", "error"), registry=REGISTRY)
+ENRICH = Counter("crawler_enrich_total", "Detail enrichment outcomes", ("result",), registry=REGISTRY)
+PARSE_SECONDS = Histogram("crawler_parse_seconds", "Detail page parse duration incl. executor queueing", buckets=DEFAULT_BUCKETS, registry=REGISTRY)
+HTTP_CACHE = Counter("crawler_http_cache_total", "Disk HTTP cache outcomes", ("result",), registry=REGISTRY)
+POLLS = Counter("crawler_polls_total", "Scheduler polls by platform and whether the list changed", ("platform", "changed"), registry=REGISTRY)
+DELTA_ITEMS = Counter("crawler_delta_items_total", "Delta records written by platform and change type", ("platform", "change"), registry=REGISTRY)
@@ -1,6 +1,6 @@
 from typing import Optional, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class NewsItem(BaseModel):
@@ -13,6 +13,7 @@ class NewsItem(BaseModel):
     rank: Optional[int] = None
     fetch_time: Optional[datetime] = None
     summary: Optional[str] = None
+    publish_time: Optional[datetime] = None
     image: Optional[str] = None
     raw: Optional[dict[str, Any]] = None
 
@@ -23,3 +24,57 @@ class TopicStats(BaseModel):
     article_count: int
     unique_titles: Optional[int] = None
     unique_sources: Optional[int] = None
+
+
+# 整批校验入口：在抓取/聚合边界把一批 dict 一次交给 pydantic-core 校验，比逐条调用构造函数开销小
+NEWS_ITEMS = TypeAdapter(list[NewsItem])
+
+
+class EnrichStats(BaseModel):
+    attempted: int = 0
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cached: int = 0
+    elapsed_ms: float = 0.0
+
+
+class ClusterMember(BaseModel):
+    id: str
+    title: str
+    url: str
+    platform_id: Optional[str] = None
+    platform_name: Optional[str] = None
+    rank: Optional[int] = None
+    fetch_time: Optional[datetime] = None
+
+
+class TopicCluster(BaseModel):
+    id: str
+    title: str
+    size: int
+    platforms: list[str]
+    best_rank: Optional[int] = None
+    members: list[ClusterMember]
+
+
+class RankChange(BaseModel):
+    id: str
+    rank: Optional[int] = None
+    prev_rank: Optional[int] = None
+
+
+class PollDelta(BaseModel):
+    platform_id: str
+    fetch_time: datetime
+    total: int = 0
+    new: list[NewsItem] = []
+    rank_changes: list[RankChange] = []
+    dropped: list[RankChange] = []
+    enriched: int = 0
+    interval_s: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.new or self.rank_changes or self.dropped)
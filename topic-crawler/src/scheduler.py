@@ -0,0 +1,303 @@
+import os
+import json
+import random
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import httpx
+from .models import NewsItem, EnrichStats, PollDelta, RankChange
+from .cache import HttpCache
+from .store import ItemStore
+from .crawler import fetch_newsnow_latest, _enrich_details, api_rate_limiter
+from . import crawler, metrics
+
+# 同一条目详情解析的最多尝试次数（页面本身没有元数据时不再无限重试）
+MAX_DETAIL_ATTEMPTS = 3
+
+
+class AdaptiveInterval:
+    """
+    按榜单变化频率调整轮询间隔：
+    - 变化比例（新增 + 排名变化 + 掉榜条目数 / 榜单长度）>= fast_ratio 时间隔减半
+    - 完全没有变化时间隔乘以 slow_factor
+    - 抓取失败（空列表）时按 2 倍退避
+    结果限制在 [min_s, max_s]，实际等待时间加 ±jitter 的随机抖动，避免多个平台同时到期
+    """
+
+    def __init__(self, min_s: float = 60.0, max_s: float = 1800.0, initial_s: Optional[float] = None,
+                 fast_ratio: float = 0.1, slow_factor: float = 1.5, jitter: float = 0.1):
+        self.min_s = min_s
+        self.max_s = max_s
+        self.value = min(max_s, max(min_s, initial_s if initial_s is not None else min_s * 2))
+        self.fast_ratio = fast_ratio
+        self.slow_factor = slow_factor
+        self.jitter = jitter
+
+    def update(self, changes: int, total: int) -> float:
+        if total == 0:
+            self.value *= 2
+        elif changes == 0:
+            self.value *= self.slow_factor
+        elif changes / total >= self.fast_ratio:
+            self.value /= 2
+        self.value = min(self.max_s, max(self.min_s, self.value))
+        return self.value
+
+    def next_wait(self) -> float:
+        return self.value * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class _PlatformState:
+    """上一轮的 {id: rank}，以及已解析过详情的条目（LRU，掉榜后重新上榜也不再请求文章页）"""
+
+    def __init__(self, seen_size: int):
+        self.ranks: Dict[str, int] = {}
+        self.seen: "OrderedDict[str, Tuple[Optional[str], Optional[str]]]" = OrderedDict()
+        self.seen_size = seen_size
+        # 尚未解析成功的条目 -> 已尝试次数
+        self.attempts: Dict[str, int] = {}
+
+    def fill(self, it: NewsItem) -> bool:
+        """用已解析的详情填充条目，未见过时返回 False"""
+        seen = self.seen.get(it.id)
+        if seen is None:
+            return False
+        if seen[0] and it.publish_time is None:
+            it.publish_time = datetime.fromisoformat(seen[0])
+        if seen[1] and it.summary is None:
+            it.summary = seen[1]
+        return True
+
+    def remember(self, it: NewsItem) -> None:
+        self.seen[it.id] = (it.publish_time.isoformat() if it.publish_time else None, it.summary)
+        self.seen.move_to_end(it.id)
+        while len(self.seen) > self.seen_size:
+            self.seen.popitem(last=False)
+
+
+def delta_path(data_root: str, platform_id: str, when: datetime) -> str:
+    """DATA_ROOT/<platform>/YYYY-MM-DD.jsonl（UTC 日期）"""
+    return os.path.join(data_root, platform_id, when.astimezone(timezone.utc).strftime("%Y-%m-%d") + ".jsonl")
+
+
+def delta_records(delta: PollDelta) -> List[dict]:
+    """
+    增量记录（每行一条）：
+    - new：完整条目（不含 raw），change="new"
+    - rank：{id, rank, prev_rank}，change="rank"
+    - dropped：{id, prev_rank}，change="dropped"
+    每条都带 platform_id 与本轮 fetch_time
+    """
+    ts = delta.fetch_time.isoformat()
+    out: List[dict] = []
+    for it in delta.new:
+        rec = it.model_dump(mode="json", exclude_none=True, exclude={"raw"})
+        rec["change"] = "new"
+        out.append(rec)
+    for rc in delta.rank_changes:
+        out.append({"id": rc.id, "platform_id": delta.platform_id, "rank": rc.rank, "prev_rank": rc.prev_rank,
+                    "fetch_time": ts, "change": "rank"})
+    for rc in delta.dropped:
+        out.append({"id": rc.id, "platform_id": delta.platform_id, "prev_rank": rc.prev_rank,
+                    "fetch_time": ts, "change": "dropped"})
+    return out
+
+
+def append_delta(data_root: str, delta: PollDelta) -> Optional[str]:
+    """把本轮变化追加到当天的 .jsonl（一次 write 写入完整的若干行），没有变化时不写文件"""
+    records = delta_records(delta)
+    if not records:
+        return None
+    path = delta_path(data_root, delta.platform_id, delta.fetch_time)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(data)
+    return path
+
+
+class CrawlScheduler:
+    """
+    常驻的增量抓取调度器：每个平台独立轮询，间隔由 AdaptiveInterval 按榜单变化频率调整
+    - 每轮用 fetch_newsnow_latest(max_details=0) 只拉榜单，与上一轮比较得到新增、排名变化与掉榜
+    - 只对还没有详情的条目解析文章页（每轮前 max_details 条），失败或超出配额的下一轮重试，见过的条目复用缓存的 publish_time/summary
+    - 变化追加写入 DATA_ROOT/<platform>/YYYY-MM-DD.jsonl；启动时从当天文件恢复上一轮的排名，重启后不会重复写入整榜
+    - 提供 store 时，榜单有变化的轮次把完整榜单批量写入条目库
+    所有平台共享一个连接池客户端与按 host 的限速器，同时进行的轮询数不超过 concurrency
+    """
+
+    def __init__(
+        self,
+        platforms: List[Tuple[str, Optional[str]]],
+        data_root: str,
+        min_interval: float = 60.0,
+        max_interval: float = 1800.0,
+        max_details: int = 8,
+        concurrency: int = 4,
+        rate_per_host: float = 1.0,
+        detail_concurrency: int = 4,
+        detail_deadline: float = 10.0,
+        parse_executor: Optional[Executor] = None,
+        cache: Optional[HttpCache] = None,
+        proxy_url: Optional[str] = None,
+        seen_size: int = 5000,
+        store: Optional[ItemStore] = None,
+        detail_rate_per_host: float = 0.0,
+    ):
+        self.platforms = platforms
+        self.data_root = data_root
+        self.max_details = max_details
+        self.concurrency = max(1, concurrency)
+        self.detail_concurrency = detail_concurrency
+        self.detail_deadline = detail_deadline
+        self.parse_executor = parse_executor
+        self.cache = cache
+        self.proxy_url = proxy_url
+        self.store = store
+        self.stats = EnrichStats()
+        # rate_per_host 只限制 newsnow 接口，文章页按 detail_rate_per_host 单独限速
+        self.limiter = api_rate_limiter(rate_per_host, self.concurrency, detail_rate_per_host, detail_concurrency)
+        self.intervals = {pid: AdaptiveInterval(min_interval, max_interval) for pid, _ in platforms}
+        self._states = {pid: _PlatformState(seen_size) for pid, _ in platforms}
+        self._restored: set = set()
+        self._sem = asyncio.Semaphore(self.concurrency)
+
+    def _restore(self, pid: str, now: datetime) -> None:
+        """从当天的增量文件回放出最后一轮的排名与已见条目"""
+        if pid in self._restored:
+            return
+        self._restored.add(pid)
+        path = delta_path(self.data_root, pid, now)
+        if not os.path.exists(path):
+            return
+        st = self._states[pid]
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                change, rid = rec.get("change"), rec.get("id")
+                if not rid:
+                    continue
+                if change == "dropped":
+                    st.ranks.pop(rid, None)
+                    continue
+                if change == "new" and (rec.get("publish_time") or rec.get("summary")):
+                    st.seen[rid] = (rec.get("publish_time"), rec.get("summary"))
+                if isinstance(rec.get("rank"), int):
+                    st.ranks[rid] = rec["rank"]
+
+    def _diff(self, pid: str, items: List[NewsItem], now: datetime) -> PollDelta:
+        st = self._states[pid]
+        delta = PollDelta(platform_id=pid, fetch_time=now, total=len(items))
+        current: Dict[str, int] = {}
+        for it in items:
+            if it.id in current:
+                continue
+            current[it.id] = it.rank or 0
+            prev = st.ranks.get(it.id)
+            if prev is None:
+                delta.new.append(it)
+            elif prev != it.rank:
+                delta.rank_changes.append(RankChange(id=it.id, rank=it.rank, prev_rank=prev))
+        for rid, prev in st.ranks.items():
+            if rid not in current:
+                delta.dropped.append(RankChange(id=rid, prev_rank=prev))
+        st.ranks = current
+        return delta
+
+    async def _enrich_pending(self, client: httpx.AsyncClient, pid: str, items: List[NewsItem]) -> int:
+        """
+        为尚未拿到详情的条目解析文章页（每轮最多 max_details 条，按排名），返回本轮请求的页面数
+        只有解析成功或已尝试 MAX_DETAIL_ATTEMPTS 次的条目才记为已见；超出配额、超时或失败的条目下一轮继续
+        """
+        st = self._states[pid]
+        pending: List[NewsItem] = []
+        for it in items:
+            # 已见条目（包括重新上榜的）沿用之前的解析结果，不再请求文章页
+            if st.fill(it):
+                continue
+            if it.url.startswith("http"):
+                pending.append(it)
+            else:
+                st.remember(it)
+        targets = pending[:self.max_details]
+        if not targets:
+            return 0
+        await _enrich_details(
+            client, self.limiter, targets, len(targets), self.detail_concurrency,
+            self.detail_deadline, self.stats, self.parse_executor, self.cache,
+        )
+        for it in targets:
+            tries = st.attempts.get(it.id, 0) + 1
+            if it.publish_time or it.summary or tries >= MAX_DETAIL_ATTEMPTS:
+                st.attempts.pop(it.id, None)
+                st.remember(it)
+            else:
+                st.attempts[it.id] = tries
+        # 已掉榜条目的失败计数不再需要
+        current = {it.id for it in items}
+        for rid in [r for r in st.attempts if r not in current]:
+            del st.attempts[rid]
+        return len(targets)
+
+    async def poll_once(self, client: httpx.AsyncClient, pid: str, pname: Optional[str] = None) -> PollDelta:
+        """抓取一次榜单，计算并写入增量，更新该平台的轮询间隔"""
+        async with self._sem:
+            now = datetime.now(timezone.utc)
+            self._restore(pid, now)
+            items = await fetch_newsnow_latest(pid, pname, max_details=0, client=client, limiter=self.limiter)
+            if not items:
+                # 抓取失败（或平台暂无数据）：保留上一轮状态，退避后重试
+                delta = PollDelta(platform_id=pid, fetch_time=now)
+                delta.interval_s = self.intervals[pid].update(0, 0)
+                metrics.POLLS.labels(pid, "error").inc()
+                metrics.log_event("poll", platform=pid, total=0, interval_s=round(delta.interval_s, 1))
+                return delta
+            delta = self._diff(pid, items, now)
+            delta.enriched = await self._enrich_pending(client, pid, items)
+            append_delta(self.data_root, delta)
+            if self.store is not None and delta.changed:
+                # 条目库保存榜单变化后的完整快照（详情取自已见条目），供按时间窗口/排名查询
+                st = self._states[pid]
+                for it in items:
+                    st.fill(it)
+                self.store.write_items(items)
+            changes = len(delta.new) + len(delta.rank_changes) + len(delta.dropped)
+            delta.interval_s = self.intervals[pid].update(changes, len(items))
+        metrics.POLLS.labels(pid, "yes" if changes else "no").inc()
+        for change, n in (("new", len(delta.new)), ("rank", len(delta.rank_changes)), ("dropped", len(delta.dropped))):
+            if n:
+                metrics.DELTA_ITEMS.labels(pid, change).inc(n)
+        metrics.log_event(
+            "poll", platform=pid, total=len(items), new=len(delta.new), rank=len(delta.rank_changes),
+            dropped=len(delta.dropped), enriched=delta.enriched, interval_s=round(delta.interval_s, 1),
+        )
+        return delta
+
+    async def _loop(self, client: httpx.AsyncClient, pid: str, pname: Optional[str], stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await self.poll_once(client, pid, pname)
+            except Exception as e:
+                # 单个平台的异常不影响其他平台，下一轮照常进行
+                metrics.ERRORS.labels("poll", type(e).__name__).inc()
+                metrics.log_event("poll_error", platform=pid, error=f"{type(e).__name__}: {e}")
+                self.intervals[pid].update(0, 0)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.intervals[pid].next_wait())
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """运行直到 stop 被设置（未提供时一直运行）"""
+        stop = stop or asyncio.Event()
+        # 榜单轮询不经过响应缓存（否则 TTL 内每轮都看到同一份榜单，间隔只会一直退避）；
+        # self.cache 只用于文章页详情结果
+        async with crawler._make_client(self.proxy_url, max_connections=max(10, self.concurrency * 2)) as client:
+            await asyncio.gather(*(self._loop(client, pid, pname, stop) for pid, pname in self.platforms))
@@ -0,0 +1,99 @@
+import gzip
+import io
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence
+from pydantic import TypeAdapter
+from .models import NewsItem
+
+# 输出时始终不写 raw（原始接口条目），在序列化阶段直接排除，不先生成再删除
+_ITEM = TypeAdapter(NewsItem)
+_ITEMS = TypeAdapter(List[NewsItem])
+_BATCH = TypeAdapter(Dict[str, List[NewsItem]])
+_EXCLUDE = {"raw"}
+
+COMPRESSIONS = ("gzip", "zstd")
+FLUSH_BYTES = 1 << 16
+
+
+def dump_item(it: NewsItem) -> bytes:
+    """单条 NewsItem -> 紧凑 JSON（UTF-8，不转义中文，不含 raw 与空字段）"""
+    return _ITEM.dump_json(it, exclude_none=True, exclude=_EXCLUDE)
+
+
+def encode_item(it: NewsItem) -> bytes:
+    """单条 NewsItem -> 一行 NDJSON"""
+    return dump_item(it) + b"\n"
+
+
+def encode_items(items: Sequence[NewsItem]) -> bytes:
+    """单平台结果 -> 紧凑 JSON 数组（一次编码）"""
+    return _ITEMS.dump_json(list(items), exclude_none=True, exclude={"__all__": _EXCLUDE})
+
+
+def encode_batch(data: Dict[str, List[NewsItem]]) -> bytes:
+    """批量结果 {platform_id: [NewsItem]} -> 紧凑 JSON 对象（一次编码）"""
+    return _BATCH.dump_json(data, exclude_none=True, exclude={"__all__": {"__all__": _EXCLUDE}})
+
+
+def compression_for(path: str, compression: Optional[str] = None) -> Optional[str]:
+    """显式指定优先，否则按后缀推断：.gz -> gzip，.zst -> zstd"""
+    if compression:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression: {compression}")
+        return compression
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("zstd compression requires the 'zstandard' package") from e
+    return zstandard
+
+
+def check_compression(path: str, compression: Optional[str] = None) -> Optional[str]:
+    """在开始抓取前确认压缩方式可用，返回实际使用的压缩方式"""
+    kind = compression_for(path, compression)
+    if kind == "zstd":
+        _zstandard()
+    return kind
+
+
+def open_sink(path: str, compression: Optional[str] = None) -> BinaryIO:
+    """打开二进制输出文件，可选 gzip / zstd（zstd 需要安装 zstandard）"""
+    kind = compression_for(path, compression)
+    if kind == "gzip":
+        # 压缩级别 6：与默认 9 相比体积相近、速度快数倍
+        return gzip.open(path, "wb", compresslevel=6)
+    if kind == "zstd":
+        return _zstandard().ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def write_all(data: bytes, sinks: Iterable[BinaryIO]) -> None:
+    """同一份已编码字节写入所有输出（stdout 与文件不再分别序列化）"""
+    for s in sinks:
+        s.write(data)
+
+
+def write_ndjson(items: Iterable[NewsItem], sinks: Sequence[BinaryIO], flush_bytes: int = FLUSH_BYTES) -> int:
+    """
+    逐条编码为 NDJSON 并流式写入所有输出，每条只编码一次；
+    按约 flush_bytes 攒批写入，内存只与批大小相关。返回写入条数
+    """
+    buf = io.BytesIO()
+    n = 0
+    for it in items:
+        buf.write(encode_item(it))
+        n += 1
+        if buf.tell() >= flush_bytes:
+            write_all(buf.getvalue(), sinks)
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        write_all(buf.getvalue(), sinks)
+    return n
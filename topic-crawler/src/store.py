@@ -0,0 +1,147 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from .models import NewsItem
+from .serialize import dump_item
+
+# 与 hot_topic_agent/store.py 共用的表结构与迁移：两个包互不依赖，改动时需同步修改（hot_topic_agent/tests/test_tools.py 检查两份一致）
+# batches 每次写入（一个平台的一次抓取或一次导入）一行，条目通过 batch_id 归属批次，
+# 批次内各条目的 fetch_time 可以不同；batches.fetch_time 为批次内最大的 fetch_time
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    fetch_time REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY,
+    batch_id INTEGER NOT NULL,
+    platform TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    topic TEXT,
+    url TEXT,
+    rank INTEGER,
+    views REAL,
+    like_rate REAL,
+    publish_time TEXT,
+    fetch_time REAL NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (platform, item_id, fetch_time));
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_batches_platform_fetch ON batches(platform, fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_batch ON items(batch_id);
+CREATE INDEX IF NOT EXISTS ix_items_platform_fetch ON items(platform, fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_fetch ON items(fetch_time);
+CREATE INDEX IF NOT EXISTS ix_items_item_id ON items(item_id);
+CREATE INDEX IF NOT EXISTS ix_items_topic ON items(topic);
+"""
+
+
+def _migrate(db: sqlite3.Connection) -> None:
+    """旧库没有 batch_id 时补列，并把每个 (platform, fetch_time) 记为一个批次"""
+    if any(r[1] == "batch_id" for r in db.execute("PRAGMA table_info(items)")):
+        return
+    db.executescript("""
+        BEGIN;
+        ALTER TABLE items ADD COLUMN batch_id INTEGER NOT NULL DEFAULT 0;
+        INSERT INTO batches (platform, fetch_time) SELECT DISTINCT platform, fetch_time FROM items ORDER BY fetch_time;
+        UPDATE items SET batch_id = (
+            SELECT b.batch_id FROM batches b WHERE b.platform = items.platform AND b.fetch_time = items.fetch_time);
+        COMMIT;
+    """)
+
+
+class ItemStore:
+    """
+    条目库写入端（SQLite，默认 DATA_ROOT/items.sqlite），分析侧 hot_topic_agent.store.ItemStore 读取同一个文件
+    每次抓取的每个条目一行：topic 为标题，data 为不含 raw 的 NewsItem JSON
+    每次写入中的每个平台是一个批次（batches 表），分析侧按 batch_id 读取完整榜单
+    写入按 batch_size 分批 executemany，一次写入一个事务（批次要么完整可见要么不可见）；(platform, item_id, fetch_time) 重复时忽略
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        _migrate(self._db)
+        self._db.executescript(INDEXES)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _row(self, it: NewsItem, batch_id: int, now: float) -> tuple:
+        return (
+            batch_id, it.platform_id or "", it.id, it.title, it.url or None, it.rank, None, None,
+            it.publish_time.isoformat() if it.publish_time else None,
+            it.fetch_time.timestamp() if it.fetch_time else now,
+            dump_item(it).decode("utf-8"),
+        )
+
+    def write_items(self, items: Iterable[NewsItem]) -> int:
+        """批量写入（平台取自 NewsItem.platform_id，每个平台一个批次），返回新写入的行数"""
+        now = datetime.now(timezone.utc).timestamp()
+        batch_ids: Dict[str, int] = {}
+        added: Dict[int, int] = {}
+        batch: List[tuple] = []
+        # 批次行、全部条目与批次的最终 fetch_time 在同一个事务内写入：分析侧只会看到完整的批次
+        self._db.execute("BEGIN")
+        try:
+            for it in items:
+                pid = it.platform_id or ""
+                batch_id = batch_ids.get(pid)
+                if batch_id is None:
+                    batch_id = batch_ids[pid] = self._db.execute(
+                        "INSERT INTO batches (platform, fetch_time) VALUES (?, ?)", (pid, now)
+                    ).lastrowid
+                batch.append(self._row(it, batch_id, now))
+                if len(batch) >= self.batch_size:
+                    self._write(batch, added)
+                    batch = []
+            if batch:
+                self._write(batch, added)
+            for batch_id in batch_ids.values():
+                self._close_batch(batch_id, added.get(batch_id, 0))
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return sum(added.values())
+
+    def write_batch(self, data: Dict[str, List[NewsItem]]) -> int:
+        """fetch_newsnow_batch 的结果整体写入"""
+        return self.write_items(it for items in data.values() for it in items)
+
+    def _close_batch(self, batch_id: int, added: int) -> None:
+        # 批次的 fetch_time 取其中最大的条目 fetch_time；全部重复的批次不保留
+        if added:
+            self._db.execute(
+                "UPDATE batches SET fetch_time = (SELECT MAX(fetch_time) FROM items WHERE batch_id = ?) WHERE batch_id = ?",
+                (batch_id, batch_id),
+            )
+        else:
+            self._db.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+
+    def _write(self, rows: List[tuple], added: Dict[int, int]) -> None:
+        """按批次分组 executemany 写入 rows，按批次累计新写入的行数"""
+        groups: Dict[int, List[tuple]] = {}
+        for row in rows:
+            groups.setdefault(row[0], []).append(row)
+        for batch_id, group in groups.items():
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO items (batch_id, platform, item_id, topic, url, rank, views, like_rate, publish_time, fetch_time, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                group,
+            )
+            added[batch_id] = added.get(batch_id, 0) + self._db.total_changes - before
+
+    def count(self, platform: Optional[str] = None) -> int:
+        if platform is None:
+            return self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        return self._db.execute("SELECT COUNT(*) FROM items WHERE platform = ?", (platform,)).fetchone()[0]
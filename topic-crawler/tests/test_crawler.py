@@ -1,11 +1,71 @@
 import asyncio
+import json
+import time
+import httpx
 import pytest
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-from src.models import NewsItem
-from src.crawler import fetch_newsnow_latest
+from src.models import NewsItem, EnrichStats
+from src.cache import HttpCache, CachingTransport
+from src import crawler
+from src.crawler import fetch_newsnow_latest, fetch_newsnow_batch, HostRateLimiter, _extract_details, _read_head
+
+PAGES = Path(__file__).resolve().parent / "fixtures" / "pages"
+
+
+def _newsnow_handler(delay: float = 0.0, in_flight: list | None = None):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if in_flight is not None:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(delay)
+        if in_flight is not None:
+            in_flight[0] -= 1
+        pid = request.url.params.get("id")
+        items = [{"title": f"{pid} 标题 {n}", "url": f"https://{pid}.example.com/{n}"} for n in range(3)]
+        return httpx.Response(200, json={"status": "success", "items": items})
+    return handler
+
+
+def _page_handler(slow_path: str = "", slow: float = 0.0):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "newsnow.busiyi.world":
+            items = [{"title": f"标题 {n}", "url": f"https://site{n % 2}.example.com/a{n}"} for n in range(6)]
+            return httpx.Response(200, json={"status": "success", "items": items})
+        if request.url.path == slow_path:
+            await asyncio.sleep(slow)
+        if request.url.path == "/a1":
+            return httpx.Response(404)
+        if request.url.path == "/a2":
+            return httpx.Response(200, html="<html><head><title>x</title></head></html>")
+        html = (
+            '<html><head><meta property="og:description" content=" 摘要 ">'
+            '<meta property="article:published_time" content="2025-11-20T08:00:00Z"></head></html>'
+        )
+        return httpx.Response(200, html=html)
+    return handler
+
+
+def _mock_client(monkeypatch, handler):
+    def make(proxy_url=None, max_connections=10, cache=None):
+        transport = httpx.MockTransport(handler)
+        if cache is not None:
+            transport = CachingTransport(transport, cache)
+        return httpx.AsyncClient(transport=transport)
+    monkeypatch.setattr(crawler, "_make_client", make)
+
+
+def test_make_client_proxy_without_deprecation(tmp_path):
+    import warnings
+
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for args in ((), ("http://127.0.0.1:8080",)):
+            for c in (None, cache):
+                asyncio.run(crawler._make_client(*args, cache=c).aclose())
 
 
 def test_model_required_fields():
@@ -29,3 +89,459 @@ def test_fetch_platform_toutiao():
     assert all(isinstance(i, NewsItem) for i in items)
     if items:
         assert items[0].rank == 1
+
+
+def test_batch_concurrent_keeps_order(monkeypatch):
+    in_flight = [0, 0]
+    _mock_client(monkeypatch, _newsnow_handler(delay=0.05, in_flight=in_flight))
+    platforms = [(f"p{n}", None) for n in range(8)]
+    data = asyncio.run(fetch_newsnow_batch(platforms, concurrency=3, rate_per_host=0, max_details=0))
+    assert list(data) == [pid for pid, _ in platforms]
+    assert all(len(items) == 3 and items[0].rank == 1 for items in data.values())
+    assert in_flight[1] == 3
+
+
+def test_urlless_items_get_stable_ids(monkeypatch):
+    import hashlib
+    order = [["甲", "乙"], ["乙", "甲"]]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "success", "items": [{"title": t} for t in order.pop(0)]})
+
+    _mock_client(monkeypatch, handler)
+    first = asyncio.run(fetch_newsnow_latest("weibo", max_details=0))
+    second = asyncio.run(fetch_newsnow_latest("weibo", max_details=0))
+    # id 只取决于平台与标题：排名变化后不变，也不受进程的字符串哈希随机化影响
+    assert {i.title: i.id for i in first} == {i.title: i.id for i in second}
+    assert first[0].id == "weibo:" + hashlib.sha1("weibo\0甲".encode("utf-8")).hexdigest()
+
+
+def test_host_rate_limiter_spaces_requests():
+    async def run():
+        limiter = HostRateLimiter(rate=20, burst=1)
+        start = time.perf_counter()
+        for _ in range(5):
+            await limiter.acquire("https://a.example.com/x")
+        await limiter.acquire("https://b.example.com/x")
+        return time.perf_counter() - start
+    elapsed = asyncio.run(run())
+    assert 0.18 <= elapsed < 0.5
+
+
+def test_batch_rate_limit_only_applies_to_api_host(monkeypatch):
+    _mock_client(monkeypatch, _page_handler())
+    start = time.perf_counter()
+    # 接口 1 req/s、桶容量 1：文章页若共用该限速，每个站点 3 个页面需要约 2 秒
+    data = asyncio.run(fetch_newsnow_batch([("toutiao", None)], interval_ms=1000, concurrency=1, max_details=6))
+    assert time.perf_counter() - start < 1.0
+    assert sum(1 for it in data["toutiao"] if it.summary) == 4
+
+    async def run():
+        limiter = crawler.api_rate_limiter(rate=20, burst=1, detail_rate=0)
+        t = time.perf_counter()
+        for _ in range(3):
+            await limiter.acquire(crawler.NEWSNOW_API_URL)
+        api = time.perf_counter() - t
+        t = time.perf_counter()
+        for _ in range(5):
+            await limiter.acquire("https://a.example.com/x")
+        return api, time.perf_counter() - t
+    api, pages = asyncio.run(run())
+    assert api >= 0.08 and pages < 0.05
+
+
+def test_enrichment_runs_concurrently_with_deadline(monkeypatch):
+    _mock_client(monkeypatch, _page_handler(slow_path="/a5", slow=2.0))
+    stats = EnrichStats()
+    start = time.perf_counter()
+    items = asyncio.run(fetch_newsnow_latest("toutiao", max_details=6, detail_deadline=0.5, enrich_stats=stats))
+    assert time.perf_counter() - start < 1.5
+    assert items[0].summary == "摘要"
+    assert items[0].publish_time.year == 2025
+    assert items[1].summary is None
+    assert (stats.attempted, stats.hits, stats.misses, stats.errors, stats.timeouts) == (6, 3, 1, 1, 1)
+    # 未指定 parse_executor 时在共享进程池中解析，而不是受 GIL 限制的默认线程池
+    from concurrent.futures import ProcessPoolExecutor
+    assert isinstance(crawler.shared_parse_executor(), ProcessPoolExecutor)
+
+
+def test_extract_details_matches_fixture_corpus():
+    expected = json.loads((PAGES / "expected.json").read_text(encoding="utf-8"))
+    for name, want in expected.items():
+        dt, summary = _extract_details((PAGES / name).read_text(encoding="utf-8"))
+        assert (dt.isoformat() if dt else None, summary) == (want["publish_time"], want["summary"]), name
+
+
+def test_read_details_chunked_matches_fixture_corpus():
+    expected = json.loads((PAGES / "expected.json").read_text(encoding="utf-8"))
+
+    async def run(page: bytes):
+        async def body():
+            for i in range(0, len(page), 7):
+                yield page[i:i + 7]
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://example.com/") as r:
+                return _extract_details(await _read_head(r))
+
+    for name, want in expected.items():
+        dt, summary = asyncio.run(run((PAGES / name).read_bytes()))
+        assert (dt.isoformat() if dt else None, summary) == (want["publish_time"], want["summary"]), name
+
+
+def test_read_details_stops_at_head():
+    page = (PAGES / "portal_large.html").read_bytes()
+    sent = []
+
+    async def body():
+        for i in range(0, len(page), 4096):
+            sent.append(i)
+            yield page[i:i + 4096]
+
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://portal.example.com/") as r:
+                return _extract_details(await _read_head(r))
+
+    dt, summary = asyncio.run(run())
+    assert summary == "门户首页：要闻、财经、科技"
+    assert dt.isoformat() == "2025-11-25T00:00:00+00:00"
+    assert len(sent) == 1
+
+
+def test_http_cache_revalidates_with_etag(tmp_path):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"status": "success", "items": []}, headers={"etag": '"v1"'})
+
+    cache = HttpCache(str(tmp_path / "http.sqlite"), ttls={"https://api.example.com/s": 60})
+
+    async def run():
+        transport = CachingTransport(httpx.MockTransport(handler), cache)
+        async with httpx.AsyncClient(transport=transport) as client:
+            r1 = await client.get("https://api.example.com/s", params={"id": "a", "latest": ""})
+            r2 = await client.get("https://api.example.com/s", params={"latest": "", "id": "a"})
+            cache.ttls["https://api.example.com/s"] = 0
+            r3 = await client.get("https://api.example.com/s", params={"id": "a", "latest": ""})
+            return r1, r2, r3
+
+    r1, r2, r3 = asyncio.run(run())
+    assert calls == [None, '"v1"']
+    assert r1.json() == r2.json() == r3.json() == {"status": "success", "items": []}
+    assert r3.status_code == 200
+
+
+def test_http_cache_lru_eviction(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path / "http.sqlite"), max_bytes=3000)
+    for n in range(5):
+        cache.put_response(f"k{n}", 200, [], b"x" * 1000, None, None)
+    assert cache.get_response("k0") is None
+    assert cache.get_response("k4")["body"] == b"x" * 1000
+
+    # 两张表按全局 LRU 分批淘汰到 90% 容量，之后的写入不再每次触发淘汰
+    from src import cache as cache_mod
+    monkeypatch.setattr(cache_mod, "EVICT_BATCH", 4)
+    cache = HttpCache(str(tmp_path / "mixed.sqlite"), max_bytes=100 * 100)
+    for n in range(100):
+        if n % 3:
+            cache.put_details(f"u{n:02d}", None, "s" * 64)
+        else:
+            cache.put_response(f"r{n:02d}", 200, [], b"x" * 97, None, None)
+    assert cache._size <= 100 * 100
+    rows = cache._db.execute("SELECT key FROM responses UNION ALL SELECT url FROM details").fetchall()
+    assert cache._size == cache._db.execute(
+        "SELECT (SELECT SUM(size) FROM responses) + (SELECT SUM(size) FROM details)").fetchone()[0]
+    assert min(int(r[0][1:]) for r in rows) == 100 - len(rows)
+
+
+def test_details_cache_skips_refetch(monkeypatch, tmp_path):
+    _mock_client(monkeypatch, _page_handler())
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    first, second = EnrichStats(), EnrichStats()
+    asyncio.run(fetch_newsnow_latest("toutiao", max_details=6, enrich_stats=first, cache=cache))
+    items = asyncio.run(fetch_newsnow_latest("toutiao", max_details=6, enrich_stats=second, cache=cache))
+    assert first.cached == 0 and second.cached == 5
+    assert second.errors == 1 and second.hits == first.hits
+    assert items[0].summary == "摘要"
+
+    # 没有元数据的页面（/a2）只短期缓存，过期后重新请求；有结果的页面仍按 details_ttl 复用
+    short = HttpCache(str(tmp_path / "http.sqlite"), empty_details_ttl=0)
+    third = EnrichStats()
+    asyncio.run(fetch_newsnow_latest("toutiao", max_details=6, enrich_stats=third, cache=short))
+    assert third.cached == 4 and third.misses == 1
+
+
+def test_cluster_near_duplicates_across_platforms_and_snapshots():
+    from datetime import datetime, timezone
+    from src.cluster import cluster_batch, TopicClusterer
+
+    def item(pid, rank, title, ts=None):
+        return NewsItem(id=f"https://{pid}.example.com/{rank}", title=title, url=f"https://{pid}.example.com/{rank}",
+                        platform_id=pid, rank=rank, fetch_time=ts)
+
+    batch = {
+        "toutiao": [item("toutiao", 1, "在日中国游客提前回国 机场仿佛春运"), item("toutiao", 2, "有哪些好看的电影推荐")],
+        "weibo": [item("weibo", 3, "在日中国游客提前回国机场如春运")],
+        "zhihu": [item("zhihu", 5, "如何看待在日中国游客提前回国，机场仿佛春运？")],
+    }
+    clusters = cluster_batch(batch)
+    assert [c.size for c in clusters] == [3, 1]
+    top = clusters[0]
+    assert top.platforms == ["toutiao", "weibo", "zhihu"]
+    assert top.best_rank == 1 and top.title == "在日中国游客提前回国 机场仿佛春运"
+    assert [m.rank for m in top.members] == [1, 3, 5]
+
+    # 同一条目在后续快照中再次出现：不重复计入，排名更新为最新一次
+    c = TopicClusterer()
+    c.add(batch["weibo"])
+    later = item("weibo", 3, "在日中国游客提前回国机场如春运", datetime(2025, 11, 21, tzinfo=timezone.utc))
+    later.rank = 7
+    c.add([later, *batch["toutiao"]])
+    assert len(c) == 3
+    assert c.clusters()[0].members[-1].rank == 7
+
+
+def test_batch_against_local_fake_newsnow(monkeypatch):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+    from fake_newsnow import FakeNewsnow
+    from _results import compare
+
+    with FakeNewsnow(items=5, page_kb=4, error_rate=0.5, seed=3) as srv:
+        monkeypatch.setattr(crawler, "NEWSNOW_API_URL", srv.api_url)
+        stats = EnrichStats()
+        data = asyncio.run(fetch_newsnow_batch([("a", None), ("b", None)], rate_per_host=0, max_details=5, enrich_stats=stats))
+    assert [len(v) for v in data.values()] == [5, 5]
+    assert stats.attempted == 10 and stats.hits + stats.errors == 10 and stats.errors == srv.errors
+    assert data["a"][0].summary == "a 第 0 篇文章摘要" or data["a"][0].summary is None
+
+    base = {"crawl": {"elapsed_s": 1.0, "items_per_s": 100.0, "items": 10}}
+    assert compare({"crawl": {"elapsed_s": 1.1, "items_per_s": 95.0, "items": 1}}, base) == []
+    assert len(compare({"crawl": {"elapsed_s": 1.5, "items_per_s": 50.0, "items": 10}}, base)) == 2
+
+
+def test_metrics_recorded_and_rendered(monkeypatch, tmp_path):
+    from src import metrics
+
+    _mock_client(monkeypatch, _page_handler())
+    before = {r: metrics.sample("crawler_enrich_total", result=r) for r in ("hit", "miss", "error")}
+    list_ok = metrics.sample("crawler_http_requests_total", kind="list", status="200")
+    asyncio.run(fetch_newsnow_latest("p", max_details=6, enrich_stats=EnrichStats()))
+    assert metrics.sample("crawler_http_requests_total", kind="list", status="200") == list_ok + 1
+    assert metrics.sample("crawler_enrich_total", result="hit") - before["hit"] == 4
+    assert metrics.sample("crawler_enrich_total", result="miss") - before["miss"] == 1
+    assert metrics.sample("crawler_enrich_total", result="error") - before["error"] == 1
+    assert metrics.sample("crawler_errors_total", stage="detail", error="HTTPStatusError") >= 1
+
+    text = metrics.render()
+    assert "# TYPE crawler_http_request_seconds histogram" in text
+    assert 'crawler_http_request_seconds_bucket{kind="page",le="+Inf"}' in text
+    assert 'crawler_enrich_total{result="hit"}' in text
+    metrics.write_textfile(str(tmp_path / "crawler.prom"))
+    assert (tmp_path / "crawler.prom").read_text(encoding="utf-8") == metrics.render()
+
+
+def test_structured_logs(monkeypatch, caplog):
+    from src import metrics
+
+    metrics.log_event("ignored", x=1)
+    monkeypatch.setattr(metrics, "_log_enabled", True)
+    with caplog.at_level("INFO", logger="topic_crawler"):
+        metrics._logger.propagate = True
+        metrics.log_event("list_error", platform="weibo", attempt=1)
+    records = [json.loads(r.getMessage()) for r in caplog.records]
+    assert [(r["event"], r["platform"]) for r in records] == [("list_error", "weibo")]
+
+
+def test_scheduler_writes_deltas_and_skips_seen_items(monkeypatch, tmp_path):
+    from src.scheduler import CrawlScheduler, AdaptiveInterval
+
+    lists = [["a", "b", "c"], ["b", "a", "c"], ["b", "a", "c"], ["b", "d", "a"]]
+    current = list(lists[0])
+    pages: list = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "newsnow.busiyi.world":
+            items = [{"title": f"标题 {k}", "url": f"https://site.example.com/{k}"} for k in current]
+            return httpx.Response(200, json={"status": "success", "items": items})
+        pages.append(request.url.path)
+        return httpx.Response(200, html='<html><head><meta name="description" content="摘要"></head></html>')
+
+    async def poll(s):
+        async with crawler._make_client() as client:
+            return await s.poll_once(client, "p")
+
+    def key(x):
+        return x.id.rsplit("/", 1)[1]
+
+    _mock_client(monkeypatch, handler)
+    s = CrawlScheduler([("p", None)], str(tmp_path), rate_per_host=0)
+    deltas = []
+    for ids in lists:
+        current[:] = ids
+        deltas.append(asyncio.run(poll(s)))
+    d1, d2, d3, d4 = deltas
+    assert [key(i) for i in d1.new] == ["a", "b", "c"] and d1.enriched == 3
+    assert [(key(r), r.prev_rank, r.rank) for r in d2.rank_changes] == [("b", 2, 1), ("a", 1, 2)]
+    assert not d2.new and not d3.changed
+    assert [key(i) for i in d4.new] == ["d"] and [(key(r), r.prev_rank) for r in d4.dropped] == [("c", 3)]
+    # 只有从未见过的条目请求文章页
+    assert sorted(pages) == ["/a", "/b", "/c", "/d"]
+
+    files = list((tmp_path / "p").glob("*.jsonl"))
+    assert len(files) == 1
+    lines = [json.loads(l) for l in files[0].read_text(encoding="utf-8").splitlines()]
+    assert [l["change"] for l in lines] == ["new"] * 3 + ["rank"] * 2 + ["new", "rank", "dropped"]
+    assert "raw" not in lines[0] and lines[0]["summary"] == "摘要"
+
+    # 重启后从当天文件恢复：榜单不变时不写入，也不重新请求文章页
+    d = asyncio.run(poll(CrawlScheduler([("p", None)], str(tmp_path), rate_per_host=0)))
+    assert not d.changed and len(pages) == 4
+    assert files[0].read_text(encoding="utf-8").count("\n") == len(lines)
+
+    iv = AdaptiveInterval(10, 100, initial_s=40, jitter=0)
+    assert iv.update(5, 10) == 20 and iv.update(0, 10) == 30 and iv.update(0, 0) == 60
+    assert iv.update(0, 0) == 100 and iv.update(1, 100) == 100
+
+
+def test_cli_compact_and_ndjson_outputs(monkeypatch, tmp_path, capsysbinary):
+    import gzip
+    import cli
+    from src.serialize import encode_item
+
+    _mock_client(monkeypatch, _page_handler())
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--compact", "--no-cache", "--out", str(tmp_path / "a.json")])
+    assert cli.main() == 0
+    out = capsysbinary.readouterr().out
+    # 同一次编码写入 stdout 与文件，raw 在序列化时排除
+    assert out == (tmp_path / "a.json").read_bytes() + b"\n"
+    payload = json.loads(out)
+    assert len(payload) == 6 and all("raw" not in i for i in payload) and payload[0]["summary"] == "摘要"
+
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--ndjson", "--no-cache", "--out", str(tmp_path / "a.ndjson.gz")])
+    assert cli.main() == 0
+    out = capsysbinary.readouterr().out
+    with gzip.open(tmp_path / "a.ndjson.gz", "rb") as f:
+        assert f.read() == out
+    lines = [json.loads(l) for l in out.splitlines()]
+    assert [l["rank"] for l in lines] == list(range(1, 7)) and all("raw" not in l for l in lines)
+
+    # 单次抓取默认不打开磁盘缓存，需要时用 --cache
+    opened = []
+    monkeypatch.setattr(cli, "HttpCache", lambda *a, **k: opened.append(a) or HttpCache(str(tmp_path / "http.sqlite")))
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--out", str(tmp_path / "b.json")])
+    assert cli.main() == 0 and not opened
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--cache", "--out", str(tmp_path / "b.json")])
+    assert cli.main() == 0 and len(opened) == 1
+    capsysbinary.readouterr()
+
+    it = NewsItem(id="1", title="标题", url="u", raw={"k": "v"})
+    assert json.loads(encode_item(it)) == it.model_dump(mode="json", exclude_none=True, exclude={"raw"})
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--ndjson", "--compress", "lz4"])
+    assert cli.main() == 2
+    for argv in ([], ["--all", "--daemon"], ["toutiao", "--all"], ["toutiao", "--concurrency", "x"]):
+        assert cli.main(argv) == 2
+    opts = cli._parser().parse_args(["--daemon", "--platforms", "weibo", "--min-interval", "5"])
+    assert opts.daemon and opts.platforms == "weibo" and opts.min_interval == 5.0 and opts.cache is None
+
+
+def test_item_store_bulk_writes_from_cli_and_scheduler(monkeypatch, tmp_path):
+    import sqlite3
+    import cli
+    from src.store import ItemStore
+    from src.scheduler import CrawlScheduler
+
+    _mock_client(monkeypatch, _page_handler())
+    db = tmp_path / "items.sqlite"
+    monkeypatch.setattr(sys, "argv", ["cli.py", "toutiao", "--no-cache", "--store", str(db), "--out", str(tmp_path / "a.json")])
+    assert cli.main() == 0
+    rows = sqlite3.connect(db).execute("SELECT platform, rank, topic, data FROM items ORDER BY seq").fetchall()
+    assert [r[1] for r in rows] == list(range(1, 7)) and rows[0][:3] == ("toutiao", 1, "标题 0")
+    assert "raw" not in json.loads(rows[0][3]) and json.loads(rows[0][3])["summary"] == "摘要"
+
+    # 调度器只在榜单变化的轮次写入完整榜单；同一批次重复写入被忽略
+    store = ItemStore(str(db), batch_size=4)
+    s = CrawlScheduler([("p", None)], str(tmp_path), rate_per_host=0, max_details=0, store=store)
+
+    async def polls():
+        async with crawler._make_client() as client:
+            return [await s.poll_once(client, "p") for _ in range(2)]
+
+    first, second = asyncio.run(polls())
+    assert first.changed and not second.changed
+    assert store.count("p") == 6 and store.count() == 12
+    items = [NewsItem(id="x", title="t", url="u", platform_id="q", rank=1, fetch_time=first.fetch_time)]
+    assert store.write_items(items) == 1 and store.write_items(items) == 0
+
+    # 写入未完成时其他连接看不到新批次（即使已跨过 batch_size）
+    reader = sqlite3.connect(db)
+    batches = reader.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+    seen = []
+
+    def slow_items():
+        for i in range(10):
+            seen.append(reader.execute("SELECT COUNT(*) FROM batches").fetchone()[0])
+            yield NewsItem(id=f"s{i}", title="t", url="u", platform_id="r", rank=i + 1, fetch_time=first.fetch_time)
+
+    assert store.write_items(slow_items()) == 10
+    assert seen == [batches] * 10 and reader.execute("SELECT COUNT(*) FROM batches").fetchone()[0] == batches + 1
+    indexes = {r[0] for r in store._db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_items_platform_fetch", "ix_items_item_id", "ix_items_topic"} <= indexes
+
+
+def test_scheduler_list_polls_bypass_response_cache(monkeypatch, tmp_path):
+    from src.scheduler import CrawlScheduler
+
+    polls = [0]
+    stop = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        polls[0] += 1
+        if polls[0] >= 3:
+            stop.set()
+        items = [{"title": f"标题 {polls[0]}", "url": f"https://site.example.com/{polls[0]}"}]
+        return httpx.Response(200, json={"status": "success", "items": items})
+
+    _mock_client(monkeypatch, handler)
+    cache = HttpCache(str(tmp_path / "http.sqlite"), ttls={crawler.NEWSNOW_API_URL: 120})
+    s = CrawlScheduler([("p", None)], str(tmp_path), min_interval=0.01, max_interval=0.02, max_details=0, rate_per_host=0, cache=cache)
+    # 每轮都应请求接口并看到新榜单；若经过 120 秒的响应缓存，后续轮次会一直命中缓存
+    asyncio.run(asyncio.wait_for(s.run(stop), timeout=5))
+    assert polls[0] == 3
+
+
+def test_scheduler_retries_unenriched_items(monkeypatch, tmp_path):
+    from src import scheduler
+    from src.scheduler import CrawlScheduler
+
+    pages: list = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "newsnow.busiyi.world":
+            items = [{"title": f"标题 {k}", "url": f"https://site.example.com/{k}"} for k in "abcd"]
+            return httpx.Response(200, json={"status": "success", "items": items})
+        pages.append(request.url.path)
+        # /b 第一次失败；/d 一直没有元数据
+        if request.url.path == "/b" and pages.count("/b") == 1:
+            return httpx.Response(500)
+        if request.url.path == "/d":
+            return httpx.Response(200, html="<html></html>")
+        return httpx.Response(200, html='<html><head><meta name="description" content="摘要"></head></html>')
+
+    _mock_client(monkeypatch, handler)
+    s = CrawlScheduler([("p", None)], str(tmp_path), rate_per_host=0, max_details=2)
+
+    async def polls(n):
+        async with crawler._make_client() as client:
+            return [await s.poll_once(client, "p") for _ in range(n)]
+
+    deltas = asyncio.run(polls(3 + scheduler.MAX_DETAIL_ATTEMPTS))
+    # 失败与超出配额的条目在之后的轮次补齐，无元数据的页面最多尝试 MAX_DETAIL_ATTEMPTS 次
+    assert pages[:4] == ["/a", "/b", "/b", "/c"]
+    assert pages[4:] == ["/d"] * scheduler.MAX_DETAIL_ATTEMPTS
+    assert [d.enriched for d in deltas] == [2, 2] + [1] * scheduler.MAX_DETAIL_ATTEMPTS + [0]
+    assert set(s._states["p"].seen) == {f"https://site.example.com/{k}" for k in "abcd"}